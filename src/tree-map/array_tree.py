@@ -0,0 +1,622 @@
+from array import array
+from itertools import islice
+from operator import itemgetter
+
+from tree import REBUILD_FACTOR, _item_key, _sized, _ascending
+
+# A red-black tree stored as columns instead of node objects. Node ids index parallel
+# columns of keys, values, links and colours, id 0 is the nil node and the ids of deleted
+# nodes are reused through a free list. A tree of millions of entries is then a handful of
+# lists and arrays, rather than millions of objects to allocate and follow.
+#
+# The tree has the same API as RBTree, so it can back a TreeMap (TreeMap(ArrayRBTree)).
+# Results are ArrayNode views holding a node id, which stay valid until their node is deleted.
+
+class ArrayNode(tuple):
+    # A (tree, id) pair, a tuple so that creating one for every node of an iteration stays cheap,
+    # and two views of the same node are equal
+
+    __slots__ = ()
+
+    tree = property(itemgetter(0))
+    id = property(itemgetter(1))
+
+    def __repr__(self) -> str:
+        tree = self.tree
+        output = f"[key: {self.key}, data: {self.data}, "
+        output += f"parent: {tree.keys[tree.parent[self.id]]}, "
+        output += f"left: {tree.keys[tree.left[self.id]]}, "
+        output += f"right: {tree.keys[tree.right[self.id]]}, "
+        output += f"{'black' if tree.black[self.id] else 'red'}]"
+        return output
+
+    @property
+    def key(self):
+        return self[0].keys[self[1]]
+
+    @property
+    def data(self):
+        return self[0].values[self[1]]
+
+    @data.setter
+    def data(self, data):
+        self[0].values[self[1]] = data
+
+class ArrayRBTree:
+
+    def __init__(self):
+        # Column 0 is the nil node, black and without a key
+        self.keys = [None]
+        self.values = [None]
+        self.left = array('i', [0])
+        self.right = array('i', [0])
+        self.parent = array('i', [0])
+        self.black = bytearray(b'\x01')
+        # Deleted ids are chained through their left column, 0 ends the chain
+        self.free = 0
+        self.nil = ArrayNode((self, 0))
+        self.root = 0
+        # Incremented on every structural change, so iterators can detect modification
+        self.mod_count = 0
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def find(self, key) -> ArrayNode:
+        return self.__node(self._find(key))
+
+    def insert(self, key, data) -> ArrayNode:
+        if key is None:
+            raise Exception("key cannot be none")
+        keys, left, right = self.keys, self.left, self.right
+        parent = 0
+        curr = self.root
+        went_left = False
+        while curr:
+            parent = curr
+            curr_key = keys[curr]
+            if key < curr_key:
+                curr = left[curr]
+                went_left = True
+            elif key > curr_key:
+                curr = right[curr]
+                went_left = False
+            else:
+                # duplicate key, ignore insert
+                return ArrayNode((self, curr))
+
+        new_id = self._new_id(key, data)
+        self.parent[new_id] = parent
+        if parent == 0:
+            self.root = new_id
+        elif went_left:
+            left[parent] = new_id
+        else:
+            right[parent] = new_id
+        self.mod_count += 1
+        self.size += 1
+        self._balance_tree(new_id)
+        return ArrayNode((self, new_id))
+
+    def delete(self, key) -> bool:
+        return self.delete_node(self.find(key))
+
+    def delete_node(self, to_delete: ArrayNode) -> bool:
+        # Deletes a node of this tree, such as one returned by insert or find, without searching for its key
+        if to_delete is None or to_delete.id == 0:
+            return False
+        self._delete_id(to_delete.id)
+        return True
+
+    def insert_many(self, items) -> list:
+        # Sorts the (key, data) pairs, then inserts each or merges them into a rebuilt tree when that is cheaper.
+        # Returns the node holding each key in ascending key order, like insert does for a single key.
+        batch = sorted(items, key=_item_key)
+        if len(batch) == 0:
+            return []
+        if not self._rebuild_cheaper(len(batch)):
+            return [self.insert(key, data) for key, data in batch]
+        keys = self.keys
+        ids = list(self.__ids(self._minimum(self.root)))
+        merged = []
+        placed = []
+        i = 0
+        for key, data in batch:
+            if key is None:
+                raise Exception("key cannot be none")
+            while i < len(ids) and keys[ids[i]] < key:
+                merged.append(ids[i])
+                i += 1
+            # duplicate key (of the tree, or earlier in the batch), ignore insert
+            if i < len(ids) and not key < keys[ids[i]]:
+                placed.append(ids[i])
+                continue
+            if len(merged) > 0 and not keys[merged[-1]] < key:
+                placed.append(merged[-1])
+                continue
+            merged.append(self._new_id(key, data))
+            placed.append(merged[-1])
+        merged.extend(ids[i:])
+        self._build_ids(merged)
+        return [ArrayNode((self, id)) for id in placed]
+
+    def delete_many(self, keys) -> int:
+        # Sorts the keys, then deletes each or rebuilds the tree from the remaining nodes when that is cheaper
+        keys = sorted(keys)
+        if len(keys) == 0:
+            return 0
+        if not self._rebuild_cheaper(len(keys)):
+            deleted = 0
+            for key in keys:
+                if self.delete(key):
+                    deleted += 1
+            return deleted
+        remaining = []
+        removed = []
+        i = 0
+        for id in self.__ids(self._minimum(self.root)):
+            key = self.keys[id]
+            while i < len(keys) and keys[i] < key:
+                i += 1
+            if i < len(keys) and not key < keys[i]:
+                removed.append(id)
+            else:
+                remaining.append(id)
+        if len(removed) > 0:
+            self._build_ids(remaining)
+            for id in removed:
+                self._free_id(id)
+        return len(removed)
+
+    @classmethod
+    def from_sorted(cls, items, count: int = None):
+        # Builds a balanced tree in O(n) without rotations, from (key, data) pairs in ascending key order
+        tree = cls()
+        tree._build_sorted(items, count)
+        return tree
+
+    def validate(self) -> bool:
+        # Raises on the first node that breaks the ordering, parent links or colouring, otherwise True
+        if self.root and self.parent[self.root] != 0:
+            raise Exception(f"The root has a parent. {self.__node(self.root)}")
+        if not self.black[self.root]:
+            raise Exception(f"The root is red. {self.__node(self.root)}")
+        keys, left, right, parent = self.keys, self.left, self.right, self.parent
+        prev = 0
+        count = 0
+        for id in self.__ids(self._minimum(self.root)):
+            for child in (left[id], right[id]):
+                if child and parent[child] != id:
+                    raise Exception(f"Node is not the parent of its child. {self.__node(id)}")
+            if prev and not keys[prev] < keys[id]:
+                raise Exception(f"Node is out of order. {self.__node(id)}")
+            prev = id
+            count += 1
+        if count != self.size:
+            raise Exception(f"The tree has {count} nodes, not its size of {self.size}")
+        self.__validate_black_height(self.root)
+        return True
+
+    def __validate_black_height(self, id: int) -> int:
+        if id == 0:
+            return 1
+        black = self.black
+        if not black[id] and not (black[self.left[id]] and black[self.right[id]]):
+            raise Exception(f"Red node has a red child. {self.__node(id)}")
+        left = self.__validate_black_height(self.left[id])
+        right = self.__validate_black_height(self.right[id])
+        if left != right:
+            raise Exception(f"Node has unequal black heights. {self.__node(id)}")
+        return left + black[id]
+
+    # Id-manipulating methods
+
+    def _find(self, key) -> int:
+        keys, left, right = self.keys, self.left, self.right
+        curr = self.root
+        while curr:
+            curr_key = keys[curr]
+            if key < curr_key:
+                curr = left[curr]
+            elif key > curr_key:
+                curr = right[curr]
+            else:
+                return curr
+        return 0
+
+    def _new_id(self, key, data) -> int:
+        new_id = self.free
+        if new_id:
+            self.free = self.left[new_id]
+            self.keys[new_id] = key
+            self.values[new_id] = data
+            self.left[new_id] = 0
+            self.right[new_id] = 0
+            self.parent[new_id] = 0
+            self.black[new_id] = 0
+            return new_id
+        self.keys.append(key)
+        self.values.append(data)
+        self.left.append(0)
+        self.right.append(0)
+        self.parent.append(0)
+        self.black.append(0)
+        return len(self.keys) - 1
+
+    def _free_id(self, id: int):
+        # Drops the references to the key and value, then chains the id for reuse
+        self.keys[id] = None
+        self.values[id] = None
+        self.left[id] = self.free
+        self.free = id
+
+    def _rebuild_cheaper(self, batch_size: int) -> bool:
+        # The same measure as the node trees, see Tree._rebuild_cheaper
+        return batch_size * REBUILD_FACTOR * (self.size + batch_size).bit_length() >= self.size + batch_size
+
+    def _build_sorted(self, items, count: int = None):
+        if count is None:
+            items, count = _sized(items)
+        # Filled into new columns, so the tree is unchanged when the items are not in order
+        keys = [None]
+        values = [None]
+        for key, data in islice(_ascending(items), count):
+            keys.append(key)
+            values.append(data)
+        if len(keys) <= count:
+            raise Exception("items ended before the expected count")
+        self.keys = keys
+        self.values = values
+        self.left = array('i', bytes(4 * (count + 1)))
+        self.right = array('i', bytes(4 * (count + 1)))
+        self.parent = array('i', bytes(4 * (count + 1)))
+        self.black = bytearray(b'\x01' * (count + 1))
+        self.free = 0
+        self._build_ids(range(1, count + 1))
+
+    def _build_ids(self, ids):
+        # Links the ids, in ascending key order, into a balanced tree the same way as Tree._build_nodes
+        count = len(ids)
+        full_depth = (count + 1).bit_length() - 1
+        self.root = self.__link_sorted(ids, 0, count, 0, full_depth)
+        self.parent[self.root] = 0
+        self.size = count
+        self.mod_count += 1
+
+    def __link_sorted(self, ids, start: int, count: int, depth: int, full_depth: int) -> int:
+        if count == 0:
+            return 0
+        middle = start + (count - 1) // 2
+        id = ids[middle]
+        left = self.__link_sorted(ids, start, (count - 1) // 2, depth + 1, full_depth)
+        right = self.__link_sorted(ids, middle + 1, count // 2, depth + 1, full_depth)
+        self.left[id] = left
+        self.right[id] = right
+        if left:
+            self.parent[left] = id
+        if right:
+            self.parent[right] = id
+        # Only the partially filled deepest level is red, every path then has the same black height
+        self.black[id] = depth < full_depth
+        return id
+
+    def _delete_id(self, to_delete: int):
+        left, right, parent, black = self.left, self.right, self.parent, self.black
+        # The successor takes the deleted node's place and colour, so its own colour is the one removed
+        if left[to_delete] == 0:
+            replacement = right[to_delete]
+            removed_black = black[to_delete]
+            self._transplant(to_delete, replacement)
+        elif right[to_delete] == 0:
+            replacement = left[to_delete]
+            removed_black = black[to_delete]
+            self._transplant(to_delete, replacement)
+        else:
+            moved = self._minimum(right[to_delete])
+            removed_black = black[moved]
+            replacement = right[moved]
+            if parent[moved] == to_delete:
+                parent[replacement] = moved
+            else:
+                self._transplant(moved, replacement)
+                right[moved] = right[to_delete]
+                parent[right[moved]] = moved
+            self._transplant(to_delete, moved)
+            left[moved] = left[to_delete]
+            parent[left[moved]] = moved
+            black[moved] = black[to_delete]
+        if removed_black:
+            self._balance_delete(replacement)
+        parent[0] = 0
+        self._free_id(to_delete)
+        self.mod_count += 1
+        self.size -= 1
+
+    def _transplant(self, old: int, new: int):
+        # The parent of new is set even when it is nil, for the delete fix-up
+        parent = self.parent[old]
+        if parent == 0:
+            self.root = new
+        elif old == self.left[parent]:
+            self.left[parent] = new
+        else:
+            self.right[parent] = new
+        self.parent[new] = parent
+
+    def _minimum(self, id: int) -> int:
+        left = self.left
+        while left[id]:
+            id = left[id]
+        return id
+
+    def _maximum(self, id: int) -> int:
+        right = self.right
+        while right[id]:
+            id = right[id]
+        return id
+
+    def _rotate_left(self, id: int):
+        left, right, parent = self.left, self.right, self.parent
+        temp = right[id]
+        right[id] = left[temp]
+        if left[temp]:
+            parent[left[temp]] = id
+        self.__replace_child(id, temp)
+        left[temp] = id
+        parent[id] = temp
+
+    def _rotate_right(self, id: int):
+        left, right, parent = self.left, self.right, self.parent
+        temp = left[id]
+        left[id] = right[temp]
+        if right[temp]:
+            parent[right[temp]] = id
+        self.__replace_child(id, temp)
+        right[temp] = id
+        parent[id] = temp
+
+    def __replace_child(self, old: int, new: int):
+        parent = self.parent[old]
+        self.parent[new] = parent
+        if parent == 0:
+            self.root = new
+        elif old == self.left[parent]:
+            self.left[parent] = new
+        else:
+            self.right[parent] = new
+
+    def _balance_tree(self, id: int):
+        # Moves a red-violation up from the new node, the nil parent of the root is black and ends it
+        left, right, parent, black = self.left, self.right, self.parent, self.black
+        while not black[parent[id]]:
+            node_parent = parent[id]
+            grandparent = parent[node_parent]
+            if node_parent == left[grandparent]:
+                uncle = right[grandparent]
+                if not black[uncle]:
+                    # Rebalancing is not needed, can recolour to avoid red-violation
+                    black[node_parent] = 1
+                    black[uncle] = 1
+                    black[grandparent] = 0
+                    id = grandparent
+                    continue
+                if id == right[node_parent]:
+                    id = node_parent
+                    self._rotate_left(id)
+                    node_parent = parent[id]
+                black[node_parent] = 1
+                black[grandparent] = 0
+                self._rotate_right(grandparent)
+            else:
+                uncle = left[grandparent]
+                if not black[uncle]:
+                    black[node_parent] = 1
+                    black[uncle] = 1
+                    black[grandparent] = 0
+                    id = grandparent
+                    continue
+                if id == left[node_parent]:
+                    id = node_parent
+                    self._rotate_right(id)
+                    node_parent = parent[id]
+                black[node_parent] = 1
+                black[grandparent] = 0
+                self._rotate_left(grandparent)
+        black[self.root] = 1
+
+    def _balance_delete(self, replacement: int):
+        # The replacement carries an extra black, which is moved up until it can be absorbed
+        left, right, parent, black = self.left, self.right, self.parent, self.black
+        id = replacement
+        while id != self.root and black[id]:
+            node_parent = parent[id]
+            if id == left[node_parent]:
+                sibling = right[node_parent]
+                # sibling is red, move it to the location of the parent
+                if not black[sibling]:
+                    black[sibling] = 1
+                    black[node_parent] = 0
+                    self._rotate_left(node_parent)
+                    sibling = right[node_parent]
+                # both nephews are black, recolour the sibling and move the extra black up
+                if black[left[sibling]] and black[right[sibling]]:
+                    black[sibling] = 0
+                    id = node_parent
+                    continue
+                # close nephew is red and distant is black, rotate it into the distant position
+                if black[right[sibling]]:
+                    black[left[sibling]] = 1
+                    black[sibling] = 0
+                    self._rotate_right(sibling)
+                    sibling = right[node_parent]
+                # distant nephew is red, rotate the sibling up to absorb the extra black
+                black[sibling] = black[node_parent]
+                black[node_parent] = 1
+                black[right[sibling]] = 1
+                self._rotate_left(node_parent)
+            else:
+                sibling = left[node_parent]
+                if not black[sibling]:
+                    black[sibling] = 1
+                    black[node_parent] = 0
+                    self._rotate_right(node_parent)
+                    sibling = left[node_parent]
+                if black[left[sibling]] and black[right[sibling]]:
+                    black[sibling] = 0
+                    id = node_parent
+                    continue
+                if black[left[sibling]]:
+                    black[right[sibling]] = 1
+                    black[sibling] = 0
+                    self._rotate_left(sibling)
+                    sibling = left[node_parent]
+                black[sibling] = black[node_parent]
+                black[node_parent] = 1
+                black[left[sibling]] = 1
+                self._rotate_right(node_parent)
+            id = self.root
+        black[id] = 1
+
+    # Ordered navigation, each returns nil when there is no such node
+
+    def first(self) -> ArrayNode:
+        return self.__node(self._minimum(self.root))
+
+    def last(self) -> ArrayNode:
+        return self.__node(self._maximum(self.root))
+
+    def floor(self, key) -> ArrayNode:
+        # The largest node with a key <= the given key
+        keys, left, right = self.keys, self.left, self.right
+        found = 0
+        curr = self.root
+        while curr:
+            if key < keys[curr]:
+                curr = left[curr]
+            else:
+                found = curr
+                curr = right[curr]
+        return self.__node(found)
+
+    def ceiling(self, key) -> ArrayNode:
+        # The smallest node with a key >= the given key
+        keys, left, right = self.keys, self.left, self.right
+        found = 0
+        curr = self.root
+        while curr:
+            if keys[curr] < key:
+                curr = right[curr]
+            else:
+                found = curr
+                curr = left[curr]
+        return self.__node(found)
+
+    def lower(self, key) -> ArrayNode:
+        # The largest node with a key < the given key
+        keys, left, right = self.keys, self.left, self.right
+        found = 0
+        curr = self.root
+        while curr:
+            if keys[curr] < key:
+                found = curr
+                curr = right[curr]
+            else:
+                curr = left[curr]
+        return self.__node(found)
+
+    def higher(self, key) -> ArrayNode:
+        # The smallest node with a key > the given key
+        keys, left, right = self.keys, self.left, self.right
+        found = 0
+        curr = self.root
+        while curr:
+            if key < keys[curr]:
+                found = curr
+                curr = left[curr]
+            else:
+                curr = right[curr]
+        return self.__node(found)
+
+    def range(self, lo = None, hi = None, inclusive = True):
+        # Bounds of None are open, and inclusive can be a (lo, hi) pair to set each bound separately
+        lo_inclusive, hi_inclusive = inclusive if isinstance(inclusive, tuple) else (inclusive, inclusive)
+        if lo is None:
+            start = self.first()
+        else:
+            start = self.ceiling(lo) if lo_inclusive else self.higher(lo)
+        for node in self.__nodes(start.id):
+            if hi is not None and (hi < node.key if hi_inclusive else not node.key < hi):
+                return
+            yield node
+
+    def iter(self):
+        return self.__nodes(self._minimum(self.root))
+
+    def __reversed__(self):
+        # The mirror of __nodes, a stack of the nodes still to visit from the largest down
+        left, right = self.left, self.right
+        mod_count = self.mod_count
+        stack = []
+        curr = self.root
+        while curr:
+            stack.append(curr)
+            curr = right[curr]
+        while stack:
+            curr = stack.pop()
+            yield ArrayNode((self, curr))
+            if self.mod_count != mod_count:
+                raise RuntimeError("tree changed during iteration")
+            curr = left[curr]
+            while curr:
+                stack.append(curr)
+                curr = right[curr]
+
+    def __node(self, id: int) -> ArrayNode:
+        return self.nil if id == 0 else ArrayNode((self, id))
+
+    def __nodes(self, start: int):
+        # The same steps as __ids, repeated rather than wrapped, as iteration is the hot path
+        left, right = self.left, self.right
+        mod_count = self.mod_count
+        stack = self.__ancestors(start)
+        while stack:
+            curr = stack.pop()
+            yield ArrayNode((self, curr))
+            if self.mod_count != mod_count:
+                raise RuntimeError("tree changed during iteration")
+            curr = right[curr]
+            while curr:
+                stack.append(curr)
+                curr = left[curr]
+
+    def __ids(self, start: int):
+        # The ids in key order from start, with a stack of the nodes still to visit, the next on top
+        left, right = self.left, self.right
+        mod_count = self.mod_count
+        stack = self.__ancestors(start)
+        while stack:
+            curr = stack.pop()
+            yield curr
+            if self.mod_count != mod_count:
+                raise RuntimeError("tree changed during iteration")
+            curr = right[curr]
+            while curr:
+                stack.append(curr)
+                curr = left[curr]
+
+    def __ancestors(self, start: int) -> list:
+        # The start and the parents reached from a left subtree, the nodes that follow it in key order
+        left, parent = self.left, self.parent
+        stack = []
+        child = start
+        curr = parent[start] if start else 0
+        while curr:
+            if child == left[curr]:
+                stack.append(curr)
+            child = curr
+            curr = parent[curr]
+        stack.reverse()
+        if start:
+            stack.append(start)
+        return stack
@@ -0,0 +1,799 @@
+import argparse
+import io
+import json
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from tree import Tree, AVLTree, RBTree, SizedAVLTree, SizedRBTree, TreeIterator
+from array_tree import ArrayRBTree
+from bplus_tree import BPlusTree
+from persistent_tree import PersistentRBTree
+from tree_map import TreeMap
+from concurrent_tree_map import ConcurrentTreeMap
+from document import Document
+from cache import LRUCache, ClockCache
+from cached_tree_map import CachedTreeMap
+import serialization
+import ingestion
+import corpus
+from stats import InstrumentedRBTree
+
+# Reproducible benchmarks for the trees and TreeMap.
+#
+#   python benchmark.py                                 all suites, printed as JSON
+#   python benchmark.py operations --sizes 1000 10000   selected suites and sizes
+#   python benchmark.py --output baseline.json          save results as a baseline
+#   python benchmark.py --compare baseline.json         report changes against a baseline
+#
+# Every result is a record with a value where lower is better, and comparing exits with 1
+# when any value grew beyond the threshold.
+
+SIZES = (1_000, 10_000, 100_000, 1_000_000)
+ORDERS = ("sequential", "random", "adversarial")
+STRUCTURES = {
+    "Tree": Tree,
+    "AVLTree": AVLTree,
+    "RBTree": RBTree,
+    "ArrayRBTree": ArrayRBTree,
+    "BPlusTree": BPlusTree,
+    "PersistentRBTree": PersistentRBTree,
+    "TreeMap": TreeMap,
+    # The index modes of TreeMap, the default above keeps a dict of values
+    "TreeMap(node)": lambda: TreeMap(mode="node"),
+    "TreeMap(ordered)": lambda: TreeMap(mode="ordered"),
+    # The cost of counting, against RBTree
+    "InstrumentedRBTree": InstrumentedRBTree,
+}
+# Sorted input degrades the unbalanced Tree into a list, so it is only run to this size
+UNBALANCED_LIMIT = 10_000
+
+def keys_in_order(order: str, size: int) -> list:
+    keys = list(range(size))
+    if order == "random":
+        random.Random(size).shuffle(keys)
+    elif order == "adversarial":
+        # Alternating extremes, the longest zig-zag path for a plain tree and repeated double rotations otherwise
+        keys = [keys[i // 2] if i % 2 == 0 else keys[size - 1 - i // 2] for i in range(size)]
+    return keys
+
+def skipped(structure: str, order: str, size: int) -> bool:
+    return structure == "Tree" and order != "random" and size > UNBALANCED_LIMIT
+
+def record(suite: str, benchmark: str, structure: str, size: int, value: float, unit: str = "s", **params) -> dict:
+    result = {"suite": suite, "benchmark": benchmark, "structure": structure, "size": size}
+    result.update(params)
+    result["value"] = value
+    result["unit"] = unit
+    return result
+
+def timed(operation) -> float:
+    start = time.perf_counter()
+    operation()
+    return time.perf_counter() - start
+
+# Operations: insert, find, iteration and delete on one structure, then a mixed workload
+
+def operation_timings(structure_type, keys: list) -> dict:
+    structure = structure_type()
+    timings = {}
+
+    def insert():
+        for key in keys:
+            structure.insert(key, key)
+
+    def find():
+        for key in keys:
+            structure.find(key)
+
+    def iterate():
+        for item in structure.iter():
+            pass
+
+    def delete():
+        for key in keys:
+            structure.delete(key)
+
+    # The same structure is reused, so each step runs on the result of the previous one
+    timings["insert"] = timed(insert)
+    timings["find"] = timed(find)
+    timings["iterate"] = timed(iterate)
+    timings["delete"] = timed(delete)
+    return timings
+
+def mixed_timing(structure_type, keys: list) -> float:
+    # The first half is loaded, then each step inserts the next key, finds a random key and deletes the oldest
+    half = len(keys) // 2
+    structure = structure_type()
+    for key in keys[:half]:
+        structure.insert(key, key)
+    lookups = random.Random(len(keys)).choices(keys, k=len(keys) - half)
+
+    def mixed():
+        for i in range(half, len(keys)):
+            structure.insert(keys[i], keys[i])
+            structure.find(lookups[i - half])
+            structure.delete(keys[i - half])
+
+    return timed(mixed)
+
+def operations_suite(config) -> list:
+    results = []
+    for size in config.sizes:
+        for order in config.orders:
+            keys = keys_in_order(order, size)
+            for structure in config.structures:
+                if skipped(structure, order, size):
+                    continue
+                structure_type = STRUCTURES[structure]
+                best = {}
+                for i in range(config.repeat):
+                    timings = operation_timings(structure_type, keys)
+                    timings["mixed"] = mixed_timing(structure_type, keys)
+                    for benchmark, seconds in timings.items():
+                        best[benchmark] = min(seconds, best.get(benchmark, seconds))
+                for benchmark, seconds in best.items():
+                    results.append(record("operations", benchmark, structure, size, seconds, order=order))
+    return results
+
+# Memory: bytes per stored entry with slotted nodes, against the dict-based layout they replaced
+
+class DictNode:
+
+    def __init__(self, key: any, data: any = None, parent = None, left = None, right = None):
+        self.key = key
+        self.data = data
+        self.left = left
+        self.right = right
+        self.parent = parent
+
+class DictAVLNode(DictNode):
+
+    def __init__(self, key: any, data: any = None, parent = None, left = None, right = None):
+        super().__init__(key, data, parent, left, right)
+        self.height = 0 if self.key is None else 1
+
+class DictRBNode(DictNode):
+
+    def __init__(self, key: any, data: any = None, parent = None, left = None, right = None):
+        super().__init__(key, data, parent, left, right)
+        self.black = True
+
+DICT_NODES = {"Tree": DictNode, "AVLTree": DictAVLNode, "RBTree": DictRBNode}
+
+def traced_bytes(build) -> int:
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = build()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    # Keep the result alive until the measurement is taken
+    del result
+    return after - before
+
+def bytes_per_entry(structure_type, size: int) -> float:
+    # Keys are allocated up front so only the structure is measured
+    keys = list(range(1_000_000, 1_000_000 + size))
+    # Sequential keys would degrade the unbalanced Tree into a list
+    random.Random(0).shuffle(keys)
+
+    def build():
+        structure = structure_type()
+        for key in keys:
+            structure.insert(key, None)
+        return structure
+
+    return traced_bytes(build) / size
+
+def dict_bytes_per_entry(dict_node_type, size: int) -> float:
+    keys = list(range(1_000_000, 1_000_000 + size))
+
+    def build():
+        nodes = []
+        for key in keys:
+            nodes.append(dict_node_type(key, None))
+        return nodes
+
+    # The list holding the dict nodes is not part of a tree, so it is excluded
+    list_bytes = traced_bytes(lambda: [None] * size)
+    return (traced_bytes(build) - list_bytes) / size
+
+def memory_suite(config) -> list:
+    results = []
+    for size in config.sizes:
+        for structure in config.structures:
+            results.append(record("memory", "bytes_per_entry", structure, size,
+                                  bytes_per_entry(STRUCTURES[structure], size), "B"))
+            if structure in DICT_NODES:
+                results.append(record("memory", "dict_bytes_per_entry", structure, size,
+                                      dict_bytes_per_entry(DICT_NODES[structure], size), "B"))
+    return results
+
+# Batch: single inserts against a forced rebuild and insert_many, the crossover is where a rebuild wins
+
+def batch_timings(tree_type, size: int, batch_size: int) -> dict:
+    # Even keys are in the tree, the batch inserts odd keys in random order
+    items = [(key, None) for key in range(0, 2 * size, 2)]
+    batch = [(2 * rand + 1, None) for rand in random.Random(batch_size).sample(range(size), batch_size)]
+
+    def timed_insert(insert) -> float:
+        tree = tree_type.from_sorted(items)
+        return timed(lambda: insert(tree))
+
+    def singles(tree):
+        for key, data in batch:
+            tree.insert(key, data)
+
+    def rebuild(tree):
+        tree._rebuild_cheaper = lambda batch_size: True
+        tree.insert_many(batch)
+
+    return {
+        "singles": timed_insert(singles),
+        "rebuild": timed_insert(rebuild),
+        "insert_many": timed_insert(lambda tree: tree.insert_many(batch)),
+    }
+
+def batch_suite(config) -> list:
+    results = []
+    for size in config.sizes:
+        for structure in config.structures:
+            if structure not in ("AVLTree", "RBTree", "ArrayRBTree", "BPlusTree"):
+                continue
+            batch_size = max(1, size // 512)
+            while batch_size <= size:
+                timings = batch_timings(STRUCTURES[structure], size, batch_size)
+                for benchmark, seconds in timings.items():
+                    results.append(record("batch", benchmark, structure, size, seconds, batch=batch_size))
+                batch_size *= 2
+    return results
+
+# Snapshot: the memory each write keeps while a snapshot holds the previous version
+
+SNAPSHOT_WRITES = 1_000
+
+def snapshot_bytes_per_write(tree_type, size: int) -> float:
+    tree = tree_type.from_sorted([(key, None) for key in range(0, 2 * size, 2)])
+    snapshot = tree.snapshot()
+    keys = random.Random(size).sample(range(1, 2 * size, 2), min(size, SNAPSHOT_WRITES))
+
+    def write():
+        for key in keys:
+            tree.insert(key, None)
+        return tree
+
+    # The snapshot keeps every replaced node alive, so the growth is the nodes copied by each write
+    written = traced_bytes(write)
+    del snapshot
+    return written / len(keys)
+
+def snapshot_suite(config) -> list:
+    results = []
+    for size in config.sizes:
+        for structure in config.structures:
+            if not hasattr(STRUCTURES[structure], "snapshot"):
+                continue
+            results.append(record("snapshot", "bytes_per_write", structure, size,
+                                  snapshot_bytes_per_write(STRUCTURES[structure], size), "B"))
+    return results
+
+# Threads: a fixed number of operations on a shared ConcurrentTreeMap, split between threads.
+# Without a GIL the time should fall as threads are added, with it the lock overhead shows.
+
+THREAD_COUNTS = (1, 2, 4, 8)
+THREAD_OPERATIONS = 40_000
+# The share of finds in each workload, the rest are inserts and deletes in equal parts
+THREAD_WORKLOADS = {"read": 1.0, "mixed": 0.8}
+
+def threaded_timing(size: int, threads: int, find_share: float) -> float:
+    map = ConcurrentTreeMap()
+    map.bulk_load([(key, key) for key in range(0, 2 * size, 2)])
+    per_thread = THREAD_OPERATIONS // threads
+    barrier = threading.Barrier(threads)
+    # Each worker times its own loop, a thread may start working before another returns from the barrier
+    starts = [0.0] * threads
+    ends = [0.0] * threads
+
+    def work(seed: int):
+        rand = random.Random(seed)
+        keys = [rand.randrange(2 * size) for i in range(per_thread)]
+        ops = [rand.random() for i in range(per_thread)]
+        barrier.wait()
+        starts[seed] = time.perf_counter()
+        for key, op in zip(keys, ops):
+            if op < find_share:
+                map.find(key)
+            elif op < (1 + find_share) / 2:
+                map.insert(key, key)
+            else:
+                map.delete(key)
+        ends[seed] = time.perf_counter()
+
+    workers = [threading.Thread(target=work, args=(seed,)) for seed in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return max(ends) - min(starts)
+
+def threads_suite(config) -> list:
+    results = []
+    for size in config.sizes:
+        for workload, find_share in THREAD_WORKLOADS.items():
+            for threads in THREAD_COUNTS:
+                seconds = min(threaded_timing(size, threads, find_share) for i in range(config.repeat))
+                results.append(record("threads", workload, "ConcurrentTreeMap", size, seconds, threads=threads))
+    return results
+
+# Document: the cost of each document operation divided by its bound in the README, per operation.
+# A value that stays flat as the size grows means the operation meets its bound.
+
+DOCUMENT_OPERATIONS = 1_000
+# The elements of each deleted section, the k of its O(k + log n) bound
+DOCUMENT_SECTION_SIZE = 8
+# References from and to each element of a deleted section in a reference-dense document, the r of
+# its O(k + r + log n) bound
+DOCUMENT_REFERENCES = 4
+
+def document_timings(size: int) -> dict:
+    rand = random.Random(size)
+    operations = min(size, DOCUMENT_OPERATIONS)
+    timings = {}
+
+    # A section of size elements, the new elements go between existing ones
+    document = Document()
+    section = document.add_section((), "elements")
+    for i in range(size):
+        document.add_element(section.path, i)
+    orders = [order + 0.5 for order in rand.sample(range(size), operations)]
+    timings["element_insert"] = timed(lambda: [document.add_element(section.path, order, order) for order in orders])
+    ids = [element.id for element in rand.sample(list(document.walk(section.path)), operations)]
+    timings["element_fetch"] = timed(lambda: [document.element(id) for id in ids])
+    timings["element_delete"] = timed(lambda: [document.delete_element(id) for id in ids])
+
+    # size sections below the root, each with a few elements
+    document = Document()
+    for i in range(size):
+        document.add_section((), i)
+    labels = rand.sample(range(size), operations)
+    for label in labels:
+        for j in range(DOCUMENT_SECTION_SIZE):
+            document.add_element((label,), j)
+    timings["section_insert"] = timed(lambda: [document.add_section((), size + i) for i in range(operations)])
+    timings["section_fetch"] = timed(lambda: [document.section((label,)) for label in labels])
+    timings["section_delete"] = timed(lambda: [document.delete_section((label,)) for label in labels])
+
+    # The same sections, their elements referencing and referenced by elements of other sections,
+    # which also reference each other with size references in all
+    document = Document()
+    for i in range(size):
+        document.add_section((), i)
+    others = [document.add_element((label,), "other").id for label in rand.sample(range(size), operations)]
+    for i in range(size):
+        document.add_reference(("other", i), rand.choice(others), rand.choice(others))
+    for label in labels:
+        for j in range(DOCUMENT_SECTION_SIZE):
+            element = document.add_element((label,), j)
+            for r in range(DOCUMENT_REFERENCES):
+                document.add_reference((element.id, "to", r), element.id, rand.choice(others))
+                document.add_reference((element.id, "from", r), rand.choice(others), element.id)
+    timings["referenced_section_delete"] = timed(lambda: [document.delete_section((label,)) for label in labels])
+    return timings
+
+def document_suite(config) -> list:
+    results = []
+    for size in config.sizes:
+        log_size = max(1, math.log2(size))
+        bounds = {
+            "element_insert": log_size,
+            "element_fetch": 1,
+            "element_delete": log_size,
+            "section_insert": log_size,
+            "section_fetch": 1,
+            "section_delete": DOCUMENT_SECTION_SIZE + log_size,
+            "referenced_section_delete": DOCUMENT_SECTION_SIZE * (1 + 2 * DOCUMENT_REFERENCES) + log_size,
+        }
+        best = {}
+        for i in range(config.repeat):
+            for benchmark, seconds in document_timings(size).items():
+                best[benchmark] = min(seconds, best.get(benchmark, seconds))
+        operations = min(size, DOCUMENT_OPERATIONS)
+        for benchmark, seconds in best.items():
+            results.append(record("document", benchmark, "Document", size,
+                                  seconds / operations / bounds[benchmark], "s/bound"))
+    return results
+
+# Traversal: seconds per element of a walk of one section, a compiled plan against the plain tree
+# iterator it is built on. Every CONDITION_SPACING-th element carries a condition.
+
+CONDITION_SPACING = 8
+
+def traversal_timings(size: int) -> dict:
+    document = Document()
+    section = document.add_section((), "elements")
+    for i in range(size):
+        document.add_element(section.path, i)
+    plain = document.plan(section.path)
+    plain.compile()
+    stateless = document.add_element((), lambda element: True)
+    stateful = document.add_element((), lambda element, state: True)
+    conditioned = document.add_section((), "conditioned")
+    state_conditioned = document.add_section((), "state_conditioned")
+    for target, function in ((conditioned, stateless), (state_conditioned, stateful)):
+        for i in range(size):
+            element = document.add_element(target.path, i)
+            if i % CONDITION_SPACING == 0:
+                document.add_reference((target.label, i), element.id, function.id)
+    plans = {"plan": plain, "plan_conditions": document.plan(conditioned.path),
+             "plan_state_conditions": document.plan(state_conditioned.path)}
+
+    def walk(plan):
+        for element in plan.walk():
+            pass
+
+    def iterate():
+        for node in TreeIterator(section.elements.tree):
+            pass
+
+    timings = {"tree_iterator": timed(iterate), "compile": timed(plans["plan_conditions"].compile)}
+    for benchmark, plan in plans.items():
+        plan.compile()
+        timings[benchmark] = timed(lambda: walk(plan))
+    return timings
+
+def traversal_suite(config) -> list:
+    results = []
+    for size in config.sizes:
+        best = {}
+        for i in range(config.repeat):
+            for benchmark, seconds in traversal_timings(size).items():
+                best[benchmark] = min(seconds, best.get(benchmark, seconds))
+        for benchmark, seconds in best.items():
+            results.append(record("traversal", benchmark, "Document", size, seconds / size, "s/element"))
+    return results
+
+# Cache: finds on a CachedTreeMap holding a tenth of its values, with keys drawn from a skewed
+# distribution where a few keys are found most often. Reports the time and the share of misses.
+
+CACHES = {"LRUCache": LRUCache, "ClockCache": ClockCache}
+CACHE_FINDS = 100_000
+
+def cache_timings(cache_type, size: int) -> dict:
+    map = CachedTreeMap(lambda key: key, cache=cache_type(max(1, size // 10)))
+    map.bulk_load((key, key) for key in range(size))
+    rand = random.Random(size)
+    keys = [min(size - 1, int(rand.paretovariate(1.2)) - 1) for i in range(CACHE_FINDS)]
+    map.cache.reset_stats()
+
+    def find():
+        for key in keys:
+            map.find(key)
+
+    seconds = timed(find)
+    return {"find": seconds, "miss_ratio": 1 - map.cache.stats()["hit_ratio"]}
+
+def cache_suite(config) -> list:
+    results = []
+    for size in config.sizes:
+        for cache, cache_type in CACHES.items():
+            timings = cache_timings(cache_type, size)
+            results.append(record("cache", "find", cache, size, timings["find"]))
+            results.append(record("cache", "miss_ratio", cache, size, timings["miss_ratio"], "ratio"))
+    return results
+
+# Serialization: loading a written tree against building it again by n inserts, and the size of
+# the file per entry, with and without the shape stream
+
+SERIALIZED = ("AVLTree", "RBTree", "ArrayRBTree", "BPlusTree")
+
+def serialization_timings(tree_type, size: int) -> dict:
+    keys = keys_in_order("random", size)
+    timings = {}
+    tree = tree_type()
+
+    def insert():
+        for key in keys:
+            tree.insert(key, key)
+
+    timings["insert"] = timed(insert)
+    with tempfile.TemporaryFile() as file:
+        for shape in (False, True) if serialization._shape_kind(tree) else (False,):
+            suffix = "_shape" if shape else ""
+            file.seek(0)
+            file.truncate()
+            timings["dump" + suffix] = timed(lambda: serialization.dump(tree, file, shape))
+            timings["bytes_per_entry" + suffix] = file.tell() / size
+            file.seek(0)
+            timings["load" + suffix] = timed(lambda: serialization.load(file, tree_type))
+    return timings
+
+def serialization_suite(config) -> list:
+    results = []
+    for size in config.sizes:
+        for structure in config.structures:
+            if structure not in SERIALIZED:
+                continue
+            best = {}
+            for i in range(config.repeat):
+                for benchmark, value in serialization_timings(STRUCTURES[structure], size).items():
+                    best[benchmark] = min(value, best.get(benchmark, value))
+            for benchmark, value in best.items():
+                unit = "B" if benchmark.startswith("bytes") else "s"
+                results.append(record("serialization", benchmark, structure, size, value, unit))
+    return results
+
+# Ingestion: a document of size lines streamed into a TreeMap, against reading it whole and
+# inserting its lines. Memory is the peak beyond the finished map, which streaming keeps to the
+# chunk and batch while reading whole needs the document and its lines.
+
+def ingestion_document(size: int) -> bytes:
+    lines = []
+    for i in range(size):
+        lines.append(f"# Section {i // 16}" if i % 16 == 0 else f"element {i} of the document")
+    return "\n".join(lines).encode()
+
+def ingestion_results(size: int) -> dict:
+    document = ingestion_document(size)
+
+    def streamed():
+        map = TreeMap()
+        ingestion.ingest(map, io.BytesIO(document))
+        return map
+
+    def whole():
+        map = TreeMap()
+        stream = io.BytesIO(document)
+        entries = ingestion.parse_sections(ingestion.split_lines([stream.read()]))
+        for key, value, offset in list(entries):
+            map.insert(key, value)
+        return map
+
+    results = {}
+    for name, run in (("streamed", streamed), ("whole", whole)):
+        results[name] = timed(run)
+        tracemalloc.start()
+        try:
+            map = run()
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        del map
+        results[name + "_peak_bytes"] = peak - current
+    return results
+
+def ingestion_suite(config) -> list:
+    results = []
+    for size in config.sizes:
+        for benchmark, value in ingestion_results(size).items():
+            unit = "B" if benchmark.endswith("bytes") else "s"
+            results.append(record("ingestion", benchmark, "TreeMap", size, value, unit))
+    return results
+
+# Corpus: a corpus of CORPUS_FILES documents with size lines in all, built one file after another
+# in this process against build_corpus with 1 up to every core. The time should fall as workers are
+# added, until the parent's merge of the runs dominates.
+
+CORPUS_FILES = 16
+
+def corpus_workers() -> list:
+    workers = [1]
+    while workers[-1] * 2 <= (os.cpu_count() or 1):
+        workers.append(workers[-1] * 2)
+    if workers[-1] != (os.cpu_count() or 1):
+        workers.append(os.cpu_count())
+    return workers
+
+def corpus_timings(size: int, repeat: int) -> dict:
+    timings = {}
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for i in range(CORPUS_FILES):
+            path = os.path.join(directory, f"{i}.md")
+            with open(path, "wb") as file:
+                file.write(ingestion_document(max(1, size // CORPUS_FILES)))
+            paths.append(path)
+
+        def serial():
+            for path in paths:
+                with open(path, "rb") as file:
+                    ingestion.ingest(TreeMap(), file)
+
+        timings[("serial", 1)] = min(timed(serial) for i in range(repeat))
+        for workers in corpus_workers():
+            timings[("build_corpus", workers)] = min(timed(lambda: corpus.build_corpus(paths, workers))
+                                                     for i in range(repeat))
+    return timings
+
+def corpus_suite(config) -> list:
+    results = []
+    for size in config.sizes:
+        for (benchmark, workers), seconds in corpus_timings(size, config.repeat).items():
+            results.append(record("corpus", benchmark, "TreeMap", size, seconds, workers=workers))
+    return results
+
+# Split and join: a run of a tenth of the keys moved to the end of the tree, by splitting it out
+# and joining it back against deleting and inserting each of its keys, and the run deleted from a
+# TreeMap with delete_range against deleting each key
+
+SPLIT_TREES = {
+    "SizedAVLTree": SizedAVLTree,
+    "SizedRBTree": SizedRBTree,
+}
+
+def split_timings(tree_type, size: int) -> dict:
+    run = max(size // 10, 1)
+    lo = size // 2
+    timings = {}
+
+    def split_join():
+        middle = tree.split(lo)
+        right = middle.split(lo + run)
+        tree.join(right)
+        # Renumbered to follow the last key, as a moved section would be
+        for node in middle.iter():
+            node.key += size
+        tree.join(middle)
+
+    def delete_insert():
+        nodes = [(node.key, node.data) for node in tree.range(lo, lo + run, (True, False))]
+        for key, data in nodes:
+            tree.delete(key)
+        for key, data in nodes:
+            tree.insert(key + size, data)
+
+    for benchmark, move in (("split_join", split_join), ("delete_insert", delete_insert)):
+        tree = tree_type.from_sorted(((key, key) for key in range(size)), size)
+        timings[benchmark] = timed(move)
+
+    # The same run dropped from a TreeMap, cut out at once against a delete per key
+    def delete_range():
+        map.delete_range(lo, lo + run, (True, False))
+
+    def delete_each():
+        for key in range(lo, lo + run):
+            map.delete(key)
+
+    for benchmark, delete in (("delete_range", delete_range), ("delete_each", delete_each)):
+        map = TreeMap(tree_type)
+        map.bulk_load(((key, key) for key in range(size)), size)
+        timings[benchmark] = timed(delete)
+    return timings
+
+def split_suite(config) -> list:
+    results = []
+    for size in config.sizes:
+        for structure, tree_type in SPLIT_TREES.items():
+            best = {}
+            for i in range(config.repeat):
+                for benchmark, value in split_timings(tree_type, size).items():
+                    best[benchmark] = min(value, best.get(benchmark, value))
+            for benchmark, value in best.items():
+                results.append(record("split", benchmark, structure, size, value))
+    return results
+
+# Keys: lookups in an ordered map keyed by (section, element) tuples, compared as they are against
+# a map with a key function that computes an int once per lookup
+
+def key_timings(size: int) -> dict:
+    items = [((("section", index // 100), index % 100), index) for index in range(size)]
+    probes = [key for key, value in random.Random(7).sample(items, min(size, 10_000))]
+    timings = {}
+    for benchmark, key in (("tuple_find", None), ("keyed_find", _element_position)):
+        map = TreeMap(RBTree, "ordered", key=key)
+        map.bulk_load(items, size)
+
+        def find():
+            for probe in probes:
+                map.find(probe)
+
+        timings[benchmark] = timed(find) / len(probes)
+    return timings
+
+def _element_position(key) -> int:
+    (label, section), element = key
+    return section * 100 + element
+
+def key_suite(config) -> list:
+    results = []
+    for size in config.sizes:
+        best = {}
+        for i in range(config.repeat):
+            for benchmark, value in key_timings(size).items():
+                best[benchmark] = min(value, best.get(benchmark, value))
+        for benchmark, value in best.items():
+            results.append(record("keys", benchmark, "RBTree", size, value))
+    return results
+
+SUITES = {
+    "operations": operations_suite,
+    "memory": memory_suite,
+    "batch": batch_suite,
+    "snapshot": snapshot_suite,
+    "threads": threads_suite,
+    "document": document_suite,
+    "traversal": traversal_suite,
+    "cache": cache_suite,
+    "serialization": serialization_suite,
+    "ingestion": ingestion_suite,
+    "corpus": corpus_suite,
+    "split": split_suite,
+    "keys": key_suite,
+}
+
+# Output and comparison
+
+def record_id(result: dict) -> tuple:
+    return tuple((key, value) for key, value in result.items() if key not in ("value", "unit"))
+
+def compare(results: list, baseline: list, threshold: float, out = sys.stderr) -> list:
+    # Returns the results whose value grew by more than the threshold (0.1 for 10%) over the baseline
+    baseline_values = {record_id(result): result["value"] for result in baseline}
+    regressions = []
+    for result in results:
+        before = baseline_values.get(record_id(result))
+        if before is None or before == 0:
+            continue
+        change = result["value"] / before - 1
+        flag = ""
+        if change > threshold:
+            flag = "REGRESSION"
+            regressions.append(result)
+        elif change < -threshold:
+            flag = "improved"
+        label = " ".join(str(value) for key, value in record_id(result))
+        print(f"{label:<60} {before:>12.6g} {result['value']:>12.6g} {change:>+8.1%} {flag}", file=out)
+    return regressions
+
+def parse_args(argv: list):
+    parser = argparse.ArgumentParser(description="Benchmark the trees and TreeMap.")
+    parser.add_argument("suites", nargs="*", help=f"suites to run, all by default: {', '.join(SUITES)}")
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(SIZES))
+    parser.add_argument("--orders", nargs="+", choices=ORDERS, default=list(ORDERS))
+    parser.add_argument("--structures", nargs="+", choices=list(STRUCTURES), default=list(STRUCTURES))
+    parser.add_argument("--repeat", type=int, default=3, help="runs per timing, the fastest is kept")
+    parser.add_argument("--output", help="file to write the JSON results to, instead of stdout")
+    parser.add_argument("--compare", help="baseline JSON file to compare the results against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative growth reported as a regression")
+    config = parser.parse_args(argv)
+    for suite in config.suites:
+        if suite not in SUITES:
+            parser.error(f"unknown suite {suite}, expected one of: {', '.join(SUITES)}")
+    config.suites = config.suites or list(SUITES)
+    return config
+
+def main(argv: list) -> int:
+    config = parse_args(argv)
+    results = []
+    for suite in config.suites:
+        results.extend(SUITES[suite](config))
+    output = {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        # False on free-threaded builds running without the GIL
+        "gil": sys._is_gil_enabled() if hasattr(sys, "_is_gil_enabled") else True,
+        "cpus": os.cpu_count(),
+        "results": results,
+    }
+    if config.output:
+        with open(config.output, "w") as file:
+            json.dump(output, file, indent=2)
+    else:
+        json.dump(output, sys.stdout, indent=2)
+        print()
+    if config.compare:
+        with open(config.compare) as file:
+            baseline = json.load(file)["results"]
+        if len(compare(results, baseline, config.threshold)) > 0:
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
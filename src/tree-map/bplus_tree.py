@@ -0,0 +1,467 @@
+from bisect import bisect_left, bisect_right
+from itertools import islice
+
+from tree import REBUILD_FACTOR, _item_key, _sized, _ascending
+
+# A B+tree, many keys to a node and all entries in the leaves, which are linked in key order.
+# A lookup follows log base order (n) nodes instead of log2(n), and a scan walks the lists of
+# consecutive leaves rather than climbing parent links between entries.
+#
+# The tree has the same API as RBTree, so it can back a TreeMap. The fan-out is set with
+# order, for example TreeMap(lambda: BPlusTree(order=128)). Results are the Entry of each key,
+# which keeps its identity while the tree changes around it.
+
+DEFAULT_ORDER = 128
+
+class Entry:
+
+    __slots__ = ('key', 'data')
+
+    def __init__(self, key: any, data: any = None):
+        self.key = key
+        self.data = data
+
+    def __repr__(self) -> str:
+        return f"[key: {self.key}, data: {self.data}]"
+
+class BPlusLeaf:
+
+    # keys is kept alongside entries so that it can be searched with bisect
+    __slots__ = ('keys', 'entries', 'prev', 'next')
+
+    def __init__(self, keys: list = None, entries: list = None):
+        self.keys = [] if keys is None else keys
+        self.entries = [] if entries is None else entries
+        self.prev = None
+        self.next = None
+
+    def __repr__(self) -> str:
+        return f"[leaf: {self.keys}]"
+
+class BPlusBranch:
+
+    # keys[i] separates children[i] from children[i + 1], it is <= every key in children[i + 1]
+    __slots__ = ('keys', 'children')
+
+    def __init__(self, keys: list = None, children: list = None):
+        self.keys = [] if keys is None else keys
+        self.children = [] if children is None else children
+
+    def __repr__(self) -> str:
+        return f"[branch: {self.keys}]"
+
+class BPlusTree:
+
+    def __init__(self, order: int = DEFAULT_ORDER):
+        # The most entries in a leaf and children of a branch, each node is kept at least half full
+        if order < 3:
+            raise Exception(f"order must be at least 3, not {order}")
+        self.order = order
+        self.nil = Entry(None, None)
+        self.root = BPlusLeaf()
+        # The number of branch levels above the leaves
+        self.height = 0
+        # Incremented on every structural change, so iterators can detect modification
+        self.mod_count = 0
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def find(self, key) -> Entry:
+        leaf = self._leaf(key)
+        i = bisect_left(leaf.keys, key)
+        if i < len(leaf.keys) and not key < leaf.keys[i]:
+            return leaf.entries[i]
+        return self.nil
+
+    def insert(self, key, data) -> Entry:
+        if key is None:
+            raise Exception("key cannot be none")
+        path = []
+        node = self.root
+        for level in range(self.height):
+            i = bisect_right(node.keys, key)
+            path.append((node, i))
+            node = node.children[i]
+        i = bisect_left(node.keys, key)
+        if i < len(node.keys) and not key < node.keys[i]:
+            # duplicate key, ignore insert
+            return node.entries[i]
+        entry = Entry(key, data)
+        node.keys.insert(i, key)
+        node.entries.insert(i, entry)
+        self.mod_count += 1
+        self.size += 1
+        if len(node.keys) > self.order:
+            self._split(node, path)
+        return entry
+
+    def delete(self, key) -> bool:
+        return self.delete_node(self.find(key))
+
+    def delete_node(self, to_delete: Entry) -> bool:
+        # Deletes an entry of this tree, such as one returned by insert or find
+        if to_delete is None or to_delete is self.nil:
+            return False
+        key = to_delete.key
+        path = []
+        node = self.root
+        for level in range(self.height):
+            i = bisect_right(node.keys, key)
+            path.append((node, i))
+            node = node.children[i]
+        i = bisect_left(node.keys, key)
+        if i == len(node.keys) or node.entries[i] is not to_delete:
+            return False
+        del node.keys[i]
+        del node.entries[i]
+        self.mod_count += 1
+        self.size -= 1
+        if len(node.keys) < self.order // 2 and len(path) > 0:
+            self._balance_delete(node, path)
+        return True
+
+    def insert_many(self, items) -> list:
+        # Sorts the (key, data) pairs, then inserts each or merges them into a rebuilt tree when that is cheaper.
+        # Returns the entry holding each key in ascending key order, like insert does for a single key.
+        batch = sorted(items, key=_item_key)
+        if len(batch) == 0:
+            return []
+        if not self._rebuild_cheaper(len(batch)):
+            return [self.insert(key, data) for key, data in batch]
+        entries = list(self.iter())
+        merged = []
+        placed = []
+        i = 0
+        for key, data in batch:
+            if key is None:
+                raise Exception("key cannot be none")
+            while i < len(entries) and entries[i].key < key:
+                merged.append(entries[i])
+                i += 1
+            # duplicate key (of the tree, or earlier in the batch), ignore insert
+            if i < len(entries) and not key < entries[i].key:
+                placed.append(entries[i])
+                continue
+            if len(merged) > 0 and not merged[-1].key < key:
+                placed.append(merged[-1])
+                continue
+            merged.append(Entry(key, data))
+            placed.append(merged[-1])
+        merged.extend(entries[i:])
+        self._build_entries(merged)
+        return placed
+
+    def delete_many(self, keys) -> int:
+        # Sorts the keys, then deletes each or rebuilds the tree from the remaining entries when that is cheaper
+        keys = sorted(keys)
+        if len(keys) == 0:
+            return 0
+        if not self._rebuild_cheaper(len(keys)):
+            deleted = 0
+            for key in keys:
+                if self.delete(key):
+                    deleted += 1
+            return deleted
+        remaining = []
+        i = 0
+        for entry in self.iter():
+            while i < len(keys) and keys[i] < entry.key:
+                i += 1
+            if i < len(keys) and not entry.key < keys[i]:
+                continue
+            remaining.append(entry)
+        deleted = self.size - len(remaining)
+        if deleted > 0:
+            self._build_entries(remaining)
+        return deleted
+
+    @classmethod
+    def from_sorted(cls, items, count: int = None, order: int = DEFAULT_ORDER):
+        # Builds the tree in O(n) from (key, data) pairs in ascending key order, with the nodes filled evenly
+        tree = cls(order)
+        tree._build_sorted(items, count)
+        return tree
+
+    def validate(self) -> bool:
+        # Raises on the first node that breaks the ordering, node sizes or leaf links, otherwise True
+        leaves = []
+        self.__validate_node(self.root, self.height, None, None, leaves)
+        prev = None
+        for leaf in leaves:
+            if leaf.prev is not prev or (prev is not None and prev.next is not leaf):
+                raise Exception(f"Leaf is not linked to the leaf before it. {leaf}")
+            prev = leaf
+        if prev is not None and prev.next is not None:
+            raise Exception(f"The last leaf links to another leaf. {prev}")
+        count = sum(len(leaf.keys) for leaf in leaves)
+        if count != self.size:
+            raise Exception(f"The tree has {count} entries, not its size of {self.size}")
+        return True
+
+    def __validate_node(self, node, height: int, lo, hi, leaves: list):
+        # Every key in the node is >= lo and < hi, the bounds from the separators above it
+        is_root = node is self.root
+        for i, key in enumerate(node.keys):
+            if (lo is not None and key < lo) or (hi is not None and not key < hi):
+                raise Exception(f"Node has a key outside of its separators. {node}")
+            if i > 0 and not node.keys[i - 1] < key:
+                raise Exception(f"Node is out of order. {node}")
+        if height == 0:
+            if not isinstance(node, BPlusLeaf):
+                raise Exception(f"Leaves are at different depths. {node}")
+            if [entry.key for entry in node.entries] != node.keys:
+                raise Exception(f"Leaf keys do not match its entries. {node}")
+            if len(node.keys) > self.order or (not is_root and len(node.keys) < self.order // 2):
+                raise Exception(f"Leaf has {len(node.keys)} entries. {node}")
+            leaves.append(node)
+            return
+        if not isinstance(node, BPlusBranch):
+            raise Exception(f"Leaves are at different depths. {node}")
+        if len(node.children) != len(node.keys) + 1:
+            raise Exception(f"Branch has {len(node.children)} children for {len(node.keys)} keys. {node}")
+        minimum = 2 if is_root else (self.order + 1) // 2
+        if len(node.children) > self.order or len(node.children) < minimum:
+            raise Exception(f"Branch has {len(node.children)} children. {node}")
+        for i, child in enumerate(node.children):
+            child_lo = lo if i == 0 else node.keys[i - 1]
+            child_hi = hi if i == len(node.keys) else node.keys[i]
+            self.__validate_node(child, height - 1, child_lo, child_hi, leaves)
+
+    # General node-manipulating methods
+
+    def _leaf(self, key) -> BPlusLeaf:
+        node = self.root
+        for level in range(self.height):
+            node = node.children[bisect_right(node.keys, key)]
+        return node
+
+    def _first_leaf(self) -> BPlusLeaf:
+        node = self.root
+        for level in range(self.height):
+            node = node.children[0]
+        return node
+
+    def _last_leaf(self) -> BPlusLeaf:
+        node = self.root
+        for level in range(self.height):
+            node = node.children[-1]
+        return node
+
+    def _rebuild_cheaper(self, batch_size: int) -> bool:
+        # The same measure as the binary trees, see Tree._rebuild_cheaper
+        return batch_size * REBUILD_FACTOR * (self.size + batch_size).bit_length() >= self.size + batch_size
+
+    def _split(self, node, path: list):
+        # Splits the overfull node in two, then each parent the new node overfills in turn
+        while len(node.keys if isinstance(node, BPlusLeaf) else node.children) > self.order:
+            if isinstance(node, BPlusLeaf):
+                middle = len(node.keys) // 2
+                right = BPlusLeaf(node.keys[middle:], node.entries[middle:])
+                del node.keys[middle:]
+                del node.entries[middle:]
+                right.prev = node
+                right.next = node.next
+                if node.next is not None:
+                    node.next.prev = right
+                node.next = right
+                separator = right.keys[0]
+            else:
+                middle = (len(node.children) + 1) // 2
+                right = BPlusBranch(node.keys[middle:], node.children[middle:])
+                separator = node.keys[middle - 1]
+                del node.keys[middle - 1:]
+                del node.children[middle:]
+            if len(path) == 0:
+                self.root = BPlusBranch([separator], [node, right])
+                self.height += 1
+                return
+            node, i = path.pop()
+            node.keys.insert(i, separator)
+            node.children.insert(i + 1, right)
+
+    def _balance_delete(self, node, path: list):
+        # Refills the underfull node from a sibling, or merges it with one, then fixes each parent merging left short
+        while len(path) > 0:
+            parent, i = path.pop()
+            left = parent.children[i - 1] if i > 0 else None
+            right = parent.children[i + 1] if i + 1 < len(parent.children) else None
+            if isinstance(node, BPlusLeaf):
+                minimum = self.order // 2
+                if left is not None and len(left.keys) > minimum:
+                    node.keys.insert(0, left.keys.pop())
+                    node.entries.insert(0, left.entries.pop())
+                    parent.keys[i - 1] = node.keys[0]
+                    return
+                if right is not None and len(right.keys) > minimum:
+                    node.keys.append(right.keys.pop(0))
+                    node.entries.append(right.entries.pop(0))
+                    parent.keys[i] = right.keys[0]
+                    return
+                # Merge into the left one of the pair, and unlink the right one
+                if left is None:
+                    left, node, i = node, right, i + 1
+                left.keys.extend(node.keys)
+                left.entries.extend(node.entries)
+                left.next = node.next
+                if node.next is not None:
+                    node.next.prev = left
+            else:
+                minimum = (self.order + 1) // 2
+                if left is not None and len(left.children) > minimum:
+                    node.keys.insert(0, parent.keys[i - 1])
+                    node.children.insert(0, left.children.pop())
+                    parent.keys[i - 1] = left.keys.pop()
+                    return
+                if right is not None and len(right.children) > minimum:
+                    node.keys.append(parent.keys[i])
+                    node.children.append(right.children.pop(0))
+                    parent.keys[i] = right.keys.pop(0)
+                    return
+                if left is None:
+                    left, node, i = node, right, i + 1
+                left.keys.append(parent.keys[i - 1])
+                left.keys.extend(node.keys)
+                left.children.extend(node.children)
+            del parent.keys[i - 1]
+            del parent.children[i]
+            if parent is self.root:
+                # A root with a single child is replaced by it, the tree becomes one level shorter
+                if len(parent.children) == 1:
+                    self.root = parent.children[0]
+                    self.height -= 1
+                return
+            if len(parent.children) >= (self.order + 1) // 2:
+                return
+            node = parent
+
+    def _build_sorted(self, items, count: int = None):
+        if count is None:
+            items, count = _sized(items)
+        entries = [Entry(key, data) for key, data in islice(_ascending(items), count)]
+        if len(entries) < count:
+            raise Exception("items ended before the expected count")
+        self._build_entries(entries)
+
+    def _build_entries(self, entries: list):
+        # Fills leaves and then each level of branches evenly, so every node is at least half full
+        leaves = []
+        for start, end in _spans(len(entries), self.order):
+            part = entries[start:end]
+            leaf = BPlusLeaf([entry.key for entry in part], part)
+            if len(leaves) > 0:
+                leaf.prev = leaves[-1]
+                leaves[-1].next = leaf
+            leaves.append(leaf)
+        if len(leaves) == 0:
+            leaves.append(BPlusLeaf())
+        # The smallest key under each node, the separator placed before it in its parent
+        level = leaves
+        lows = [leaf.keys[0] if len(leaf.keys) > 0 else None for leaf in leaves]
+        height = 0
+        while len(level) > 1:
+            branches = []
+            branch_lows = []
+            for start, end in _spans(len(level), self.order):
+                branches.append(BPlusBranch(lows[start + 1:end], level[start:end]))
+                branch_lows.append(lows[start])
+            level = branches
+            lows = branch_lows
+            height += 1
+        self.root = level[0]
+        self.height = height
+        self.size = len(entries)
+        self.mod_count += 1
+
+    # Ordered navigation, each returns nil when there is no such entry
+
+    def first(self) -> Entry:
+        leaf = self._first_leaf()
+        return leaf.entries[0] if len(leaf.entries) > 0 else self.nil
+
+    def last(self) -> Entry:
+        leaf = self._last_leaf()
+        return leaf.entries[-1] if len(leaf.entries) > 0 else self.nil
+
+    def floor(self, key) -> Entry:
+        # The largest entry with a key <= the given key
+        leaf = self._leaf(key)
+        return self.__before(leaf, bisect_right(leaf.keys, key))
+
+    def ceiling(self, key) -> Entry:
+        # The smallest entry with a key >= the given key
+        leaf = self._leaf(key)
+        return self.__from(leaf, bisect_left(leaf.keys, key))
+
+    def lower(self, key) -> Entry:
+        # The largest entry with a key < the given key
+        leaf = self._leaf(key)
+        return self.__before(leaf, bisect_left(leaf.keys, key))
+
+    def higher(self, key) -> Entry:
+        # The smallest entry with a key > the given key
+        leaf = self._leaf(key)
+        return self.__from(leaf, bisect_right(leaf.keys, key))
+
+    def range(self, lo = None, hi = None, inclusive = True):
+        # Bounds of None are open, and inclusive can be a (lo, hi) pair to set each bound separately
+        lo_inclusive, hi_inclusive = inclusive if isinstance(inclusive, tuple) else (inclusive, inclusive)
+        if lo is None:
+            leaf, i = self._first_leaf(), 0
+        else:
+            leaf = self._leaf(lo)
+            i = bisect_left(leaf.keys, lo) if lo_inclusive else bisect_right(leaf.keys, lo)
+        for entry in self.__entries(leaf, i):
+            if hi is not None and (hi < entry.key if hi_inclusive else not entry.key < hi):
+                return
+            yield entry
+
+    def iter(self):
+        return self.__entries(self._first_leaf(), 0)
+
+    def __reversed__(self):
+        # The leaves from the last by their prev links, each read backwards
+        mod_count = self.mod_count
+        leaf = self._last_leaf()
+        while leaf is not None:
+            for entry in reversed(leaf.entries):
+                if self.mod_count != mod_count:
+                    raise RuntimeError("tree changed during iteration")
+                yield entry
+            leaf = leaf.prev
+
+    def __before(self, leaf: BPlusLeaf, i: int) -> Entry:
+        # The entry before position i of the leaf, which can be the last of the previous leaf
+        if i > 0:
+            return leaf.entries[i - 1]
+        if leaf.prev is not None:
+            return leaf.prev.entries[-1]
+        return self.nil
+
+    def __from(self, leaf: BPlusLeaf, i: int) -> Entry:
+        # The entry at position i of the leaf, which can be the first of the next leaf
+        if i < len(leaf.entries):
+            return leaf.entries[i]
+        if leaf.next is not None:
+            return leaf.next.entries[0]
+        return self.nil
+
+    def __entries(self, leaf: BPlusLeaf, i: int):
+        mod_count = self.mod_count
+        entries = leaf.entries[i:] if i > 0 else leaf.entries
+        while True:
+            for entry in entries:
+                if self.mod_count != mod_count:
+                    raise RuntimeError("tree changed during iteration")
+                yield entry
+            leaf = leaf.next
+            if leaf is None:
+                return
+            entries = leaf.entries
+
+def _spans(count: int, order: int):
+    # Splits count items into the fewest groups of at most order, with sizes differing by at most one
+    groups = -(-count // order)
+    for group in range(groups):
+        yield count * group // groups, count * (group + 1) // groups
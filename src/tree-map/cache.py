@@ -0,0 +1,201 @@
+import sys
+from collections import OrderedDict
+
+# Bounded caches of values by key, for values that are costly to load again.
+#
+# A cache keeps at most capacity entries, max_bytes of values as measured by sizeof, or both.
+# A value larger than max_bytes is not kept. Every cache counts its hits, misses and evictions,
+# so its budget can be sized from stats() under real load.
+#
+#   LRUCache     evicts the least recently used entry, an access moves an entry to the end of a list
+#   ClockCache   evicts an entry not used since the clock hand last passed it, an access sets a bit
+
+class Cache:
+
+    def __init__(self, capacity: int = None, max_bytes: int = None, sizeof = sys.getsizeof):
+        if capacity is None and max_bytes is None:
+            raise Exception("a cache needs a capacity, max_bytes or both")
+        if capacity is not None and capacity < 1:
+            raise Exception("capacity must be at least 1")
+        if max_bytes is not None and max_bytes < 1:
+            raise Exception("max_bytes must be at least 1")
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups > 0 else 0.0,
+            "entries": len(self),
+            "bytes": self.bytes,
+        }
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _over_budget(self) -> bool:
+        return ((self.capacity is not None and len(self) > self.capacity)
+                or (self.max_bytes is not None and self.bytes > self.max_bytes))
+
+class LRUCache(Cache):
+
+    def __init__(self, capacity: int = None, max_bytes: int = None, sizeof = sys.getsizeof):
+        super().__init__(capacity, max_bytes, sizeof)
+        self.entries = OrderedDict()
+        # The size of each value, only kept with a byte budget
+        self.sizes = {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, key) -> bool:
+        return key in self.entries
+
+    def get(self, key, default = None):
+        try:
+            value = self.entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        if self.max_bytes is not None:
+            size = self.sizeof(value)
+            if size > self.max_bytes:
+                self.pop(key)
+                return
+            self.bytes += size - self.sizes.get(key, 0)
+            self.sizes[key] = size
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while self._over_budget():
+            evicted, value = self.entries.popitem(last=False)
+            if self.max_bytes is not None:
+                self.bytes -= self.sizes.pop(evicted)
+            self.evictions += 1
+
+    def pop(self, key, default = None):
+        if self.max_bytes is not None and key in self.sizes:
+            self.bytes -= self.sizes.pop(key)
+        return self.entries.pop(key, default)
+
+    def clear(self):
+        self.entries.clear()
+        self.sizes.clear()
+        self.bytes = 0
+
+# Marks a free slot of a ClockCache
+_EMPTY = object()
+
+class ClockCache(Cache):
+    # Entries sit in slots around a clock. On eviction the hand sweeps the slots, clearing the
+    # referenced bit of each used entry and evicting the first entry found without it. An access
+    # only sets a bit, which is cheaper than reordering a list on every hit.
+
+    def __init__(self, capacity: int = None, max_bytes: int = None, sizeof = sys.getsizeof):
+        super().__init__(capacity, max_bytes, sizeof)
+        self.slots = {}
+        self.keys = []
+        self.values = []
+        self.sizes = []
+        self.referenced = bytearray()
+        self.free = []
+        self.hand = 0
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def __contains__(self, key) -> bool:
+        return key in self.slots
+
+    def get(self, key, default = None):
+        slot = self.slots.get(key)
+        if slot is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self.referenced[slot] = 1
+        return self.values[slot]
+
+    def put(self, key, value):
+        size = 0
+        if self.max_bytes is not None:
+            size = self.sizeof(value)
+            if size > self.max_bytes:
+                self.pop(key)
+                return
+        slot = self.slots.get(key)
+        if slot is not None:
+            self.bytes += size - self.sizes[slot]
+        elif len(self.free) > 0:
+            slot = self.free.pop()
+            self.keys[slot] = key
+            self.bytes += size
+        else:
+            slot = len(self.keys)
+            self.keys.append(key)
+            self.values.append(None)
+            self.sizes.append(0)
+            self.referenced.append(0)
+            self.bytes += size
+        self.slots[key] = slot
+        self.values[slot] = value
+        self.sizes[slot] = size
+        self.referenced[slot] = 1
+        while self._over_budget():
+            self.__evict(slot)
+
+    def pop(self, key, default = None):
+        slot = self.slots.get(key)
+        if slot is None:
+            return default
+        value = self.values[slot]
+        self.__remove(slot)
+        return value
+
+    def clear(self):
+        self.slots.clear()
+        self.keys.clear()
+        self.values.clear()
+        self.sizes.clear()
+        self.referenced = bytearray()
+        self.free.clear()
+        self.hand = 0
+        self.bytes = 0
+
+    def __evict(self, keep: int):
+        # The slot just written is kept, it fits the budget alone
+        while True:
+            if self.hand >= len(self.keys):
+                self.hand = 0
+            slot = self.hand
+            self.hand += 1
+            if slot == keep or self.keys[slot] is _EMPTY:
+                continue
+            if self.referenced[slot]:
+                self.referenced[slot] = 0
+                continue
+            self.__remove(slot)
+            self.evictions += 1
+            return
+
+    def __remove(self, slot: int):
+        del self.slots[self.keys[slot]]
+        self.keys[slot] = _EMPTY
+        self.values[slot] = None
+        self.bytes -= self.sizes[slot]
+        self.sizes[slot] = 0
+        self.free.append(slot)
@@ -0,0 +1,90 @@
+from tree_map import *
+from cache import Cache, LRUCache
+
+# A TreeMap for values too large to keep in memory all at once. The tree holds only the keys,
+# and the values are kept in a bounded cache, so the least used are evicted under its budget.
+# A value that is not cached is loaded again by calling the loader with its key, from wherever
+# the values are kept, such as a file or a database.
+#
+# find and items return values through the cache. The nodes of the tree, from iteration and
+# navigation, carry the keys without values. The "value" mode would keep every value in its
+# dict, so the map is in "node" mode unless "ordered" is asked for.
+
+DEFAULT_CACHE_SIZE = 1024
+# Tells a cache miss from a cached None
+_MISSING = object()
+
+class CachedTreeMap(TreeMap):
+
+    def __init__(self, loader, tree_type = RBTree, mode: str = "node", cache: Cache = None) -> None:
+        if mode == "value":
+            raise Exception("a cached map cannot keep its values in the value mode")
+        super().__init__(tree_type, mode)
+        self.loader = loader
+        self.cache = LRUCache(DEFAULT_CACHE_SIZE) if cache is None else cache
+
+    def find(self, key):
+        value = self.cache.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if not self.__contains(key):
+            return None
+        value = self.loader(key)
+        self.cache.put(key, value)
+        return value
+
+    def items(self, lo = None, hi = None, inclusive = True):
+        # (key, value) pairs in key order, between lo and hi when given, loaded as they are reached
+        for node in self.tree.range(lo, hi, inclusive):
+            yield node.key, self.find(node.key)
+
+    def insert(self, key, value):
+        super().insert(key, None)
+        self.cache.put(key, value)
+
+    def bulk_load(self, items, count: int = None):
+        self.cache.clear()
+        super().bulk_load(self.__cached(items), count)
+
+    def insert_many(self, items):
+        items = dict(items)
+        super().insert_many((key, None) for key in items)
+        for key, value in items.items():
+            self.cache.put(key, value)
+
+    def delete_many(self, keys):
+        keys = list(keys)
+        super().delete_many(keys)
+        for key in keys:
+            self.cache.pop(key)
+
+    def delete_range(self, lo = None, hi = None, inclusive = True, entries: bool = False):
+        # Values that were cached are returned as they were, the others are loaded as the entries are consumed
+        keys = [key for key, value in super().delete_range(lo, hi, inclusive, True)]
+        cached = {}
+        for key in keys:
+            value = self.cache.pop(key, _MISSING)
+            if value is not _MISSING:
+                cached[key] = value
+        if entries:
+            return self.__removed(keys, cached)
+        return None
+
+    def delete(self, key):
+        super().delete(key)
+        self.cache.pop(key)
+
+    def __contains(self, key) -> bool:
+        if self.mode == "node":
+            return key in self.map
+        return self.tree.find(key) is not self.tree.nil
+
+    def __removed(self, keys: list, cached: dict):
+        for key in keys:
+            value = cached.pop(key, _MISSING)
+            yield key, self.loader(key) if value is _MISSING else value
+
+    def __cached(self, items):
+        for key, value in items:
+            self.cache.put(key, value)
+            yield key, None
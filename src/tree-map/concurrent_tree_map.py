@@ -0,0 +1,169 @@
+import threading
+
+from tree_map import *
+
+# A TreeMap that can be shared between threads. Writes take the write lock of a readers-writer
+# lock, and reads of the tree (navigation, range, iteration, order statistics) take the read
+# lock, so any number of readers run together while no write is changing the tree. find is
+# served from the dict of values without a lock in the default "value" mode. The other modes
+# read the tree or its nodes, so their find takes the read lock.
+#
+# range and iter copy the nodes into a list under the read lock and iterate the copy, so no lock
+# is held while iterating and the loop may write to the map. The copy is a snapshot, it does not
+# see writes made after it was taken.
+
+class ReadWriteLock:
+    # Writers are preferred, a waiting writer stops new readers so that it cannot be starved
+
+    def __init__(self):
+        self.__condition = threading.Condition(threading.Lock())
+        self.__readers = 0
+        self.__writing = False
+        self.__writers_waiting = 0
+
+    def acquire_read(self):
+        with self.__condition:
+            while self.__writing or self.__writers_waiting > 0:
+                self.__condition.wait()
+            self.__readers += 1
+
+    def release_read(self):
+        with self.__condition:
+            self.__readers -= 1
+            if self.__readers == 0:
+                self.__condition.notify_all()
+
+    def acquire_write(self):
+        with self.__condition:
+            self.__writers_waiting += 1
+            while self.__writing or self.__readers > 0:
+                self.__condition.wait()
+            self.__writers_waiting -= 1
+            self.__writing = True
+
+    def release_write(self):
+        with self.__condition:
+            self.__writing = False
+            self.__condition.notify_all()
+
+class ConcurrentTreeMap(TreeMap):
+
+    def __init__(self, tree_type = RBTree, mode: str = "value") -> None:
+        super().__init__(tree_type, mode)
+        self.lock = ReadWriteLock()
+
+    def find(self, key):
+        if self.mode == "value":
+            # A single dict lookup, which sees a write to the dict either completely or not at all
+            return super().find(key)
+        self.lock.acquire_read()
+        try:
+            return super().find(key)
+        finally:
+            self.lock.release_read()
+
+    # Writes
+
+    def insert(self, key, value):
+        self.lock.acquire_write()
+        try:
+            super().insert(key, value)
+        finally:
+            self.lock.release_write()
+
+    def bulk_load(self, items, count: int = None):
+        self.lock.acquire_write()
+        try:
+            super().bulk_load(items, count)
+        finally:
+            self.lock.release_write()
+
+    def insert_many(self, items):
+        # Atomic, readers of the tree see none or all of the batch, and the dict takes it in one update
+        items = list(items)
+        self.lock.acquire_write()
+        try:
+            super().insert_many(items)
+        finally:
+            self.lock.release_write()
+
+    def delete_many(self, keys):
+        keys = list(keys)
+        self.lock.acquire_write()
+        try:
+            super().delete_many(keys)
+        finally:
+            self.lock.release_write()
+
+    def delete_range(self, lo = None, hi = None, inclusive = True, entries: bool = False):
+        # The removed entries are read after the lock is released, they are no longer in the map
+        self.lock.acquire_write()
+        try:
+            return super().delete_range(lo, hi, inclusive, entries)
+        finally:
+            self.lock.release_write()
+
+    def delete(self, key):
+        self.lock.acquire_write()
+        try:
+            super().delete(key)
+        finally:
+            self.lock.release_write()
+
+    # Reads of the tree
+
+    def first(self):
+        return self.__read(super().first)
+
+    def last(self):
+        return self.__read(super().last)
+
+    def floor(self, key):
+        return self.__read(super().floor, key)
+
+    def ceiling(self, key):
+        return self.__read(super().ceiling, key)
+
+    def lower(self, key):
+        return self.__read(super().lower, key)
+
+    def higher(self, key):
+        return self.__read(super().higher, key)
+
+    def select(self, index: int):
+        return self.__read(super().select, index)
+
+    def rank(self, key) -> int:
+        return self.__read(super().rank, key)
+
+    def count_range(self, lo = None, hi = None, inclusive = True) -> int:
+        return self.__read(super().count_range, lo, hi, inclusive)
+
+    def range(self, lo = None, hi = None, inclusive = True):
+        return self.__read_all(super().range, lo, hi, inclusive)
+
+    def iter(self):
+        return self.__read_all(super().iter)
+
+    def __reversed__(self):
+        return self.__read_all(super().__reversed__)
+
+    def cursor(self, key = None):
+        # A cursor steps between calls without holding the lock, so writers could move nodes under it
+        raise Exception("a ConcurrentTreeMap has no cursor, use range or iter")
+
+    def __read(self, read, *args):
+        self.lock.acquire_read()
+        try:
+            return read(*args)
+        finally:
+            self.lock.release_read()
+
+    def __read_all(self, read, *args):
+        # The lock is not reentrant, so holding it across the iteration would deadlock a loop writing to the map
+        self.lock.acquire_read()
+        try:
+            nodes = list(read(*args))
+        finally:
+            self.lock.release_read()
+        return iter(nodes)
@@ -0,0 +1,64 @@
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from tree_map import *
+from tree import _item_key
+import ingestion
+import serialization
+
+# Builds TreeMaps from a directory of documents on every core. Each file is parsed and sorted in a
+# worker process, which sends back its sorted run in the compact serialized format, a single bytes
+# object that is cheap to pickle between processes. The parent then builds each tree from the runs
+# in O(n) with bulk_load, instead of inserting every entry.
+#
+# A combined map keys every entry by (path, key). Runs from different files then never interleave,
+# so they are merged in linear time by loading them one after another in path order.
+
+def build_corpus(paths, workers: int = None, tree_type = RBTree, mode: str = "value",
+                 parse = ingestion.parse_sections) -> dict:
+    # A map per path. parse is run in the workers, so it must be a module level function.
+    maps = {}
+    for path, run in _sorted_runs(paths, workers, parse):
+        maps[path] = serialization.load_map(io.BytesIO(run), tree_type, mode)
+    return maps
+
+def build_combined(paths, workers: int = None, tree_type = RBTree, mode: str = "value",
+                   parse = ingestion.parse_sections) -> TreeMap:
+    # One map of every entry keyed by (path, key)
+    runs = sorted(_sorted_runs(paths, workers, parse), key=_item_key)
+    counts = []
+    readers = []
+    for path, run in runs:
+        count, items = serialization.read_items(io.BytesIO(run))
+        counts.append(count)
+        readers.append(_prefixed(path, items))
+    map = TreeMap(tree_type, mode)
+    map.bulk_load(_chained(readers), sum(counts))
+    return map
+
+def sorted_run(path: str, parse = ingestion.parse_sections) -> bytes:
+    # The entries of one file, sorted and serialized, as built in a worker
+    with open(path, 'rb') as file:
+        entries = parse(ingestion.split_lines(ingestion.read_chunks(file)))
+        # Sorted by key alone, equal keys are then refused by the build rather than comparing values
+        items = sorted(((key, value) for key, value, offset in entries), key=_item_key)
+    buffer = io.BytesIO()
+    serialization.dump_items(items, len(items), buffer)
+    return buffer.getvalue()
+
+def _sorted_runs(paths, workers: int, parse):
+    paths = [os.fspath(path) for path in paths]
+    if len(paths) == 0:
+        return []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        runs = list(executor.map(sorted_run, paths, [parse] * len(paths)))
+    return list(zip(paths, runs))
+
+def _prefixed(path: str, items):
+    for key, value in items:
+        yield (path, key), value
+
+def _chained(readers):
+    for reader in readers:
+        yield from reader
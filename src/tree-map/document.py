@@ -0,0 +1,378 @@
+import inspect
+from itertools import count
+
+from tree_map import *
+from reference_index import ReferenceIndex
+
+# The document graph of the README. A document is a root section, each section holds its
+# elements in order, and an element can hold a subsection. Labeled references between elements
+# and sections are kept apart from the sections, so traversal does not pay for them.
+#
+#   n = number of sections, k = size of a section, r = number of references from or to what is deleted
+#
+#   fetch a section by path, an element by id, a reference by label     O(1), from hash maps
+#   insert a section                                                    O(log n)
+#   insert an element                                                   O(log k)
+#   delete a section                                                    O(k + r + log n)
+#   delete an element                                                   O(r + log k)
+#   add or remove a reference                                           O(1)
+#
+# References are also kept in a ReferenceIndex by element id and section path, the keys they go
+# from and to, so deleting an element or section deletes the references to it as well as those
+# from it, without a scan of every reference.
+#
+# Sections are named by their path of labels from the root, ("intro", "background"), and found
+# by it in a dict. They are also kept in a TreeMap by their position, the orders of the elements
+# holding them from the root, so the sections are in document order. Each section keeps a TreeMap
+# of its elements by order, any comparable value, and every element has a unique id across the document.
+#
+# Functions are elements too. An element referencing a function element runs it when traversal
+# reaches it, with the element, or the element and the traversal state when it takes two arguments.
+# A condition returns True or False, and False skips the element with its subsection. A router
+# returns the label of a reference, and traversal visits its target before going on in order.
+# None does neither. Function elements are never visited themselves.
+
+class Element:
+
+    __slots__ = ('id', 'section', 'order', 'data', 'references')
+
+    def __init__(self, id: int, section: 'Section', order: any, data: any):
+        self.id = id
+        self.section = section
+        self.order = order
+        self.data = data
+        # The references from this element by label, None until it has one
+        self.references = None
+
+    def __repr__(self) -> str:
+        return f"[id: {self.id}, section: {self.section.path}, order: {self.order}, data: {self.data}]"
+
+class Section:
+
+    __slots__ = ('label', 'path', 'position', 'parent', 'element', 'elements')
+
+    def __init__(self, label: any, path: tuple, position: tuple, parent: 'Section', tree_type):
+        self.label = label
+        self.path = path
+        self.position = position
+        self.parent = parent
+        # The element holding this section in its parent, None for the root
+        self.element = None
+        self.elements = TreeMap(tree_type)
+
+    def __repr__(self) -> str:
+        return f"[section: {self.path}, elements: {len(self.elements.tree)}]"
+
+    def __len__(self) -> int:
+        return len(self.elements.tree)
+
+class Reference:
+
+    __slots__ = ('label', 'source', 'target')
+
+    def __init__(self, label: any, source: int, target: any):
+        self.label = label
+        # The id of the referencing element, and the id of an element or the path of a section
+        self.source = source
+        self.target = target
+
+    def __repr__(self) -> str:
+        return f"[reference: {self.label}, source: {self.source}, target: {self.target}]"
+
+class Document:
+
+    def __init__(self, tree_type = RBTree) -> None:
+        self.tree_type = tree_type
+        self.root = Section(None, (), (), None, tree_type)
+        self.sections = {(): self.root}
+        self.outline = TreeMap(tree_type, "ordered")
+        self.outline.insert((), self.root)
+        self.elements = {}
+        self.references = {}
+        self.index = ReferenceIndex()
+        # Counts changes to the elements, sections and references, so plans know to recompile
+        self.mod_count = 0
+        self.__ids = count(1)
+
+    # Fetch
+
+    def section(self, path: tuple) -> Section:
+        return self.sections.get(tuple(path))
+
+    def element(self, id: int) -> Element:
+        return self.elements.get(id)
+
+    def reference(self, label) -> Reference:
+        return self.references.get(label)
+
+    def referencing(self, target) -> list:
+        # The references to an element id or a section path
+        target = tuple(target) if isinstance(target, list) else target
+        return [self.references[label] for label in self.index.referencing(target)]
+
+    def resolve(self, label):
+        # The element or section a reference points to, None when it does not exist yet
+        reference = self.references.get(label)
+        if reference is None:
+            return None
+        if isinstance(reference.target, tuple):
+            return self.sections.get(reference.target)
+        return self.elements.get(reference.target)
+
+    # Insert
+
+    def add_element(self, path: tuple, data, order = None) -> Element:
+        # Appended after the last element when no order is given, which needs numeric orders
+        if data is None:
+            raise Exception("data cannot be none")
+        section = self.__section(path)
+        if order is None:
+            last = section.elements.last()
+            if last is not None and not isinstance(last.key, (int, float)):
+                raise Exception(f"section {section.path} orders its elements by {type(last.key).__name__}, an order must be given")
+            order = 0 if last is None else last.key + 1
+        elif section.elements.find(order) is not None:
+            raise Exception(f"section {section.path} already has an element at {order}")
+        element = Element(next(self.__ids), section, order, data)
+        section.elements.insert(order, element)
+        self.elements[element.id] = element
+        self.mod_count += 1
+        return element
+
+    def add_section(self, path: tuple, label, order = None) -> Section:
+        # A subsection of the section at path, held by a new element of that section
+        parent = self.__section(path)
+        sub_path = parent.path + (label,)
+        if sub_path in self.sections:
+            raise Exception(f"section {sub_path} already exists")
+        section = Section(label, sub_path, None, parent, self.tree_type)
+        section.element = self.add_element(parent.path, section, order)
+        section.position = parent.position + (section.element.order,)
+        self.sections[sub_path] = section
+        self.outline.insert(section.position, section)
+        return section
+
+    def add_reference(self, label, source: int, target) -> Reference:
+        # The target is an element id or a section path, and need not exist yet
+        if label in self.references:
+            raise Exception(f"reference {label} already exists")
+        element = self.elements.get(source)
+        if element is None:
+            raise Exception(f"no element with id {source}")
+        reference = Reference(label, source, tuple(target) if isinstance(target, list) else target)
+        self.index.add(label, source, reference.target)
+        self.references[label] = reference
+        if element.references is None:
+            element.references = {}
+        element.references[label] = reference
+        self.mod_count += 1
+        return reference
+
+    # Delete
+
+    def delete_reference(self, label) -> bool:
+        if not self.index.remove(label):
+            return False
+        self.__unlink(label)
+        self.mod_count += 1
+        return True
+
+    def delete_element(self, id: int) -> bool:
+        element = self.elements.get(id)
+        if element is None:
+            return False
+        if isinstance(element.data, Section):
+            return self.delete_section(element.data.path)
+        element.section.elements.delete(element.order)
+        self.__drop(element)
+        self.mod_count += 1
+        return True
+
+    def delete_section(self, path: tuple) -> bool:
+        # Drops the elements of the section and its subsections, then the section, each with the references from and to it
+        section = self.sections.get(tuple(path))
+        if section is None:
+            return False
+        if section is self.root:
+            raise Exception("the root section cannot be deleted")
+        section.parent.elements.delete(section.element.order)
+        self.__drop(section.element)
+        self.__drop_section(section)
+        self.mod_count += 1
+        return True
+
+    # Traversal
+
+    def walk(self, path: tuple = (), follow_references: bool = False, state: dict = None):
+        # In order by section and element, a subsection's element is followed by its own elements.
+        # References are skipped unless followed, then each target is visited after its source element.
+        return self.plan(path, follow_references).walk(state)
+
+    def plan(self, path: tuple = (), follow_references: bool = False, max_depth: int = 1) -> 'Plan':
+        # A compiled walk of the section at path, to keep for repeated walks
+        return Plan(self, self.__section(path), follow_references, max_depth)
+
+    def next_section(self, path: tuple) -> Section:
+        # The section after the one at path in document order, or None for the last
+        node = self.outline.higher(self.__section(path).position)
+        return None if node is None else node.data
+
+    def __section(self, path: tuple) -> Section:
+        section = self.sections.get(tuple(path))
+        if section is None:
+            raise Exception(f"no section {tuple(path)}")
+        return section
+
+    def __drop(self, element: Element):
+        del self.elements[element.id]
+        for label in self.index.drop(element.id):
+            self.__unlink(label)
+
+    def __unlink(self, label):
+        # Removes a reference the index no longer has from the document and its source element
+        reference = self.references.pop(label)
+        element = self.elements.get(reference.source)
+        if element is not None:
+            del element.references[label]
+            if len(element.references) == 0:
+                element.references = None
+
+    def __drop_section(self, section: Section):
+        for node in section.elements.iter():
+            element = node.data
+            if isinstance(element.data, Section):
+                self.__drop_section(element.data)
+            self.__drop(element)
+        del self.sections[section.path]
+        self.outline.delete(section.position)
+        for label in self.index.drop(section.path):
+            self.__unlink(label)
+
+class Plan:
+    # A walk compiled once into a flat list of the elements it visits. Only the elements that carry
+    # functions or followed references are marked, and the runs of elements between marks are
+    # yielded straight from the list, so a plain element costs no more than a list iteration.
+    #
+    # Functions that take only the element do not depend on the traversal state, and are all run
+    # in one batch at the start of each walk, including any inside a subsection a condition skips.
+    # The targets of routes and references are compiled into plans of their own on first use.
+    # Following a reference from within a reference is limited to max_depth, 1 by default, so a
+    # reference loop ends without checking for cycles when references are added.
+    #
+    # A plan recompiles when a walk starts after the document has changed, and a walk raises
+    # RuntimeError when the document changes during it.
+
+    def __init__(self, document: Document, target, follow_references: bool = False, max_depth: int = 1):
+        # The target is a section, whose elements are walked, or an element, walked with its subsection
+        self.document = document
+        self.target = target
+        self.follow_references = follow_references
+        self.max_depth = max_depth
+        self.mod_count = None
+
+    def compile(self):
+        self.__elements = []
+        self.__marks = []
+        self.__steps = {}
+        self.__batched = []
+        self.__targets = {}
+        if isinstance(self.target, Section):
+            for node in self.target.elements.iter():
+                self.__add(node.data)
+        else:
+            self.__add(self.target)
+        self.mod_count = self.document.mod_count
+
+    def walk(self, state: dict = None):
+        if self.mod_count != self.document.mod_count:
+            self.compile()
+        return self.__run({} if state is None else state, 0)
+
+    def __add(self, element: Element):
+        if callable(element.data):
+            return
+        index = len(self.__elements)
+        self.__elements.append(element)
+        step = self.__step(element) if element.references is not None else None
+        if step is not None:
+            self.__marks.append(index)
+        if isinstance(element.data, Section):
+            for node in element.data.elements.iter():
+                self.__add(node.data)
+        if step is not None:
+            # Where the walk resumes when a condition skips the element
+            step[2] = len(self.__elements)
+            self.__steps[index] = step
+
+    def __step(self, element: Element) -> list:
+        # The functions to run, each with its index in the batch or None when run with the state,
+        # and the labels of the references to follow
+        calls = []
+        follows = []
+        for label, reference in element.references.items():
+            target = self.document.resolve(label)
+            if isinstance(target, Element) and callable(target.data):
+                if _stateless(target.data):
+                    calls.append((target.data, len(self.__batched)))
+                    self.__batched.append((target.data, element))
+                else:
+                    calls.append((target.data, None))
+            elif self.follow_references:
+                follows.append(label)
+        if len(calls) == 0 and len(follows) == 0:
+            return None
+        return [calls, follows, None]
+
+    def __run(self, state: dict, depth: int):
+        document = self.document
+        mod_count = self.mod_count
+        elements = self.__elements
+        steps = self.__steps
+        results = [function(element) for function, element in self.__batched]
+        position = 0
+        for mark in self.__marks:
+            if mark < position:
+                continue
+            yield from elements[position:mark]
+            if document.mod_count != mod_count:
+                raise RuntimeError("document changed during traversal")
+            element = elements[mark]
+            calls, follows, end = steps[mark]
+            routes = []
+            for function, batch in calls:
+                result = function(element, state) if batch is None else results[batch]
+                if result is False:
+                    break
+                if result is not True and result is not None:
+                    routes.append(result)
+            else:
+                yield element
+                position = mark + 1
+                if depth < self.max_depth:
+                    # A route is a reference label, which follow_references may follow already
+                    for label in dict.fromkeys(routes + follows):
+                        yield from self.__follow(label, state, depth + 1)
+                continue
+            position = end
+        if document.mod_count != mod_count:
+            raise RuntimeError("document changed during traversal")
+        yield from elements[position:]
+
+    def __follow(self, label, state: dict, depth: int):
+        try:
+            plan = self.__targets[label]
+        except KeyError:
+            target = self.document.resolve(label)
+            plan = None if target is None else Plan(self.document, target, self.follow_references, self.max_depth)
+            if plan is not None:
+                plan.compile()
+            self.__targets[label] = plan
+        if plan is not None:
+            yield from plan.__run(state, depth)
+
+def _stateless(function) -> bool:
+    # A function taking only the element does not depend on the traversal state
+    try:
+        return len(inspect.signature(function).parameters) == 1
+    except (TypeError, ValueError):
+        return False
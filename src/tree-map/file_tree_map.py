@@ -0,0 +1,137 @@
+import mmap
+import os
+
+from tree_map import *
+from cache import Cache, LRUCache
+
+# Values kept in files instead of memory, as in the README's lazy file reading. A MappedFile maps
+# a file read-only, and a FileSpan is a (file, offset, length) handle to part of it. The tree only
+# holds the handles, so a map can index files larger than memory, and the pages of a file are
+# read by the operating system when a span is first accessed.
+#
+# FileTreeMap is a TreeMap of spans whose find returns their content, through a bounded cache of
+# the most recently found values, or any other Cache. Its keys keep their tree order and O(log n) navigation.
+
+DEFAULT_CACHE_SIZE = 1024
+
+class MappedFile:
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, 'rb')
+        size = os.fstat(self.file.fileno()).st_size
+        # An empty file cannot be mapped
+        self.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size > 0 else None
+        self.size = size
+
+    def __enter__(self) -> 'MappedFile':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        # Views of the file must be released first, mmap cannot close while they exist
+        if self.mmap is not None:
+            self.mmap.close()
+        self.file.close()
+
+    def span(self, offset: int, length: int) -> 'FileSpan':
+        if offset < 0 or length < 0 or offset + length > self.size:
+            raise Exception(f"span of {length} bytes at {offset} is outside {self.path} of {self.size} bytes")
+        return FileSpan(self, offset, length)
+
+    def split(self, separator: bytes = b"\n"):
+        # The spans between separators, without them, for loading the records of a file in order
+        offset = 0
+        while offset < self.size:
+            end = self.mmap.find(separator, offset)
+            if end == -1:
+                end = self.size
+            yield FileSpan(self, offset, end - offset)
+            offset = end + len(separator)
+
+class FileSpan:
+
+    __slots__ = ('file', 'offset', 'length')
+
+    def __init__(self, file: MappedFile, offset: int, length: int):
+        self.file = file
+        self.offset = offset
+        self.length = length
+
+    def __repr__(self) -> str:
+        return f"[file: {self.file.path}, offset: {self.offset}, length: {self.length}]"
+
+    def __len__(self) -> int:
+        return self.length
+
+    def view(self) -> memoryview:
+        # The bytes in place in the mapping, without a copy
+        if self.length == 0:
+            return memoryview(b"")
+        return memoryview(self.file.mmap)[self.offset:self.offset + self.length]
+
+    def read(self) -> bytes:
+        if self.length == 0:
+            return b""
+        return self.file.mmap[self.offset:self.offset + self.length]
+
+class FileTreeMap(TreeMap):
+
+    def __init__(self, tree_type = RBTree, mode: str = "value", cache_size: int = DEFAULT_CACHE_SIZE,
+                 cache: Cache = None) -> None:
+        # A cache given replaces the default of cache_size entries, such as one with a byte budget
+        super().__init__(tree_type, mode)
+        self.cache = LRUCache(cache_size) if cache is None else cache
+
+    def find(self, key):
+        # The content of the key's span, read from the file when it is not cached
+        content = self.cache.get(key)
+        if content is None:
+            file_span = super().find(key)
+            if file_span is None:
+                return None
+            content = file_span.read()
+            self.cache.put(key, content)
+        return content
+
+    def span(self, key) -> FileSpan:
+        return super().find(key)
+
+    def view(self, key) -> memoryview:
+        file_span = super().find(key)
+        return None if file_span is None else file_span.view()
+
+    def insert(self, key, value: FileSpan):
+        super().insert(key, value)
+        self.cache.pop(key)
+
+    def bulk_load(self, items, count: int = None):
+        super().bulk_load(items, count)
+        self.cache.clear()
+
+    def insert_many(self, items):
+        items = list(items)
+        super().insert_many(items)
+        for key, value in items:
+            self.cache.pop(key)
+
+    def delete_many(self, keys):
+        keys = list(keys)
+        super().delete_many(keys)
+        for key in keys:
+            self.cache.pop(key)
+
+    def delete_range(self, lo = None, hi = None, inclusive = True, entries: bool = False):
+        # The removed entries are collected at once, as their keys must leave the cache
+        removed = list(super().delete_range(lo, hi, inclusive, True))
+        for key, file_span in removed:
+            self.cache.pop(key)
+        if entries:
+            return iter(removed)
+        return None
+
+    def delete(self, key):
+        super().delete(key)
+        self.cache.pop(key)
@@ -0,0 +1,126 @@
+from tree_map import *
+
+# Streams a document into a TreeMap without holding it in memory. Each stage is a generator
+# pulling from the one before it:
+#
+#   read_chunks      fixed size chunks of a binary stream
+#   split_lines      lines split across chunks, with the byte offset after each
+#   parse_sections   (key, value) entries keyed by (section, element), headings start a section
+#   ingest           bounded batches inserted with insert_many
+#
+# Nothing is read until the batch being filled needs it, so reading waits while the tree inserts,
+# and memory is bounded by the chunk, the longest line and the batch, whatever the size of the
+# document. After each batch, ingest reports its progress with a checkpoint of the last key and
+# the offset after it, which can be saved to resume an interrupted ingestion from.
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+DEFAULT_BATCH_SIZE = 1024
+
+class Checkpoint:
+
+    __slots__ = ('key', 'offset')
+
+    def __init__(self, key: any, offset: int):
+        self.key = key
+        # The byte offset of the stream after the entry of key
+        self.offset = offset
+
+    def __repr__(self) -> str:
+        return f"[checkpoint: {self.key}, offset: {self.offset}]"
+
+class Progress:
+
+    __slots__ = ('bytes', 'entries', 'batches', 'checkpoint')
+
+    def __init__(self):
+        self.bytes = 0
+        self.entries = 0
+        self.batches = 0
+        self.checkpoint = None
+
+    def __repr__(self) -> str:
+        return f"[bytes: {self.bytes}, entries: {self.entries}, batches: {self.batches}, checkpoint: {self.checkpoint}]"
+
+def read_chunks(stream, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+def split_lines(chunks, offset: int = 0):
+    # (offset after the line, line without its newline), for lines in binary chunks. Only each new
+    # chunk is split, the pieces of a line spanning chunks are kept until its end and joined once.
+    partial = []
+    for chunk in chunks:
+        lines = chunk.split(b"\n")
+        if len(lines) == 1:
+            partial.append(chunk)
+            continue
+        if partial:
+            partial.append(lines[0])
+            lines[0] = b"".join(partial)
+        partial = [lines.pop()]
+        for line in lines:
+            offset += len(line) + 1
+            yield offset, line
+    line = b"".join(partial)
+    if line:
+        yield offset + len(line), line
+
+def parse_sections(lines, after = None, encoding: str = "utf-8"):
+    # Markdown style headings, lines starting with "#", begin a new section and are its element 0,
+    # every other line that is not blank is the next element of the section. Entries are keyed by
+    # (section, element) in the order they are read, and continue from after when given.
+    section, element = (0, 0) if after is None else after
+    for offset, line in lines:
+        text = line.decode(encoding).rstrip("\r")
+        if text.startswith("#"):
+            section += 1
+            element = 0
+        elif text.strip():
+            element += 1
+        else:
+            continue
+        yield (section, element), text, offset
+
+def ingest(map: TreeMap, stream, parse = parse_sections, chunk_size: int = DEFAULT_CHUNK_SIZE,
+           batch_size: int = DEFAULT_BATCH_SIZE, progress = None, resume: Checkpoint = None) -> Progress:
+    # Inserts the entries parsed from a binary stream, calling progress with the Progress after each
+    # batch. A seekable stream resumes at the checkpoint's offset, otherwise the entries up to its
+    # key are read again and skipped. Keys must ascend through the stream for resuming to work.
+    if batch_size < 1:
+        raise Exception("batch size must be at least 1")
+    state = Progress()
+    offset = 0
+    # The parser continues from the checkpoint only when the stream does
+    start = None
+    after = None if resume is None else resume.key
+    if resume is not None and stream.seekable():
+        stream.seek(resume.offset)
+        offset = resume.offset
+        start = after
+    entries = parse(split_lines(read_chunks(stream, chunk_size), offset), start)
+    batch = []
+    last = None
+    for key, value, end in entries:
+        if after is not None and not after < key:
+            continue
+        batch.append((key, value))
+        last = key
+        offset = end
+        if len(batch) == batch_size:
+            _insert_batch(map, batch, state, Checkpoint(last, offset), progress)
+            batch = []
+    if len(batch) > 0:
+        _insert_batch(map, batch, state, Checkpoint(last, offset), progress)
+    return state
+
+def _insert_batch(map: TreeMap, batch: list, state: Progress, checkpoint: Checkpoint, progress):
+    map.insert_many(batch)
+    state.bytes = checkpoint.offset
+    state.entries += len(batch)
+    state.batches += 1
+    state.checkpoint = checkpoint
+    if progress is not None:
+        progress(state)
@@ -1,5 +1,8 @@
 class Node:
 
+    # Trees hold millions of nodes, so avoid a per-instance __dict__
+    __slots__ = ('key', 'data', 'left', 'right', 'parent')
+
     def __init__(self, key: any, data: any = None, parent = None, left = None, right = None):
         self.key = key
         self.data = data
@@ -27,6 +30,8 @@ class Node:
 
 class AVLNode(Node):
 
+    __slots__ = ('height',)
+
     def __init__(self, key: any, data: any = None, parent = None, left = None, right = None):
         super().__init__(key, data, parent, left, right)
         self.height = 0 if self.key is None else 1
@@ -55,6 +60,8 @@ class AVLNode(Node):
 
 class RBNode(Node):
 
+    __slots__ = ('black',)
+
     def __init__(self, key: any, data: any = None, parent = None, left = None, right = None):
         super().__init__(key, data, parent, left, right)
         self.black = True
@@ -62,4 +69,44 @@ class RBNode(Node):
     def __repr__(self) -> str:
         output = super().__repr__()[:-1]
         output += f", {'black' if self.black else 'red'}]"
-        return output
\ No newline at end of file
+        return output
+
+# Nodes that also count the nodes in their subtree, for order statistics
+
+class SizedNode(Node):
+
+    __slots__ = ('size',)
+
+    def __init__(self, key: any, data: any = None, parent = None, left = None, right = None):
+        super().__init__(key, data, parent, left, right)
+        self.size = 0 if self.key is None else 1
+
+class SizedAVLNode(AVLNode):
+
+    __slots__ = ('size',)
+
+    def __init__(self, key: any, data: any = None, parent = None, left = None, right = None):
+        super().__init__(key, data, parent, left, right)
+        self.size = 0 if self.key is None else 1
+
+class SizedRBNode(RBNode):
+
+    __slots__ = ('size',)
+
+    def __init__(self, key: any, data: any = None, parent = None, left = None, right = None):
+        super().__init__(key, data, parent, left, right)
+        self.size = 0 if self.key is None else 1
+
+# Nodes of a map with a key function, node.key is the computed key that the tree orders by and
+# item is the key it was computed from. Created once per node type, only such maps pay for the slot.
+
+_keyed_types = {}
+
+def keyed(node_type):
+    if node_type not in _keyed_types:
+        def __init__(self, key: any, data: any = None, parent = None, left = None, right = None):
+            node_type.__init__(self, key, data, parent, left, right)
+            self.item = None
+        _keyed_types[node_type] = type(f"Keyed{node_type.__name__}", (node_type,),
+                                       {'__slots__': ('item',), '__init__': __init__})
+    return _keyed_types[node_type]
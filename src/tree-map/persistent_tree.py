@@ -0,0 +1,389 @@
+from itertools import islice
+
+from tree import _item_key, _sized, _ascending
+
+# A red-black tree whose nodes are never changed once they are in a tree. A write copies the
+# O(log n) nodes on the path to its key and shares every other node with the previous version,
+# so snapshot() is O(1) and a snapshot, or an iteration already running, sees the tree as it
+# was while writes continue. A version is freed as soon as nothing refers to its root.
+#
+# There are no parent links, as one changed node would otherwise mean copying the whole tree.
+# Insert and delete are the functional algorithms of Okasaki and Kahrs, the empty tree is None.
+
+class PersistentNode:
+
+    __slots__ = ('key', 'data', 'left', 'right', 'black')
+
+    def __init__(self, key: any, data: any = None, left = None, right = None, black: bool = True):
+        self.key = key
+        self.data = data
+        self.left = left
+        self.right = right
+        self.black = black
+
+    def __repr__(self) -> str:
+        output = f"[key: {self.key}, data: {self.data}, "
+        output += f"left: {f"[key: {self.left.key}]" if self.left is not None else None}, "
+        output += f"right: {f"[key: {self.right.key}]" if self.right is not None else None}, "
+        output += f"{'black' if self.black else 'red'}]"
+        return output
+
+class PersistentRBTree:
+
+    def __init__(self):
+        # Returned when there is no such node, never part of a tree
+        self.nil = PersistentNode(None, None)
+        self.root = None
+        # Incremented on every write, iterators do not need it as they hold their own version
+        self.mod_count = 0
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def snapshot(self) -> 'PersistentRBTree':
+        # A tree sharing this version, later writes to either tree are not seen by the other
+        snapshot = PersistentRBTree()
+        snapshot.root = self.root
+        snapshot.size = self.size
+        return snapshot
+
+    def find(self, key) -> PersistentNode:
+        curr = self.root
+        while curr is not None:
+            if key < curr.key:
+                curr = curr.left
+            elif curr.key < key:
+                curr = curr.right
+            else:
+                return curr
+        return self.nil
+
+    def insert(self, key, data) -> PersistentNode:
+        # An existing key takes the new data in a copied node, as nodes shared with snapshots cannot be changed
+        if key is None:
+            raise Exception("key cannot be none")
+        self.root = _blacken(self.__insert(self.root, key, data))
+        self.mod_count += 1
+        # Rebalancing can copy the new node, so it is looked up in the finished version
+        return self.find(key)
+
+    def delete(self, key) -> bool:
+        if key is None or self.find(key) is self.nil:
+            return False
+        self.root = _blacken(self.__delete(self.root, key))
+        self.mod_count += 1
+        self.size -= 1
+        return True
+
+    def delete_node(self, to_delete: PersistentNode) -> bool:
+        # Nodes are copied by writes, so the node is deleted by its key
+        if to_delete is None or to_delete is self.nil:
+            return False
+        return self.delete(to_delete.key)
+
+    def insert_many(self, items) -> list:
+        # Returns the node holding each key in ascending key order, like insert does for a single key.
+        # Later inserts of the batch copy the nodes of earlier ones, so each is looked up in the final version.
+        batch = sorted(items, key=_item_key)
+        for key, data in batch:
+            self.insert(key, data)
+        return [self.find(key) for key, data in batch]
+
+    def delete_many(self, keys) -> int:
+        deleted = 0
+        for key in keys:
+            if self.delete(key):
+                deleted += 1
+        return deleted
+
+    @classmethod
+    def from_sorted(cls, items, count: int = None):
+        # Builds a balanced tree in O(n) from (key, data) pairs in ascending key order
+        tree = cls()
+        tree._build_sorted(items, count)
+        return tree
+
+    def validate(self) -> bool:
+        # Raises on the first node that breaks the ordering or colouring, otherwise True
+        if self.root is not None and not self.root.black:
+            raise Exception(f"The root is red. {self.root}")
+        prev = None
+        count = 0
+        for node in self.iter():
+            if prev is not None and not prev.key < node.key:
+                raise Exception(f"Node is out of order. {node}")
+            prev = node
+            count += 1
+        if count != self.size:
+            raise Exception(f"The tree has {count} nodes, not its size of {self.size}")
+        self.__validate_black_height(self.root)
+        return True
+
+    def __validate_black_height(self, node: PersistentNode) -> int:
+        if node is None:
+            return 1
+        if not node.black and not (_black(node.left) and _black(node.right)):
+            raise Exception(f"Red node has a red child. {node}")
+        left = self.__validate_black_height(node.left)
+        right = self.__validate_black_height(node.right)
+        if left != right:
+            raise Exception(f"Node has unequal black heights. {node}")
+        return left + (1 if node.black else 0)
+
+    # Path-copying methods, each returns the new root of the subtree it was given
+
+    def __insert(self, node: PersistentNode, key, data) -> PersistentNode:
+        if node is None:
+            # The key is new, the descent found no node with it
+            self.size += 1
+            return PersistentNode(key, data, None, None, False)
+        if key < node.key:
+            left = self.__insert(node.left, key, data)
+            if node.black:
+                return _balance(left, node.key, node.data, node.right)
+            return PersistentNode(node.key, node.data, left, node.right, False)
+        if node.key < key:
+            right = self.__insert(node.right, key, data)
+            if node.black:
+                return _balance(node.left, node.key, node.data, right)
+            return PersistentNode(node.key, node.data, node.left, right, False)
+        return PersistentNode(node.key, data, node.left, node.right, node.black)
+
+    def __delete(self, node: PersistentNode, key) -> PersistentNode:
+        # The key is known to be in the tree. A subtree losing a black node is rebalanced on the way up.
+        if key < node.key:
+            if _black(node.left):
+                return _balance_left(self.__delete(node.left, key), node.key, node.data, node.right)
+            return PersistentNode(node.key, node.data, self.__delete(node.left, key), node.right, False)
+        if node.key < key:
+            if _black(node.right):
+                return _balance_right(node.left, node.key, node.data, self.__delete(node.right, key))
+            return PersistentNode(node.key, node.data, node.left, self.__delete(node.right, key), False)
+        return _fuse(node.left, node.right)
+
+    def _build_sorted(self, items, count: int = None):
+        if count is None:
+            items, count = _sized(items)
+        pairs = list(islice(_ascending(items), count))
+        if len(pairs) < count:
+            raise Exception("items ended before the expected count")
+        full_depth = (count + 1).bit_length() - 1
+        self.root = _link_sorted(pairs, 0, count, 0, full_depth)
+        self.size = count
+        self.mod_count += 1
+
+    # Ordered navigation, each returns nil when there is no such node
+
+    def first(self) -> PersistentNode:
+        curr = self.root
+        if curr is None:
+            return self.nil
+        while curr.left is not None:
+            curr = curr.left
+        return curr
+
+    def last(self) -> PersistentNode:
+        curr = self.root
+        if curr is None:
+            return self.nil
+        while curr.right is not None:
+            curr = curr.right
+        return curr
+
+    def floor(self, key) -> PersistentNode:
+        # The largest node with a key <= the given key
+        found = self.nil
+        curr = self.root
+        while curr is not None:
+            if key < curr.key:
+                curr = curr.left
+            else:
+                found = curr
+                curr = curr.right
+        return found
+
+    def ceiling(self, key) -> PersistentNode:
+        # The smallest node with a key >= the given key
+        found = self.nil
+        curr = self.root
+        while curr is not None:
+            if curr.key < key:
+                curr = curr.right
+            else:
+                found = curr
+                curr = curr.left
+        return found
+
+    def lower(self, key) -> PersistentNode:
+        # The largest node with a key < the given key
+        found = self.nil
+        curr = self.root
+        while curr is not None:
+            if curr.key < key:
+                found = curr
+                curr = curr.right
+            else:
+                curr = curr.left
+        return found
+
+    def higher(self, key) -> PersistentNode:
+        # The smallest node with a key > the given key
+        found = self.nil
+        curr = self.root
+        while curr is not None:
+            if key < curr.key:
+                found = curr
+                curr = curr.left
+            else:
+                curr = curr.right
+        return found
+
+    def range(self, lo = None, hi = None, inclusive = True):
+        # Bounds of None are open, and inclusive can be a (lo, hi) pair to set each bound separately
+        lo_inclusive, hi_inclusive = inclusive if isinstance(inclusive, tuple) else (inclusive, inclusive)
+        # The nodes from lo onwards that are still to be visited, the next on top
+        stack = []
+        curr = self.root
+        while curr is not None:
+            if lo is None or (lo < curr.key if not lo_inclusive else not curr.key < lo):
+                stack.append(curr)
+                curr = curr.left
+            else:
+                curr = curr.right
+        for node in _in_order(stack):
+            if hi is not None and (hi < node.key if hi_inclusive else not node.key < hi):
+                return
+            yield node
+
+    def iter(self):
+        # Iterates the version at the time of the call, writes made meanwhile are not seen and do not interfere
+        stack = []
+        curr = self.root
+        while curr is not None:
+            stack.append(curr)
+            curr = curr.left
+        return _in_order(stack)
+
+    def __reversed__(self):
+        # Like iter, the version at the time of the call, from the largest key down
+        stack = []
+        curr = self.root
+        while curr is not None:
+            stack.append(curr)
+            curr = curr.right
+        return _reverse_order(stack)
+
+def _in_order(stack: list):
+    while stack:
+        node = stack.pop()
+        yield node
+        curr = node.right
+        while curr is not None:
+            stack.append(curr)
+            curr = curr.left
+
+def _reverse_order(stack: list):
+    while stack:
+        node = stack.pop()
+        yield node
+        curr = node.left
+        while curr is not None:
+            stack.append(curr)
+            curr = curr.right
+
+def _black(node: PersistentNode) -> bool:
+    return node is None or node.black
+
+def _red(node: PersistentNode) -> bool:
+    return node is not None and not node.black
+
+def _blacken(node: PersistentNode) -> PersistentNode:
+    if node is None or node.black:
+        return node
+    return PersistentNode(node.key, node.data, node.left, node.right, True)
+
+def _redden(node: PersistentNode) -> PersistentNode:
+    return PersistentNode(node.key, node.data, node.left, node.right, False)
+
+def _balance(left: PersistentNode, key, data, right: PersistentNode) -> PersistentNode:
+    # A black node over the given children, rotated and recoloured when a red node has a red child
+    if _red(left) and _red(right):
+        return PersistentNode(key, data, _blacken(left), _blacken(right), False)
+    if _red(left):
+        if _red(left.left):
+            return PersistentNode(left.key, left.data, _blacken(left.left),
+                                  PersistentNode(key, data, left.right, right, True), False)
+        if _red(left.right):
+            middle = left.right
+            return PersistentNode(middle.key, middle.data,
+                                  PersistentNode(left.key, left.data, left.left, middle.left, True),
+                                  PersistentNode(key, data, middle.right, right, True), False)
+    if _red(right):
+        if _red(right.right):
+            return PersistentNode(right.key, right.data,
+                                  PersistentNode(key, data, left, right.left, True), _blacken(right.right), False)
+        if _red(right.left):
+            middle = right.left
+            return PersistentNode(middle.key, middle.data,
+                                  PersistentNode(key, data, left, middle.left, True),
+                                  PersistentNode(right.key, right.data, middle.right, right.right, True), False)
+    return PersistentNode(key, data, left, right, True)
+
+def _balance_left(left: PersistentNode, key, data, right: PersistentNode) -> PersistentNode:
+    # The left subtree is one black shorter than the right
+    if _red(left):
+        return PersistentNode(key, data, _blacken(left), right, False)
+    if _black(right):
+        return _balance(left, key, data, _redden(right))
+    middle = right.left
+    return PersistentNode(middle.key, middle.data,
+                          PersistentNode(key, data, left, middle.left, True),
+                          _balance(middle.right, right.key, right.data, _redden(right.right)), False)
+
+def _balance_right(left: PersistentNode, key, data, right: PersistentNode) -> PersistentNode:
+    # The right subtree is one black shorter than the left
+    if _red(right):
+        return PersistentNode(key, data, left, _blacken(right), False)
+    if _black(left):
+        return _balance(_redden(left), key, data, right)
+    middle = left.right
+    return PersistentNode(middle.key, middle.data,
+                          _balance(_redden(left.left), left.key, left.data, middle.left),
+                          PersistentNode(key, data, middle.right, right, True), False)
+
+def _fuse(left: PersistentNode, right: PersistentNode) -> PersistentNode:
+    # Joins the two children of a deleted node, every key of left is smaller than every key of right
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if _red(left) and _red(right):
+        middle = _fuse(left.right, right.left)
+        if _red(middle):
+            return PersistentNode(middle.key, middle.data,
+                                  PersistentNode(left.key, left.data, left.left, middle.left, False),
+                                  PersistentNode(right.key, right.data, middle.right, right.right, False), False)
+        return PersistentNode(left.key, left.data, left.left,
+                              PersistentNode(right.key, right.data, middle, right.right, False), False)
+    if left.black and right.black:
+        middle = _fuse(left.right, right.left)
+        if _red(middle):
+            return PersistentNode(middle.key, middle.data,
+                                  PersistentNode(left.key, left.data, left.left, middle.left, True),
+                                  PersistentNode(right.key, right.data, middle.right, right.right, True), False)
+        return _balance_left(left.left, left.key, left.data,
+                             PersistentNode(right.key, right.data, middle, right.right, True))
+    if _red(right):
+        return PersistentNode(right.key, right.data, _fuse(left, right.left), right.right, False)
+    return PersistentNode(left.key, left.data, left.left, _fuse(left.right, right), False)
+
+def _link_sorted(pairs: list, start: int, count: int, depth: int, full_depth: int) -> PersistentNode:
+    # The same shape and colouring as Tree._build_nodes, only the partially filled deepest level is red
+    if count == 0:
+        return None
+    middle = start + (count - 1) // 2
+    key, data = pairs[middle]
+    left = _link_sorted(pairs, start, (count - 1) // 2, depth + 1, full_depth)
+    right = _link_sorted(pairs, middle + 1, count // 2, depth + 1, full_depth)
+    return PersistentNode(key, data, left, right, depth < full_depth)
@@ -0,0 +1,84 @@
+# Labeled references between the keys of a map, indexed from both ends. Each reference goes from a
+# source key to a target key under a unique label. Besides the references by label, each key maps to
+# the references from it and to it, so the keys referencing a key are found without a scan, and a
+# deleted key takes its references with it in time proportional to their number.
+#
+#   r = number of references from or to a key
+#
+#   add or remove a reference               O(1)
+#   the keys referencing or referenced      O(r)
+#   drop a key with its references          O(r)
+#
+# Keys need not be in a map when a reference to them is added, and the index does not check them.
+
+class ReferenceIndex:
+
+    def __init__(self):
+        # The (source, target) of each reference by label
+        self.references = {}
+        # The references from each key, label to target
+        self.outgoing = {}
+        # The references to each key, label to source
+        self.incoming = {}
+
+    def __len__(self) -> int:
+        return len(self.references)
+
+    def __contains__(self, label) -> bool:
+        return label in self.references
+
+    def get(self, label) -> tuple:
+        # The (source, target) of a reference, or None
+        return self.references.get(label)
+
+    def add(self, label, source, target):
+        if label in self.references:
+            raise Exception(f"reference {label} already exists")
+        self.references[label] = (source, target)
+        self.outgoing.setdefault(source, {})[label] = target
+        self.incoming.setdefault(target, {})[label] = source
+
+    def remove(self, label) -> bool:
+        ends = self.references.pop(label, None)
+        if ends is None:
+            return False
+        source, target = ends
+        _discard(self.outgoing, source, label)
+        _discard(self.incoming, target, label)
+        return True
+
+    def sources(self, target) -> list:
+        # The keys referencing target, once for each reference
+        return list(self.incoming.get(target, {}).values())
+
+    def targets(self, source) -> list:
+        # The keys source references, once for each reference
+        return list(self.outgoing.get(source, {}).values())
+
+    def referencing(self, target) -> list:
+        # The labels of the references to target
+        return list(self.incoming.get(target, ()))
+
+    def referenced(self, source) -> list:
+        # The labels of the references from source
+        return list(self.outgoing.get(source, ()))
+
+    def drop(self, key) -> list:
+        # Removes every reference from or to key, and returns their labels
+        dropped = []
+        for label, target in self.outgoing.pop(key, {}).items():
+            del self.references[label]
+            _discard(self.incoming, target, label)
+            dropped.append(label)
+        for label, source in self.incoming.pop(key, {}).items():
+            del self.references[label]
+            _discard(self.outgoing, source, label)
+            dropped.append(label)
+        return dropped
+
+def _discard(labels_by_key: dict, key, label):
+    # Keys without references are removed, so the index only grows with its references
+    labels = labels_by_key[key]
+    del labels[label]
+    if len(labels) == 0:
+        del labels_by_key[key]
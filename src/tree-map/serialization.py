@@ -0,0 +1,181 @@
+import pickle
+import struct
+import zlib
+
+from tree_map import *
+
+# A compact file format for a built tree, so it is loaded again in O(n) instead of rebuilt by n
+# inserts. Entries are written in ascending key order, in blocks that each carry a CRC-32 of their
+# bytes, and loading reads one block at a time into the tree's O(n) sorted build.
+#
+#   header   magic "TMAP", version, shape kind, count of entries
+#   block    count of entries, length and CRC-32 of the payload, then the payload: the pickled keys
+#            and data of the block, followed by one shape byte per entry when the file has shapes
+#
+# The shape byte is the height of the entry's subtree, with the high bit set for a red node. A
+# file with shapes loads into the same kind of tree exactly as it was written, and otherwise the
+# shapes are skipped and the sorted build balances the tree on its own. Data is pickled, so only
+# load files from a trusted source.
+
+MAGIC = b"TMAP"
+VERSION = 1
+DEFAULT_BLOCK_SIZE = 4096
+# The kinds of tree a shape is written from, a shape only fits a tree of the same kind
+SHAPE_NONE = 0
+SHAPE_TREE = 1
+SHAPE_AVL = 2
+SHAPE_RB = 3
+RED = 0x80
+
+HEADER = struct.Struct("<4sBBxxQ")
+BLOCK = struct.Struct("<III")
+
+def dump(tree, file, shape: bool = False, block_size: int = DEFAULT_BLOCK_SIZE):
+    # Writes any of the trees to a binary file, shape is only kept for the trees of tree.py
+    kind = _shape_kind(tree) if shape else SHAPE_NONE
+    if shape and kind == SHAPE_NONE:
+        raise Exception(f"{type(tree).__name__} has no shape to write")
+    shapes = _shapes(tree) if shape else None
+    items = ((node.key, node.data) for node in tree.iter())
+    _write(file, items, len(tree), kind, shapes, block_size)
+
+def dump_items(items, count: int, file, block_size: int = DEFAULT_BLOCK_SIZE):
+    # Writes count (key, data) pairs in ascending key order, as a tree of them would be written
+    _write(file, items, count, SHAPE_NONE, None, block_size)
+
+def dump_map(map: TreeMap, file, shape: bool = False, block_size: int = DEFAULT_BLOCK_SIZE):
+    dump(map.tree, file, shape, block_size)
+
+def load(file, tree_type = RBTree):
+    # A tree of tree_type, rebuilt to its written shape when the file has one of the same kind
+    tree = tree_type()
+    kind, count = _read_header(file)
+    if kind != SHAPE_NONE and kind == _shape_kind(tree):
+        tree._build_shaped(_read_shaped(file, kind, count), count)
+    else:
+        tree._build_sorted(_read_entries(file, kind, count), count)
+    return tree
+
+def load_map(file, tree_type = RBTree, mode: str = "value") -> TreeMap:
+    map = TreeMap(tree_type, mode)
+    count, items = read_items(file)
+    map.bulk_load(items, count)
+    return map
+
+def read_items(file) -> tuple:
+    # The count of entries and a generator of their (key, data) pairs, read a block at a time
+    kind, count = _read_header(file)
+    return count, _read_entries(file, kind, count)
+
+def _shape_kind(tree) -> int:
+    if isinstance(tree, AVLTree):
+        return SHAPE_AVL
+    if isinstance(tree, RBTree):
+        return SHAPE_RB
+    if isinstance(tree, Tree):
+        return SHAPE_TREE
+    return SHAPE_NONE
+
+def _shapes(tree: Tree) -> bytearray:
+    # The shape byte of every node in key order. A node's height is known after both subtrees, so
+    # each frame holds the node, its stage and its position in key order, and the heights of
+    # finished subtrees wait on a stack of their own.
+    nil = tree.nil
+    shapes = bytearray(len(tree))
+    position = 0
+    heights = []
+    stack = [[tree.root, 0, None]] if tree.root is not nil else []
+    while stack:
+        frame = stack[-1]
+        node = frame[0]
+        if frame[1] == 0:
+            frame[1] = 1
+            if node.left is not nil:
+                stack.append([node.left, 0, None])
+                continue
+            heights.append(0)
+        if frame[1] == 1:
+            frame[1] = 2
+            frame[2] = position
+            position += 1
+            if node.right is not nil:
+                stack.append([node.right, 0, None])
+                continue
+            heights.append(0)
+        right = heights.pop()
+        height = 1 + max(heights.pop(), right)
+        if height >= RED:
+            raise Exception("the tree is too deep to write its shape")
+        shapes[frame[2]] = height | (0 if getattr(node, 'black', True) else RED)
+        heights.append(height)
+        stack.pop()
+    return shapes
+
+def _write(file, items, count: int, kind: int, shapes: bytearray, block_size: int):
+    file.write(HEADER.pack(MAGIC, VERSION, kind, count))
+    keys = []
+    values = []
+    written = 0
+    for key, data in items:
+        keys.append(key)
+        values.append(data)
+        if len(keys) == block_size:
+            _write_block(file, keys, values, shapes, written)
+            written += len(keys)
+            keys = []
+            values = []
+    if len(keys) > 0:
+        _write_block(file, keys, values, shapes, written)
+        written += len(keys)
+    if written != count:
+        raise Exception(f"wrote {written} entries, not the expected {count}")
+
+def _write_block(file, keys: list, values: list, shapes: bytearray, written: int):
+    payload = pickle.dumps((keys, values), pickle.HIGHEST_PROTOCOL)
+    if shapes is not None:
+        payload += shapes[written:written + len(keys)]
+    file.write(BLOCK.pack(len(keys), len(payload), zlib.crc32(payload)))
+    file.write(payload)
+
+def _read_header(file) -> tuple:
+    header = file.read(HEADER.size)
+    if len(header) < HEADER.size:
+        raise Exception("file ended before the header")
+    magic, version, kind, count = HEADER.unpack(header)
+    if magic != MAGIC:
+        raise Exception("not a tree file")
+    if version != VERSION:
+        raise Exception(f"unsupported version {version}")
+    return kind, count
+
+def _read_blocks(file, kind: int, count: int):
+    # Yields the keys, data and shapes of each block, checked against its CRC-32
+    read = 0
+    index = 0
+    while read < count:
+        header = file.read(BLOCK.size)
+        if len(header) < BLOCK.size:
+            raise Exception(f"file ended after {read} of {count} entries")
+        entries, length, checksum = BLOCK.unpack(header)
+        payload = file.read(length)
+        if len(payload) < length or zlib.crc32(payload) != checksum:
+            raise Exception(f"block {index} is corrupt")
+        shapes = None
+        if kind != SHAPE_NONE:
+            shapes = payload[length - entries:]
+            payload = payload[:length - entries]
+        keys, values = pickle.loads(payload)
+        if len(keys) != entries or len(values) != entries:
+            raise Exception(f"block {index} is corrupt")
+        yield keys, values, shapes
+        read += entries
+        index += 1
+
+def _read_entries(file, kind: int, count: int):
+    for keys, values, shapes in _read_blocks(file, kind, count):
+        yield from zip(keys, values)
+
+def _read_shaped(file, kind: int, count: int):
+    for keys, values, shapes in _read_blocks(file, kind, count):
+        for key, value, shape in zip(keys, values, shapes):
+            yield key, value, shape & (RED - 1), not shape & RED
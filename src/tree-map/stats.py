@@ -0,0 +1,240 @@
+import threading
+
+from tree import Tree, AVLTree, RBTree
+
+# Opt-in counters for the tree hot paths. The plain trees are never touched, instead an
+# instrumented subclass is swapped in (instrumented(RBTree), or InstrumentedRBTree):
+#
+#   map = TreeMap(InstrumentedRBTree)
+#   ...
+#   map.tree.stats.as_dict()
+#   map.tree.stats.reset()
+#
+# The counters sit in overrides of the hooks the plain trees already call. An instrumented tree
+# creates its nodes from a counting subclass of its node type, whose black is a property counting
+# the colour changes and whose update_height counts the steps of the AVL loop. These count into the
+# stats of the tree running _balance_tree or _balance_delete, outside of the rotations they call,
+# so nodes moved between trees by split and join count for the tree they are in. The red-black
+# loops call no hook once per step, so their steps are counted by following the loop's cases over
+# the colours, without changing anything, before the loop runs.
+
+class TreeStats:
+
+    __slots__ = ('comparisons', 'rotations', 'recolours', 'rebalance_iterations', 'max_depth')
+
+    def __init__(self):
+        self.reset()
+
+    def __repr__(self) -> str:
+        return f"{self.as_dict()}"
+
+    def reset(self):
+        self.comparisons = 0
+        self.rotations = 0
+        self.recolours = 0
+        self.rebalance_iterations = 0
+        self.max_depth = 0
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+class _Rebalancing(threading.local):
+    # The stats of the tree whose rebalance loop is running in this thread, None outside of the loops
+    stats = None
+
+_rebalancing = _Rebalancing()
+
+class CountingKey:
+    # Stands in for a key during a descent, counting each comparison made against it. The descents
+    # compare the key with < once per level, so levels is the number of nodes visited.
+
+    __slots__ = ('key', 'stats', 'levels')
+
+    def __init__(self, key, stats: TreeStats):
+        self.key = key
+        self.stats = stats
+        self.levels = 0
+
+    def __lt__(self, other) -> bool:
+        self.stats.comparisons += 1
+        self.levels += 1
+        return self.key < other
+
+    def __le__(self, other) -> bool:
+        self.stats.comparisons += 1
+        return self.key <= other
+
+    def __gt__(self, other) -> bool:
+        self.stats.comparisons += 1
+        return self.key > other
+
+    def __ge__(self, other) -> bool:
+        self.stats.comparisons += 1
+        return self.key >= other
+
+    def __eq__(self, other) -> bool:
+        self.stats.comparisons += 1
+        return self.key == other
+
+    def __ne__(self, other) -> bool:
+        self.stats.comparisons += 1
+        return self.key != other
+
+    __hash__ = None
+
+class InstrumentedTree(Tree):
+
+    def __init__(self):
+        super().__init__()
+        self.stats = TreeStats()
+
+    def find(self, key):
+        counting_key = CountingKey(key, self.stats)
+        node = super().find(counting_key)
+        # The descent always reaches the bottom of the tree, its last node is at depth levels - 1
+        self.__record_depth(max(counting_key.levels - 1, 0))
+        return node
+
+    def _insert_node(self, new_node):
+        key = new_node.key
+        new_node.key = CountingKey(key, self.stats)
+        try:
+            node = super()._insert_node(new_node)
+        finally:
+            new_node.key = key
+        # Measured before any rebalancing, so this is the depth the descent reached
+        depth = 0
+        parent = node.parent
+        while parent is not None:
+            depth += 1
+            parent = parent.parent
+        self.__record_depth(depth)
+        return node
+
+    def _balance_tree(self, node):
+        stats, _rebalancing.stats = _rebalancing.stats, self.stats
+        try:
+            return super()._balance_tree(node)
+        finally:
+            _rebalancing.stats = stats
+
+    def _balance_delete(self, replacement):
+        stats, _rebalancing.stats = _rebalancing.stats, self.stats
+        try:
+            return super()._balance_delete(replacement)
+        finally:
+            _rebalancing.stats = stats
+
+    def _rotate_left(self, node):
+        self.stats.rotations += 1
+        # The heights updated by a rotation are not steps of the loop
+        stats, _rebalancing.stats = _rebalancing.stats, None
+        try:
+            super()._rotate_left(node)
+        finally:
+            _rebalancing.stats = stats
+
+    def _rotate_right(self, node):
+        self.stats.rotations += 1
+        stats, _rebalancing.stats = _rebalancing.stats, None
+        try:
+            super()._rotate_right(node)
+        finally:
+            _rebalancing.stats = stats
+
+    def __record_depth(self, depth: int):
+        if depth > self.stats.max_depth:
+            self.stats.max_depth = depth
+
+class InstrumentedRBTree(InstrumentedTree, RBTree):
+
+    def _balance_tree(self, node):
+        if node is not None:
+            self.stats.rebalance_iterations += _insert_steps(node)
+        return super()._balance_tree(node)
+
+    def _balance_delete(self, replacement):
+        self.stats.rebalance_iterations += _delete_steps(replacement)
+        return super()._balance_delete(replacement)
+
+def _insert_steps(node) -> int:
+    # The steps of RBTree._balance_tree past the checks at the top of its loop, for a black parent
+    # or a red root
+    steps = 0
+    while node.parent is not None:
+        parent = node.parent
+        if parent.black or parent.parent is None:
+            return steps
+        steps += 1
+        grandparent = parent.parent
+        parent_is_left = parent is grandparent.left
+        uncle = grandparent.right if parent_is_left else grandparent.left
+        if uncle.black:
+            # An inner child is first rotated outward in a step of its own, the rotation of the
+            # grandparent then ends the loop
+            return steps + (1 if (node is parent.left) != parent_is_left else 0)
+        node = grandparent
+    return steps
+
+def _delete_steps(node) -> int:
+    # The steps of RBTree._balance_delete, each moving the extra black of node up or absorbing it
+    steps = 0
+    while node.parent is not None and node.black:
+        steps += 1
+        parent = node.parent
+        sibling = parent.right if node is parent.left else parent.left
+        if not sibling.black or not (sibling.left.black and sibling.right.black):
+            # A red sibling is rotated up leaving a red parent, and a red nephew is rotated up to
+            # absorb the extra black, either ends the loop in this step
+            return steps
+        node = parent
+    return steps
+
+_counting_types = {}
+
+def _counting(node_type):
+    # A subclass of node_type counting into the stats of the running rebalance loop, created once per
+    # node type. Node types without a colour or a height have nothing to count.
+    if node_type in _counting_types:
+        return _counting_types[node_type]
+    namespace = {'__slots__': ()}
+    black = getattr(node_type, 'black', None)
+    if black is not None:
+        def set_black(self, value: bool):
+            stats = _rebalancing.stats
+            if stats is not None and value != black.__get__(self):
+                stats.recolours += 1
+            black.__set__(self, value)
+        namespace['black'] = property(black.__get__, set_black)
+    update_height = getattr(node_type, 'update_height', None)
+    if update_height is not None:
+        def counting_update_height(self):
+            stats = _rebalancing.stats
+            if stats is not None:
+                stats.rebalance_iterations += 1
+            update_height(self)
+        namespace['update_height'] = counting_update_height
+    counting_type = node_type
+    if len(namespace) > 1:
+        counting_type = type(f"Counting{node_type.__name__}", (node_type,), namespace)
+    _counting_types[node_type] = counting_type
+    return counting_type
+
+_instrumented_types = {}
+
+def instrumented(tree_type):
+    # The instrumented subclass of a tree type of tree.py, created once per type
+    if issubclass(tree_type, InstrumentedTree):
+        return tree_type
+    if not issubclass(tree_type, Tree):
+        raise Exception(f"only the trees of tree.py can be instrumented, not {tree_type.__name__}")
+    if tree_type not in _instrumented_types:
+        base = InstrumentedRBTree if issubclass(tree_type, RBTree) else InstrumentedTree
+        namespace = {'node_type': _counting(tree_type.node_type)}
+        _instrumented_types[tree_type] = type(f"Instrumented{tree_type.__name__}", (base, tree_type), namespace)
+    return _instrumented_types[tree_type]
+
+InstrumentedRBTree.node_type = _counting(RBTree.node_type)
+_instrumented_types[Tree] = InstrumentedTree
+_instrumented_types[RBTree] = InstrumentedRBTree
+InstrumentedAVLTree = instrumented(AVLTree)
@@ -0,0 +1,120 @@
+import random
+import unittest
+
+from array_tree import ArrayRBTree
+from tree_map import TreeMap
+
+class TestArrayRBTree(unittest.TestCase):
+
+    def test_find_given_empty_tree_then_nil(self):
+        tree = ArrayRBTree()
+        self.assertEqual(tree.nil, tree.find(1))
+        self.assertIsNone(tree.find(1).key)
+
+    def test_insert_then_found(self):
+        tree = ArrayRBTree()
+        tree.insert(2, 'b')
+        tree.insert(1, 'a')
+        tree.insert(3, 'c')
+        self.assertEqual('a', tree.find(1).data)
+        self.assertEqual(3, len(tree))
+        self.assertTrue(tree.validate())
+
+    def test_insert_given_duplicate_then_existing_node(self):
+        tree = ArrayRBTree()
+        node = tree.insert(1, 'a')
+        self.assertEqual(node, tree.insert(1, 'b'))
+        self.assertEqual('a', tree.find(1).data)
+        self.assertEqual(1, len(tree))
+
+    def test_insert_given_none_key_then_exception(self):
+        tree = ArrayRBTree()
+        self.assertRaises(Exception, lambda: tree.insert(None, None))
+
+    def test_delete_given_missing_then_false(self):
+        tree = ArrayRBTree()
+        self.assertFalse(tree.delete(1))
+        tree.insert(1, None)
+        self.assertFalse(tree.delete(2))
+
+    def test_delete_reuses_freed_ids(self):
+        tree = ArrayRBTree()
+        for key in range(10):
+            tree.insert(key, None)
+        tree.delete(3)
+        tree.delete(7)
+        tree.insert(20, None)
+        tree.insert(21, None)
+        self.assertEqual(11, len(tree.keys))
+        self.assertTrue(tree.validate())
+
+    def test_inserts_and_deletes_keep_tree_valid(self):
+        rand = random.Random(0)
+        tree = ArrayRBTree()
+        expected = set()
+        for i in range(2000):
+            key = rand.randrange(200)
+            if rand.random() < 0.55:
+                tree.insert(key, str(key))
+                expected.add(key)
+            else:
+                self.assertEqual(key in expected, tree.delete(key))
+                expected.discard(key)
+            self.assertTrue(tree.validate())
+        self.assertSequenceEqual([node.key for node in tree.iter()], sorted(expected))
+
+    def test_from_sorted_then_valid_and_ordered(self):
+        for count in (0, 1, 2, 7, 100):
+            tree = ArrayRBTree.from_sorted((key, str(key)) for key in range(count))
+            self.assertTrue(tree.validate())
+            self.assertSequenceEqual([node.data for node in tree.iter()], [str(key) for key in range(count)])
+
+    def test_from_sorted_given_unsorted_then_exception(self):
+        self.assertRaises(Exception, lambda: ArrayRBTree.from_sorted([(2, None), (1, None)]))
+
+    def test_insert_many_and_delete_many_given_small_and_large_batches(self):
+        for batch_size in (2, 300):
+            tree = ArrayRBTree.from_sorted([(key, None) for key in range(0, 1000, 2)])
+            node = tree.find(500)
+            batch = random.Random(batch_size).sample(range(1000), batch_size)
+            nodes = tree.insert_many([(key, None) for key in batch])
+            self.assertSequenceEqual([node.key for node in nodes], sorted(batch))
+            self.assertEqual(node, tree.find(500))
+            deleted = tree.delete_many(range(0, 1000, 3))
+            self.assertEqual(len(set(range(0, 1000, 3)) & (set(range(0, 1000, 2)) | set(batch))), deleted)
+            self.assertTrue(tree.validate())
+
+    def test_navigation_and_range(self):
+        tree = ArrayRBTree.from_sorted([(key, None) for key in range(0, 10, 2)])
+        self.assertEqual(0, tree.first().key)
+        self.assertEqual(8, tree.last().key)
+        self.assertEqual(4, tree.floor(5).key)
+        self.assertEqual(6, tree.ceiling(5).key)
+        self.assertEqual(2, tree.lower(4).key)
+        self.assertEqual(6, tree.higher(4).key)
+        self.assertEqual(tree.nil, tree.higher(8))
+        self.assertSequenceEqual([node.key for node in tree.range(2, 6)], [2, 4, 6])
+        self.assertSequenceEqual([node.key for node in tree.range(2, 6, inclusive=False)], [4])
+
+    def test_iter_given_delete_during_iteration_then_error(self):
+        tree = ArrayRBTree.from_sorted([(key, None) for key in range(10)])
+
+        def delete_during_iteration():
+            for node in tree.iter():
+                tree.delete(node.key)
+
+        self.assertRaises(RuntimeError, delete_during_iteration)
+
+    def test_tree_map_given_array_tree(self):
+        for mode in ("value", "node", "ordered"):
+            map = TreeMap(ArrayRBTree, mode)
+            map.insert_many((key, str(key)) for key in range(100))
+            map.insert(5, 'five')
+            map.delete(6)
+            self.assertEqual('five', map.find(5))
+            self.assertIsNone(map.find(6))
+            self.assertEqual('7', map.ceiling(6).data)
+            self.assertTrue(map.tree.validate())
+
+if __name__ == '__main__':
+    unittest.main()
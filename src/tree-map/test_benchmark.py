@@ -0,0 +1,46 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+
+import benchmark
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_keys_in_order_given_any_order_then_permutation(self):
+        for order in benchmark.ORDERS:
+            keys = benchmark.keys_in_order(order, 101)
+            self.assertSequenceEqual(sorted(keys), range(101))
+
+    def test_keys_in_order_given_adversarial_then_alternating_extremes(self):
+        self.assertSequenceEqual(benchmark.keys_in_order("adversarial", 6), [0, 5, 1, 4, 2, 3])
+
+    def test_compare_given_slower_result_then_regression(self):
+        baseline = [benchmark.record("operations", "find", "RBTree", 10, 1.0, order="random")]
+        results = [benchmark.record("operations", "find", "RBTree", 10, 1.5, order="random")]
+        regressions = benchmark.compare(results, baseline, 0.1, io.StringIO())
+        self.assertSequenceEqual(regressions, results)
+
+    def test_compare_given_faster_or_unmatched_result_then_no_regression(self):
+        baseline = [benchmark.record("operations", "find", "RBTree", 10, 1.0, order="random")]
+        results = [
+            benchmark.record("operations", "find", "RBTree", 10, 0.5, order="random"),
+            benchmark.record("operations", "find", "RBTree", 20, 9.0, order="random"),
+        ]
+        self.assertSequenceEqual(benchmark.compare(results, baseline, 0.1, io.StringIO()), [])
+
+    def test_main_writes_json_results(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "results.json")
+            code = benchmark.main(["operations", "--sizes", "50", "--repeat", "1", "--output", path])
+            self.assertEqual(0, code)
+            with open(path) as file:
+                results = json.load(file)["results"]
+        benchmarks = set(result["benchmark"] for result in results)
+        self.assertSetEqual(benchmarks, {"insert", "find", "iterate", "delete", "mixed"})
+        structures = set(result["structure"] for result in results)
+        self.assertSetEqual(structures, set(benchmark.STRUCTURES))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import random
+import unittest
+
+from bplus_tree import BPlusTree
+from tree_map import TreeMap
+
+class TestBPlusTree(unittest.TestCase):
+
+    def test_find_given_empty_tree_then_nil(self):
+        tree = BPlusTree()
+        self.assertIs(tree.nil, tree.find(1))
+
+    def test_new_tree_given_small_order_then_exception(self):
+        self.assertRaises(Exception, lambda: BPlusTree(2))
+
+    def test_insert_then_found(self):
+        tree = BPlusTree(3)
+        tree.insert(2, 'b')
+        tree.insert(1, 'a')
+        tree.insert(3, 'c')
+        tree.insert(4, 'd')
+        self.assertEqual('a', tree.find(1).data)
+        self.assertEqual(4, len(tree))
+        self.assertEqual(1, tree.height)
+        self.assertTrue(tree.validate())
+
+    def test_insert_given_duplicate_then_existing_entry(self):
+        tree = BPlusTree()
+        entry = tree.insert(1, 'a')
+        self.assertIs(entry, tree.insert(1, 'b'))
+        self.assertEqual('a', tree.find(1).data)
+        self.assertEqual(1, len(tree))
+
+    def test_insert_given_none_key_then_exception(self):
+        tree = BPlusTree()
+        self.assertRaises(Exception, lambda: tree.insert(None, None))
+
+    def test_delete_given_missing_then_false(self):
+        tree = BPlusTree()
+        self.assertFalse(tree.delete(1))
+        tree.insert(1, None)
+        self.assertFalse(tree.delete(2))
+
+    def test_delete_all_then_empty(self):
+        tree = BPlusTree(4)
+        for key in range(100):
+            tree.insert(key, None)
+        for key in range(100):
+            self.assertTrue(tree.delete(key))
+            self.assertTrue(tree.validate())
+        self.assertEqual(0, tree.height)
+        self.assertSequenceEqual(list(tree.iter()), [])
+
+    def test_inserts_and_deletes_keep_tree_valid(self):
+        for order in (3, 4, 5, 16):
+            rand = random.Random(order)
+            tree = BPlusTree(order)
+            expected = set()
+            for i in range(2000):
+                key = rand.randrange(200)
+                if rand.random() < 0.55:
+                    tree.insert(key, str(key))
+                    expected.add(key)
+                else:
+                    self.assertEqual(key in expected, tree.delete(key))
+                    expected.discard(key)
+                self.assertTrue(tree.validate())
+            self.assertSequenceEqual([entry.key for entry in tree.iter()], sorted(expected))
+
+    def test_entries_keep_identity_through_splits_and_merges(self):
+        tree = BPlusTree(4)
+        entry = tree.insert(50, 'a')
+        for key in range(100):
+            tree.insert(key, None)
+        for key in range(0, 100, 3):
+            tree.delete(key)
+        self.assertIs(entry, tree.find(50))
+        self.assertTrue(tree.delete_node(entry))
+        self.assertFalse(tree.delete_node(entry))
+
+    def test_from_sorted_then_valid_and_ordered(self):
+        for count in (0, 1, 2, 7, 100, 1000):
+            tree = BPlusTree.from_sorted(((key, str(key)) for key in range(count)), order=8)
+            self.assertTrue(tree.validate())
+            self.assertSequenceEqual([entry.data for entry in tree.iter()], [str(key) for key in range(count)])
+
+    def test_from_sorted_given_unsorted_then_exception(self):
+        self.assertRaises(Exception, lambda: BPlusTree.from_sorted([(2, None), (1, None)]))
+
+    def test_insert_many_and_delete_many_given_small_and_large_batches(self):
+        for batch_size in (2, 300):
+            tree = BPlusTree.from_sorted([(key, None) for key in range(0, 1000, 2)], order=8)
+            entry = tree.find(500)
+            batch = random.Random(batch_size).sample(range(1000), batch_size)
+            entries = tree.insert_many([(key, None) for key in batch])
+            self.assertSequenceEqual([entry.key for entry in entries], sorted(batch))
+            self.assertIs(entry, tree.find(500))
+            deleted = tree.delete_many(range(0, 1000, 3))
+            self.assertEqual(len(set(range(0, 1000, 3)) & (set(range(0, 1000, 2)) | set(batch))), deleted)
+            self.assertTrue(tree.validate())
+
+    def test_navigation_and_range_across_leaves(self):
+        tree = BPlusTree.from_sorted([(key, None) for key in range(0, 40, 2)], order=3)
+        self.assertEqual(0, tree.first().key)
+        self.assertEqual(38, tree.last().key)
+        for key in range(-1, 40):
+            self.assertEqual(key - key % 2 if key >= 0 else None, tree.floor(key).key)
+            self.assertEqual(key + key % 2 if key < 39 else None, tree.ceiling(key).key)
+        self.assertEqual(2, tree.lower(4).key)
+        self.assertEqual(6, tree.higher(4).key)
+        self.assertIs(tree.nil, tree.lower(0))
+        self.assertIs(tree.nil, tree.higher(38))
+        self.assertSequenceEqual([entry.key for entry in tree.range(3, 12)], [4, 6, 8, 10, 12])
+        self.assertSequenceEqual([entry.key for entry in tree.range(4, 12, inclusive=False)], [6, 8, 10])
+
+    def test_iter_given_delete_during_iteration_then_error(self):
+        tree = BPlusTree.from_sorted([(key, None) for key in range(10)])
+
+        def delete_during_iteration():
+            for entry in tree.iter():
+                tree.delete(entry.key)
+
+        self.assertRaises(RuntimeError, delete_during_iteration)
+
+    def test_tree_map_given_bplus_tree(self):
+        for mode in ("value", "node", "ordered"):
+            map = TreeMap(lambda: BPlusTree(4), mode)
+            map.insert_many((key, str(key)) for key in range(100))
+            map.insert(5, 'five')
+            map.delete(6)
+            self.assertEqual('five', map.find(5))
+            self.assertIsNone(map.find(6))
+            self.assertEqual('7', map.ceiling(6).data)
+            self.assertTrue(map.tree.validate())
+
+if __name__ == '__main__':
+    unittest.main()
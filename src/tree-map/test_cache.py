@@ -0,0 +1,82 @@
+import unittest
+
+from cache import LRUCache, ClockCache
+
+class TestCache(unittest.TestCase):
+
+    def test_new_cache_given_no_budget_then_exception(self):
+        for cache_type in (LRUCache, ClockCache):
+            self.assertRaises(Exception, lambda: cache_type())
+            self.assertRaises(Exception, lambda: cache_type(0))
+            self.assertRaises(Exception, lambda: cache_type(max_bytes=0))
+
+    def test_put_given_full_then_least_recently_used_evicted(self):
+        cache = LRUCache(2)
+        cache.put(1, 'a')
+        cache.put(2, 'b')
+        self.assertEqual('a', cache.get(1))
+        cache.put(3, 'c')
+        self.assertNotIn(2, cache)
+        self.assertEqual('a', cache.get(1))
+        self.assertEqual('c', cache.get(3))
+        self.assertEqual(2, len(cache))
+
+    def test_put_given_full_clock_then_unreferenced_evicted(self):
+        cache = ClockCache(3)
+        for key in (1, 2, 3):
+            cache.put(key, str(key))
+        # A full sweep clears every bit, then the hand evicts from where it started
+        cache.put(4, '4')
+        self.assertNotIn(1, cache)
+        cache.get(2)
+        cache.put(5, '5')
+        self.assertIn(2, cache)
+        self.assertNotIn(3, cache)
+        self.assertEqual(3, len(cache))
+        self.assertEqual(2, cache.evictions)
+
+    def test_put_given_byte_budget_then_evicted_to_fit(self):
+        for cache_type in (LRUCache, ClockCache):
+            cache = cache_type(max_bytes=10, sizeof=len)
+            cache.put(1, b'abcd')
+            cache.put(2, b'efgh')
+            cache.put(3, b'ijkl')
+            self.assertNotIn(1, cache)
+            self.assertEqual(8, cache.bytes)
+            cache.put(2, b'e')
+            self.assertEqual(5, cache.bytes)
+            cache.put(4, b'x' * 11)
+            self.assertNotIn(4, cache)
+            cache.pop(3)
+            self.assertEqual(1, cache.bytes)
+
+    def test_stats_then_hits_misses_and_evictions(self):
+        for cache_type in (LRUCache, ClockCache):
+            cache = cache_type(1)
+            cache.put(1, 'a')
+            cache.get(1)
+            cache.get(2)
+            cache.put(2, 'b')
+            stats = cache.stats()
+            self.assertEqual(1, stats["hits"])
+            self.assertEqual(1, stats["misses"])
+            self.assertEqual(1, stats["evictions"])
+            self.assertEqual(0.5, stats["hit_ratio"])
+            self.assertEqual(1, stats["entries"])
+            cache.reset_stats()
+            self.assertEqual(0, cache.stats()["hits"])
+
+    def test_pop_and_clear_then_missing(self):
+        for cache_type in (LRUCache, ClockCache):
+            cache = cache_type(2)
+            cache.put(1, 'a')
+            self.assertEqual('a', cache.pop(1))
+            self.assertIsNone(cache.pop(1))
+            cache.put(2, 'b')
+            cache.clear()
+            self.assertIsNone(cache.get(2))
+            cache.put(3, 'c')
+            self.assertEqual('c', cache.get(3))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+
+from cache import ClockCache, LRUCache
+from cached_tree_map import CachedTreeMap
+
+class TestCachedTreeMap(unittest.TestCase):
+
+    def setUp(self):
+        self.loaded = []
+
+    def loader(self, key):
+        self.loaded.append(key)
+        return str(key)
+
+    def test_new_map_given_value_mode_then_exception(self):
+        self.assertRaises(Exception, lambda: CachedTreeMap(self.loader, mode="value"))
+
+    def test_find_given_evicted_then_loaded(self):
+        for mode in ("node", "ordered"):
+            self.loaded.clear()
+            map = CachedTreeMap(self.loader, mode=mode, cache=LRUCache(2))
+            for key in range(4):
+                map.insert(key, str(key))
+            self.assertEqual('3', map.find(3))
+            self.assertEqual('0', map.find(0))
+            self.assertEqual('0', map.find(0))
+            self.assertIsNone(map.find(4))
+            self.assertSequenceEqual(self.loaded, [0])
+            self.assertEqual(3, map.cache.evictions)
+
+    def test_find_given_cached_none_then_not_loaded(self):
+        map = CachedTreeMap(self.loader)
+        map.insert(1, None)
+        self.assertIsNone(map.find(1))
+        self.assertSequenceEqual(self.loaded, [])
+
+    def test_items_then_values_in_key_order(self):
+        map = CachedTreeMap(self.loader, cache=ClockCache(2))
+        map.bulk_load((key, str(key)) for key in range(5))
+        self.assertSequenceEqual(list(map.items()), [(key, str(key)) for key in range(5)])
+        self.assertSequenceEqual(list(map.items(1, 3)), [(1, '1'), (2, '2'), (3, '3')])
+        self.assertEqual(map.cache.misses, len(self.loaded))
+
+    def test_delete_then_not_loaded(self):
+        map = CachedTreeMap(self.loader, cache=LRUCache(1))
+        map.insert_many([(1, 'a'), (2, 'b'), (3, 'c')])
+        map.delete(1)
+        map.delete_many([2])
+        self.assertIsNone(map.find(1))
+        self.assertIsNone(map.find(2))
+        self.assertEqual('c', map.find(3))
+        self.assertSequenceEqual(self.loaded, [])
+        self.assertSequenceEqual([node.key for node in map.iter()], [3])
+
+    def test_delete_range_then_evicted_and_entries_loaded_lazily(self):
+        map = CachedTreeMap(self.loader, cache=LRUCache(2))
+        map.insert_many((key, str(key)) for key in range(5))
+        removed = map.delete_range(1, 3, entries=True)
+        self.assertNotIn(3, map.cache)
+        self.assertSequenceEqual(self.loaded, [])
+        self.assertEqual((1, '1'), next(removed))
+        self.assertSequenceEqual(self.loaded, [1])
+        self.assertSequenceEqual(list(removed), [(2, '2'), (3, '3')])
+        self.assertSequenceEqual(self.loaded, [1, 2])
+        self.assertSequenceEqual([node.key for node in map.iter()], [0, 4])
+
+
+if __name__ == '__main__':
+    unittest.main()
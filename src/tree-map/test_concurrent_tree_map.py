@@ -0,0 +1,138 @@
+import random
+import threading
+import unittest
+
+from concurrent_tree_map import ConcurrentTreeMap, ReadWriteLock
+from tree import AVLTree, SizedRBTree
+
+class TestReadWriteLock(unittest.TestCase):
+
+    def test_readers_share_and_writer_excludes(self):
+        lock = ReadWriteLock()
+        lock.acquire_read()
+        lock.acquire_read()
+        acquired = threading.Event()
+
+        def write():
+            lock.acquire_write()
+            acquired.set()
+            lock.release_write()
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        self.assertFalse(acquired.wait(0.05))
+        lock.release_read()
+        lock.release_read()
+        self.assertTrue(acquired.wait(5))
+        writer.join()
+
+class TestConcurrentTreeMap(unittest.TestCase):
+
+    def test_single_thread_behaves_like_tree_map(self):
+        for mode in ("value", "node", "ordered"):
+            map = ConcurrentTreeMap(SizedRBTree, mode)
+            map.insert_many((key, str(key)) for key in range(10))
+            map.insert(3, 'three')
+            map.delete(4)
+            self.assertEqual('three', map.find(3))
+            self.assertIsNone(map.find(4))
+            self.assertEqual('5', map.ceiling(4).data)
+            self.assertEqual(4, map.rank(5))
+            self.assertSequenceEqual([node.key for node in map.range(2, 6)], [2, 3, 5, 6])
+
+    def test_iteration_releases_read_lock(self):
+        map = ConcurrentTreeMap()
+        map.insert_many((key, None) for key in range(10))
+        for node in map.iter():
+            if node.key == 5:
+                break
+        map.insert(20, None)
+        self.assertEqual(11, len(map.tree))
+
+    def test_iteration_given_writes_in_loop_then_no_deadlock(self):
+        map = ConcurrentTreeMap()
+        map.insert_many((key, None) for key in range(10))
+        for node in map.range(2, 6):
+            map.delete(node.key)
+        for node in reversed(map):
+            map.insert(node.key + 100, None)
+        self.assertSequenceEqual([node.key for node in map.iter()], [0, 1, 7, 8, 9, 100, 101, 107, 108, 109])
+
+    def test_reversed_releases_read_lock_and_cursor_refused(self):
+        map = ConcurrentTreeMap()
+        map.insert_many((key, None) for key in range(10))
+        self.assertSequenceEqual([node.key for node in reversed(map)], list(range(9, -1, -1)))
+        map.insert(20, None)
+        self.assertRaises(Exception, lambda: map.cursor())
+
+    def test_delete_range_then_entries_read_after_release(self):
+        map = ConcurrentTreeMap(SizedRBTree, "node")
+        map.insert_many((key, str(key)) for key in range(10))
+        removed = map.delete_range(3, 6, (True, False), entries=True)
+        map.insert(4, 'x')
+        self.assertSequenceEqual(list(removed), [(3, '3'), (4, '4'), (5, '5')])
+        self.assertSequenceEqual([node.key for node in map.iter()], [0, 1, 2, 4, 6, 7, 8, 9])
+        self.assertEqual('x', map.find(4))
+
+
+    def test_stress_given_many_threads_then_valid(self):
+        for tree_type, mode in ((SizedRBTree, "value"), (AVLTree, "node"), (SizedRBTree, "ordered")):
+            map = ConcurrentTreeMap(tree_type, mode)
+            errors = []
+
+            def work(seed: int):
+                rand = random.Random(seed)
+                try:
+                    for i in range(300):
+                        key = rand.randrange(200)
+                        op = rand.random()
+                        if op < 0.3:
+                            map.insert(key, key)
+                        elif op < 0.5:
+                            map.delete(key)
+                        elif op < 0.55:
+                            map.insert_many((key + offset, key) for offset in range(10))
+                        elif op < 0.6:
+                            map.delete_many(range(key, key + 10))
+                        elif op < 0.8:
+                            value = map.find(key)
+                            # Values are the key, or a key up to 9 below it for the batches
+                            if value is not None and not key - 9 <= value <= key:
+                                errors.append(f"{key} has the value {value}")
+                        else:
+                            keys = [node.key for node in map.range(key, key + 20)]
+                            if keys != sorted(keys):
+                                errors.append(f"range from {key} is out of order")
+                except Exception as error:
+                    errors.append(error)
+
+            threads = [threading.Thread(target=work, args=(seed,)) for seed in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertSequenceEqual(errors, [])
+            self.assertTrue(map.tree.validate())
+            if map.map is not None:
+                self.assertSetEqual(set(map.map), set(node.key for node in map.iter()))
+
+    def test_insert_many_then_readers_see_none_or_all(self):
+        map = ConcurrentTreeMap()
+        seen = []
+        done = threading.Event()
+
+        def read():
+            while not done.is_set():
+                seen.append(len(list(map.range(1000, 2000))))
+
+        reader = threading.Thread(target=read)
+        reader.start()
+        for start in range(1000, 2000, 100):
+            map.insert_many((key, None) for key in range(start, start + 100))
+            map.delete_many(range(start, start + 100))
+        done.set()
+        reader.join()
+        self.assertTrue(all(count in (0, 100) for count in seen))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import io
+import os
+import tempfile
+import unittest
+
+import corpus
+import serialization
+from tree import SizedRBTree
+
+class TestCorpus(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.paths = []
+        for name, text in (('b.md', b"# B\nb1\nb2"), ('a.md', b"a0\n# A\na1"), ('empty.md', b"")):
+            path = os.path.join(self.directory.name, name)
+            with open(path, 'wb') as file:
+                file.write(text)
+            self.paths.append(path)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_build_corpus_then_map_per_document(self):
+        maps = corpus.build_corpus(self.paths, workers=2)
+        self.assertSetEqual(set(maps), set(self.paths))
+        self.assertEqual("b2", maps[self.paths[0]].find((1, 2)))
+        self.assertSequenceEqual([node.key for node in maps[self.paths[1]].iter()], [(0, 1), (1, 0), (1, 1)])
+        self.assertSequenceEqual(list(maps[self.paths[2]].iter()), [])
+
+    def test_build_combined_then_keyed_by_path_in_order(self):
+        map = corpus.build_combined(self.paths, workers=2, tree_type=SizedRBTree)
+        a, b = self.paths[1], self.paths[0]
+        self.assertSequenceEqual([node.key for node in map.iter()],
+                                 [(a, (0, 1)), (a, (1, 0)), (a, (1, 1)), (b, (1, 0)), (b, (1, 1)), (b, (1, 2))])
+        self.assertEqual("a1", map.find((a, (1, 1))))
+        self.assertEqual(6, len(map.tree))
+        self.assertTrue(map.tree.validate())
+
+    def test_sorted_run_given_equal_keys_then_unsorted_keys_exception(self):
+        def parse(lines):
+            for offset, line in lines:
+                yield (0, 0), {"line": line}, offset
+        run = corpus.sorted_run(self.paths[0], parse)
+        with self.assertRaises(Exception) as raised:
+            serialization.load_map(io.BytesIO(run))
+        self.assertIn("keys must be sorted and unique", str(raised.exception))
+
+    def test_build_given_no_paths_then_empty(self):
+        self.assertDictEqual(corpus.build_corpus([]), {})
+        self.assertEqual(0, len(corpus.build_combined([]).tree))
+
+if __name__ == '__main__':
+    unittest.main()
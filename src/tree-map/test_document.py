@@ -0,0 +1,228 @@
+import unittest
+
+from document import Document, Section
+from array_tree import ArrayRBTree
+
+class TestDocument(unittest.TestCase):
+
+    def build(self, tree_type = None) -> Document:
+        document = Document() if tree_type is None else Document(tree_type)
+        document.add_element((), 'title')
+        document.add_section((), 'intro')
+        document.add_element(('intro',), 'a')
+        document.add_element(('intro',), 'b')
+        document.add_section(('intro',), 'background')
+        document.add_element(('intro', 'background'), 'c')
+        document.add_section((), 'body')
+        document.add_element(('body',), 'd')
+        return document
+
+    def data(self, elements) -> list:
+        return [element.data.label if isinstance(element.data, Section) else element.data for element in elements]
+
+    def test_walk_then_in_order_by_section_and_element(self):
+        for tree_type in (None, ArrayRBTree):
+            document = self.build(tree_type)
+            self.assertSequenceEqual(self.data(document.walk()), ['title', 'intro', 'a', 'b', 'background', 'c', 'body', 'd'])
+            self.assertSequenceEqual(self.data(document.walk(('intro',))), ['a', 'b', 'background', 'c'])
+
+    def test_add_element_given_order_then_placed_between(self):
+        document = self.build()
+        element = document.add_element(('intro',), 'between', 0.5)
+        self.assertSequenceEqual(self.data(document.walk(('intro',))), ['a', 'between', 'b', 'background', 'c'])
+        self.assertIs(element, document.element(element.id))
+        self.assertRaises(Exception, lambda: document.add_element(('intro',), 'again', 0.5))
+
+    def test_add_element_given_non_numeric_orders_then_order_required(self):
+        for orders in (('a', 'c', 'b'), ((1, 'a'), (2, 'a'), (1, 'b'))):
+            document = Document()
+            for order in orders:
+                document.add_element((), str(order), order)
+            self.assertRaises(Exception, lambda: document.add_element((), 'last'))
+            self.assertSequenceEqual(self.data(document.walk(())), [str(order) for order in sorted(orders)])
+        document = self.build()
+        document.add_element(('intro',), 'after', 2.5)
+        self.assertEqual(3.5, document.add_element(('intro',), 'last').order)
+
+    def test_add_element_given_none_or_missing_section_then_exception(self):
+        document = Document()
+        self.assertRaises(Exception, lambda: document.add_element((), None))
+        self.assertRaises(Exception, lambda: document.add_element(('missing',), 'a'))
+
+    def test_add_section_given_existing_path_then_exception(self):
+        document = self.build()
+        self.assertRaises(Exception, lambda: document.add_section((), 'intro'))
+
+    def test_section_then_found_by_path(self):
+        document = self.build()
+        section = document.section(('intro', 'background'))
+        self.assertEqual('background', section.label)
+        self.assertIs(document.section(('intro',)), section.parent)
+        self.assertEqual(1, len(section))
+        self.assertIsNone(document.section(('missing',)))
+        self.assertIs(document.section(('intro', 'background')), document.next_section(('intro',)))
+        self.assertIs(document.section(('body',)), document.next_section(('intro', 'background')))
+        self.assertIsNone(document.next_section(('body',)))
+
+    def test_walk_given_follow_references_then_targets_after_source(self):
+        document = self.build()
+        title = document.section(()).elements.first().data
+        document.add_reference('see-body', title.id, ('body',))
+        d = document.section(('body',)).elements.first().data
+        document.add_reference('see-title', d.id, title.id)
+        self.assertSequenceEqual(self.data(document.walk()), ['title', 'intro', 'a', 'b', 'background', 'c', 'body', 'd'])
+        self.assertSequenceEqual(self.data(document.walk(follow_references=True)),
+                                 ['title', 'd', 'intro', 'a', 'b', 'background', 'c', 'body', 'd', 'title'])
+
+    def test_reference_then_resolved_until_target_deleted(self):
+        document = self.build()
+        title = document.section(()).elements.first().data
+        reference = document.add_reference('see-intro', title.id, ['intro'])
+        self.assertIs(reference, document.reference('see-intro'))
+        self.assertIs(document.section(('intro',)), document.resolve('see-intro'))
+        self.assertRaises(Exception, lambda: document.add_reference('see-intro', title.id, ('body',)))
+        document.delete_section(('intro',))
+        # The reference goes with its target
+        self.assertIsNone(document.resolve('see-intro'))
+        self.assertIsNone(document.reference('see-intro'))
+        self.assertIsNone(title.references)
+        self.assertFalse(document.delete_reference('see-intro'))
+
+    def test_delete_reference_then_not_referencing(self):
+        document = self.build()
+        title = document.section(()).elements.first().data
+        document.add_reference('see-body', title.id, ('body',))
+        document.add_reference('also-body', title.id, ('body',))
+        self.assertSequenceEqual([reference.label for reference in document.referencing(['body'])], ['see-body', 'also-body'])
+        self.assertTrue(document.delete_reference('see-body'))
+        self.assertSequenceEqual([reference.label for reference in document.referencing(('body',))], ['also-body'])
+        self.assertSequenceEqual(list(title.references), ['also-body'])
+
+    def test_delete_section_then_references_to_its_elements_deleted(self):
+        document = self.build()
+        title = document.section(()).elements.first().data
+        c = document.section(('intro', 'background')).elements.first().data
+        d = document.section(('body',)).elements.first().data
+        document.add_reference('see-c', title.id, c.id)
+        document.add_reference('d-to-c', d.id, c.id)
+        document.add_reference('see-background', d.id, ('intro', 'background'))
+        document.add_reference('see-d', c.id, d.id)
+        document.add_reference('see-body', title.id, ('body',))
+        document.delete_section(('intro',))
+        self.assertSequenceEqual(list(document.references), ['see-body'])
+        self.assertSequenceEqual(list(title.references), ['see-body'])
+        self.assertIsNone(d.references)
+        self.assertSequenceEqual(document.referencing(d.id), [])
+        self.assertEqual(1, len(document.index))
+        self.assertSequenceEqual(self.data(document.walk(follow_references=True)), ['title', 'd', 'body', 'd'])
+
+    def test_delete_element_then_its_references_deleted(self):
+        document = self.build()
+        a = document.section(('intro',)).elements.first().data
+        document.add_reference('from-a', a.id, ('body',))
+        self.assertTrue(document.delete_element(a.id))
+        self.assertFalse(document.delete_element(a.id))
+        self.assertIsNone(document.element(a.id))
+        self.assertIsNone(document.reference('from-a'))
+        self.assertSequenceEqual(self.data(document.walk(('intro',))), ['b', 'background', 'c'])
+
+    def test_delete_section_then_subsections_and_elements_deleted(self):
+        document = self.build()
+        c = document.section(('intro', 'background')).elements.first().data
+        document.add_reference('from-c', c.id, ('body',))
+        ids = [element.id for element in document.walk(('intro',))]
+        self.assertTrue(document.delete_section(('intro',)))
+        self.assertFalse(document.delete_section(('intro',)))
+        self.assertIsNone(document.section(('intro', 'background')))
+        self.assertTrue(all(document.element(id) is None for id in ids))
+        self.assertIsNone(document.reference('from-c'))
+        self.assertSequenceEqual(self.data(document.walk()), ['title', 'body', 'd'])
+        self.assertEqual(3, len(document.elements))
+
+    def test_delete_section_given_root_then_exception(self):
+        document = self.build()
+        self.assertRaises(Exception, lambda: document.delete_section(()))
+
+    def first(self, document, path):
+        return document.section(path).elements.first().data
+
+    def test_walk_given_false_condition_then_element_and_subsection_skipped(self):
+        document = self.build()
+        hidden = document.add_element((), lambda element: False)
+        document.add_reference('hide-intro', document.section(('intro',)).element.id, hidden.id)
+        self.assertSequenceEqual(self.data(document.walk()), ['title', 'body', 'd'])
+
+    def test_walk_given_state_condition_then_called_with_state(self):
+        document = self.build()
+        calls = []
+
+        def condition(element, state):
+            calls.append(element.data)
+            return state['show']
+
+        function = document.add_element((), condition)
+        document.add_reference('show-a', self.first(document, ('intro',)).id, function.id)
+        self.assertSequenceEqual(self.data(document.walk(('intro',), state={'show': False})), ['b', 'background', 'c'])
+        self.assertSequenceEqual(self.data(document.walk(('intro',), state={'show': True})), ['a', 'b', 'background', 'c'])
+        self.assertSequenceEqual(calls, ['a', 'a'])
+
+    def test_plan_given_stateless_condition_then_evaluated_once_per_walk(self):
+        document = self.build()
+        calls = []
+        function = document.add_element((), lambda element: calls.append(element.data) is None)
+        document.add_reference('check-a', self.first(document, ('intro',)).id, function.id)
+        document.add_reference('check-d', self.first(document, ('body',)).id, function.id)
+        plan = document.plan()
+        walk = plan.walk()
+        next(walk)
+        self.assertSequenceEqual(calls, ['a', 'd'])
+        self.assertSequenceEqual(self.data(walk), ['intro', 'a', 'b', 'background', 'c', 'body', 'd'])
+        self.assertSequenceEqual(calls, ['a', 'd'])
+
+    def test_walk_given_router_then_target_visited_after_element(self):
+        document = self.build()
+        title = self.first(document, ())
+        document.add_reference('to-body', title.id, ('body',))
+        router = document.add_element((), lambda element: 'to-body')
+        document.add_reference('route-title', title.id, router.id)
+        self.assertSequenceEqual(self.data(document.walk()), ['title', 'd', 'intro', 'a', 'b', 'background', 'c', 'body', 'd'])
+
+    def test_walk_given_router_and_follow_references_then_target_visited_once(self):
+        document = self.build()
+        title = self.first(document, ())
+        document.add_reference('to-body', title.id, ('body',))
+        router = document.add_element((), lambda element: 'to-body')
+        document.add_reference('route-title', title.id, router.id)
+        self.assertSequenceEqual(self.data(document.walk(follow_references=True)),
+                                 ['title', 'd', 'intro', 'a', 'b', 'background', 'c', 'body', 'd'])
+
+    def test_walk_given_reference_loop_then_followed_to_max_depth(self):
+        document = self.build()
+        a = self.first(document, ('intro',))
+        d = self.first(document, ('body',))
+        document.add_reference('a-to-d', a.id, d.id)
+        document.add_reference('d-to-a', d.id, a.id)
+        self.assertSequenceEqual(self.data(document.walk(('body',), follow_references=True)), ['d', 'a'])
+        plan = document.plan(('body',), follow_references=True, max_depth=3)
+        self.assertSequenceEqual(self.data(plan.walk()), ['d', 'a', 'd', 'a'])
+
+    def test_plan_given_document_changed_then_recompiled(self):
+        document = self.build()
+        plan = document.plan(('intro',))
+        self.assertSequenceEqual(self.data(plan.walk()), ['a', 'b', 'background', 'c'])
+        document.add_element(('intro',), 'e')
+        self.assertSequenceEqual(self.data(plan.walk()), ['a', 'b', 'background', 'c', 'e'])
+
+    def test_walk_given_change_during_walk_then_error(self):
+        document = self.build()
+        function = document.add_element((), lambda element: True)
+        document.add_reference('check-c', self.first(document, ('intro', 'background')).id, function.id)
+
+        def change_during_walk():
+            for element in document.walk():
+                document.add_element(('body',), 'e')
+
+        self.assertRaises(RuntimeError, change_during_walk)
+
+if __name__ == '__main__':
+    unittest.main()
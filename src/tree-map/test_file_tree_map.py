@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+
+from file_tree_map import MappedFile, FileTreeMap
+from tree import SizedRBTree
+
+class TestFileTreeMap(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'document.txt')
+        with open(self.path, 'wb') as file:
+            file.write(b"intro\nbody\n\nend")
+        self.file = MappedFile(self.path)
+
+    def tearDown(self):
+        self.file.close()
+        self.directory.cleanup()
+
+    def test_split_then_spans_between_separators(self):
+        spans = list(self.file.split())
+        self.assertSequenceEqual([span.read() for span in spans], [b"intro", b"body", b"", b"end"])
+        self.assertEqual(6, spans[1].offset)
+        self.assertEqual(4, len(spans[1]))
+
+    def test_span_given_outside_file_then_exception(self):
+        self.assertRaises(Exception, lambda: self.file.span(10, 10))
+        self.assertRaises(Exception, lambda: self.file.span(-1, 1))
+
+    def test_empty_file_then_no_spans(self):
+        path = os.path.join(self.directory.name, 'empty.txt')
+        open(path, 'wb').close()
+        with MappedFile(path) as file:
+            self.assertSequenceEqual(list(file.split()), [])
+            self.assertEqual(b"", file.span(0, 0).read())
+
+    def test_find_then_content_read_and_cached(self):
+        for mode in ("value", "node", "ordered"):
+            map = FileTreeMap(mode=mode, cache_size=2)
+            map.bulk_load(enumerate(self.file.split()))
+            self.assertEqual(b"body", map.find(1))
+            self.assertIn(1, map.cache)
+            self.assertEqual(b"", map.find(2))
+            self.assertEqual(b"end", map.find(3))
+            self.assertNotIn(1, map.cache)
+            self.assertIsNone(map.find(4))
+            self.assertEqual(b"intro", bytes(map.view(0)))
+            self.assertEqual(0, map.span(0).offset)
+
+    def test_insert_and_delete_then_cache_invalidated(self):
+        map = FileTreeMap()
+        map.insert('a', self.file.span(0, 5))
+        self.assertEqual(b"intro", map.find('a'))
+        map.insert('a', self.file.span(6, 4))
+        self.assertEqual(b"body", map.find('a'))
+        map.delete('a')
+        self.assertIsNone(map.find('a'))
+        map.insert_many([('b', self.file.span(0, 2))])
+        self.assertEqual(b"in", map.find('b'))
+        map.insert_many([('b', self.file.span(1, 2))])
+        self.assertEqual(b"nt", map.find('b'))
+        map.delete_many(['b'])
+        self.assertIsNone(map.find('b'))
+
+    def test_delete_range_then_cache_invalidated(self):
+        map = FileTreeMap(SizedRBTree)
+        map.bulk_load(enumerate(self.file.split()))
+        self.assertEqual(b"body", map.find(1))
+        removed = map.delete_range(1, 2, entries=True)
+        self.assertSequenceEqual([span.read() for key, span in removed], [b"body", b""])
+        self.assertNotIn(1, map.cache)
+        self.assertIsNone(map.find(1))
+        self.assertEqual(b"end", map.find(3))
+
+
+    def test_navigation_given_spans_then_tree_order(self):
+        map = FileTreeMap(SizedRBTree)
+        for span in self.file.split():
+            map.insert(span.read(), span)
+        self.assertSequenceEqual([node.key for node in map.iter()], [b"", b"body", b"end", b"intro"])
+        self.assertEqual(b"end", map.select(2).key)
+        self.assertEqual(b"end", map.ceiling(b"c").data.read())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import io
+import unittest
+
+from ingestion import ingest, read_chunks, split_lines, parse_sections
+from tree import SizedRBTree
+from tree_map import TreeMap
+
+DOCUMENT = b"preface\n# Intro\nfirst\n\nsecond\r\n# Body\nthird\nlast"
+
+class NonSeekable(io.BytesIO):
+
+    def seekable(self) -> bool:
+        return False
+
+class TestIngestion(unittest.TestCase):
+
+    def test_split_lines_given_small_chunks_then_lines_across_chunks(self):
+        lines = list(split_lines(read_chunks(io.BytesIO(b"ab\ncd\n\nef"), 2)))
+        self.assertSequenceEqual(lines, [(3, b"ab"), (6, b"cd"), (7, b""), (9, b"ef")])
+
+    def test_split_lines_given_line_over_many_chunks_then_one_line(self):
+        lines = list(split_lines([b"a\nb", b"c", b"d", b"\ne", b""]))
+        self.assertSequenceEqual(lines, [(2, b"a"), (6, b"bcd"), (7, b"e")])
+
+    def test_parse_sections_then_keyed_by_section_and_element(self):
+        entries = list(parse_sections(split_lines([DOCUMENT])))
+        self.assertSequenceEqual([(key, value) for key, value, offset in entries], [
+            ((0, 1), "preface"), ((1, 0), "# Intro"), ((1, 1), "first"), ((1, 2), "second"),
+            ((2, 0), "# Body"), ((2, 1), "third"), ((2, 2), "last")])
+        self.assertEqual(len(DOCUMENT), entries[-1][2])
+
+    def test_ingest_then_batches_inserted_with_progress(self):
+        map = TreeMap(SizedRBTree)
+        reports = []
+        state = ingest(map, io.BytesIO(DOCUMENT), chunk_size=4, batch_size=3,
+                       progress=lambda progress: reports.append((progress.entries, progress.checkpoint.key)))
+        self.assertSequenceEqual(reports, [(3, (1, 1)), (6, (2, 1)), (7, (2, 2))])
+        self.assertEqual(7, state.entries)
+        self.assertEqual(3, state.batches)
+        self.assertEqual(len(DOCUMENT), state.bytes)
+        self.assertEqual("third", map.find((2, 1)))
+        self.assertEqual(3, map.count_range((1, 0), (1, 99)))
+
+    def test_ingest_given_checkpoint_then_resumed_after_it(self):
+        for stream_type in (io.BytesIO, NonSeekable):
+            checkpoints = []
+            ingest(TreeMap(), io.BytesIO(DOCUMENT), batch_size=3,
+                   progress=lambda progress: checkpoints.append(progress.checkpoint))
+            map = TreeMap()
+            state = ingest(map, stream_type(DOCUMENT), batch_size=3, resume=checkpoints[0])
+            self.assertSequenceEqual([node.key for node in map.iter()], [(1, 2), (2, 0), (2, 1), (2, 2)])
+            self.assertEqual(4, state.entries)
+            self.assertEqual(len(DOCUMENT), state.checkpoint.offset)
+
+    def test_ingest_given_no_batch_then_exception(self):
+        self.assertRaises(Exception, lambda: ingest(TreeMap(), io.BytesIO(DOCUMENT), batch_size=0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import random
+import unittest
+
+from persistent_tree import PersistentRBTree
+from tree_map import TreeMap
+
+class TestPersistentRBTree(unittest.TestCase):
+
+    def test_find_given_empty_tree_then_nil(self):
+        tree = PersistentRBTree()
+        self.assertIs(tree.nil, tree.find(1))
+
+    def test_insert_then_found(self):
+        tree = PersistentRBTree()
+        tree.insert(2, 'b')
+        tree.insert(1, 'a')
+        tree.insert(3, 'c')
+        self.assertEqual('a', tree.find(1).data)
+        self.assertEqual(3, len(tree))
+        self.assertTrue(tree.validate())
+
+    def test_insert_given_existing_key_then_data_replaced(self):
+        tree = PersistentRBTree()
+        tree.insert(1, 'a')
+        node = tree.insert(1, 'b')
+        self.assertEqual('b', node.data)
+        self.assertIs(node, tree.find(1))
+        self.assertEqual(1, len(tree))
+
+    def test_insert_given_none_key_then_exception(self):
+        tree = PersistentRBTree()
+        self.assertRaises(Exception, lambda: tree.insert(None, None))
+
+    def test_delete_given_missing_then_false(self):
+        tree = PersistentRBTree()
+        self.assertFalse(tree.delete(1))
+        tree.insert(1, None)
+        self.assertFalse(tree.delete(2))
+        self.assertEqual(1, len(tree))
+
+    def test_inserts_and_deletes_keep_tree_valid(self):
+        rand = random.Random(0)
+        tree = PersistentRBTree()
+        expected = set()
+        for i in range(2000):
+            key = rand.randrange(200)
+            if rand.random() < 0.55:
+                tree.insert(key, str(key))
+                expected.add(key)
+            else:
+                self.assertEqual(key in expected, tree.delete(key))
+                expected.discard(key)
+            self.assertTrue(tree.validate())
+        self.assertSequenceEqual([node.key for node in tree.iter()], sorted(expected))
+
+    def test_snapshot_then_unchanged_by_writes(self):
+        tree = PersistentRBTree.from_sorted([(key, str(key)) for key in range(100)])
+        snapshot = tree.snapshot()
+        for key in range(0, 100, 2):
+            tree.delete(key)
+        tree.insert(1, 'one')
+        tree.insert(200, '200')
+        self.assertEqual(100, len(snapshot))
+        self.assertTrue(snapshot.validate())
+        self.assertSequenceEqual([node.data for node in snapshot.iter()], [str(key) for key in range(100)])
+        self.assertEqual('one', tree.find(1).data)
+        self.assertEqual(51, len(tree))
+
+    def test_snapshot_shares_unchanged_nodes(self):
+        tree = PersistentRBTree.from_sorted([(key, None) for key in range(100)])
+        snapshot = tree.snapshot()
+        tree.insert(1000, None)
+        self.assertIs(snapshot.find(0), tree.find(0))
+        self.assertIsNot(snapshot.root, tree.root)
+
+    def test_iter_given_writes_during_iteration_then_version_at_start(self):
+        tree = PersistentRBTree.from_sorted([(key, None) for key in range(10)])
+        keys = []
+        for node in tree.iter():
+            keys.append(node.key)
+            tree.delete(node.key)
+            tree.insert(node.key + 100, None)
+        self.assertSequenceEqual(keys, range(10))
+        self.assertSequenceEqual([node.key for node in tree.iter()], range(100, 110))
+
+    def test_from_sorted_then_valid_and_ordered(self):
+        for count in (0, 1, 2, 7, 100):
+            tree = PersistentRBTree.from_sorted((key, str(key)) for key in range(count))
+            self.assertTrue(tree.validate())
+            self.assertSequenceEqual([node.data for node in tree.iter()], [str(key) for key in range(count)])
+
+    def test_navigation_and_range(self):
+        tree = PersistentRBTree.from_sorted([(key, None) for key in range(0, 10, 2)])
+        self.assertEqual(0, tree.first().key)
+        self.assertEqual(8, tree.last().key)
+        self.assertEqual(4, tree.floor(5).key)
+        self.assertEqual(6, tree.ceiling(5).key)
+        self.assertEqual(2, tree.lower(4).key)
+        self.assertEqual(6, tree.higher(4).key)
+        self.assertIs(tree.nil, tree.higher(8))
+        self.assertSequenceEqual([node.key for node in tree.range(2, 6)], [2, 4, 6])
+        self.assertSequenceEqual([node.key for node in tree.range(2, 6, inclusive=False)], [4])
+
+    def test_insert_many_then_nodes_of_final_version(self):
+        tree = PersistentRBTree()
+        nodes = tree.insert_many((key, str(key)) for key in range(100))
+        self.assertEqual(100, len(nodes))
+        for node in nodes:
+            self.assertIs(tree.find(node.key), node)
+
+    def test_tree_map_given_node_mode_then_exception(self):
+        self.assertRaises(Exception, lambda: TreeMap(PersistentRBTree, "node"))
+
+    def test_tree_map_given_persistent_tree(self):
+        for mode in ("value", "ordered"):
+            map = TreeMap(PersistentRBTree, mode)
+            map.insert_many((key, str(key)) for key in range(100))
+            map.insert(5, 'five')
+            map.delete(6)
+            self.assertEqual('five', map.find(5))
+            self.assertIsNone(map.find(6))
+            self.assertEqual('7', map.ceiling(6).data)
+            self.assertTrue(map.tree.validate())
+
+if __name__ == '__main__':
+    unittest.main()
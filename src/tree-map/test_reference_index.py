@@ -0,0 +1,60 @@
+import unittest
+
+from reference_index import ReferenceIndex
+
+class TestReferenceIndex(unittest.TestCase):
+
+    def build(self) -> ReferenceIndex:
+        index = ReferenceIndex()
+        index.add('a-b', 'a', 'b')
+        index.add('a-c', 'a', 'c')
+        index.add('c-b', 'c', 'b')
+        index.add('b-a', 'b', 'a')
+        return index
+
+    def test_add_then_indexed_from_both_ends(self):
+        index = self.build()
+        self.assertEqual(4, len(index))
+        self.assertIn('a-b', index)
+        self.assertEqual(('a', 'b'), index.get('a-b'))
+        self.assertSequenceEqual(index.sources('b'), ['a', 'c'])
+        self.assertSequenceEqual(index.targets('a'), ['b', 'c'])
+        self.assertSequenceEqual(index.referencing('b'), ['a-b', 'c-b'])
+        self.assertSequenceEqual(index.referenced('c'), ['c-b'])
+        self.assertSequenceEqual(index.sources('d'), [])
+
+    def test_add_given_existing_label_then_exception(self):
+        index = self.build()
+        self.assertRaises(Exception, lambda: index.add('a-b', 'c', 'a'))
+        self.assertEqual(('a', 'b'), index.get('a-b'))
+
+    def test_remove_then_gone_from_both_ends(self):
+        index = self.build()
+        self.assertTrue(index.remove('a-b'))
+        self.assertFalse(index.remove('a-b'))
+        self.assertIsNone(index.get('a-b'))
+        self.assertSequenceEqual(index.sources('b'), ['c'])
+        self.assertSequenceEqual(index.targets('a'), ['c'])
+        index.remove('c-b')
+        self.assertNotIn('b', index.incoming)
+
+    def test_drop_then_references_from_and_to_key_removed(self):
+        index = self.build()
+        self.assertCountEqual(index.drop('a'), ['a-b', 'a-c', 'b-a'])
+        self.assertSequenceEqual(list(index.references), ['c-b'])
+        self.assertSequenceEqual(index.targets('b'), [])
+        self.assertDictEqual({'c': {'c-b': 'b'}}, index.outgoing)
+        self.assertDictEqual({'b': {'c-b': 'c'}}, index.incoming)
+        self.assertSequenceEqual(index.drop('a'), [])
+
+    def test_drop_given_reference_to_itself(self):
+        index = ReferenceIndex()
+        index.add('loop', 'a', 'a')
+        index.add('out', 'a', 'b')
+        self.assertCountEqual(index.drop('a'), ['loop', 'out'])
+        self.assertEqual(0, len(index))
+        self.assertDictEqual({}, index.outgoing)
+        self.assertDictEqual({}, index.incoming)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import io
+import random
+import unittest
+
+import serialization
+from tree import Tree, AVLTree, RBTree, SizedRBTree
+from array_tree import ArrayRBTree
+from bplus_tree import BPlusTree
+
+class TestSerialization(unittest.TestCase):
+
+    def random_tree(self, tree_type, count: int = 500):
+        tree = tree_type()
+        for key in random.Random(count).sample(range(10 * count), count):
+            tree.insert(key, str(key))
+        return tree
+
+    def shape(self, tree) -> list:
+        # The keys in pre-order, which differ for two trees of the same keys in different shapes
+        keys = []
+        stack = [tree.root]
+        while stack:
+            node = stack.pop()
+            if node is not tree.nil:
+                keys.append((node.key, getattr(node, 'black', None), getattr(node, 'height', None)))
+                stack.extend((node.right, node.left))
+        return keys
+
+    def round_trip(self, tree, tree_type, shape: bool = False, block_size: int = 64):
+        file = io.BytesIO()
+        serialization.dump(tree, file, shape, block_size)
+        file.seek(0)
+        return serialization.load(file, tree_type)
+
+    def test_load_then_same_entries_and_valid(self):
+        for tree_type in (Tree, AVLTree, RBTree, SizedRBTree, ArrayRBTree, BPlusTree):
+            tree = self.random_tree(tree_type)
+            loaded = self.round_trip(tree, tree_type)
+            self.assertSequenceEqual([(node.key, node.data) for node in loaded.iter()],
+                                     [(node.key, node.data) for node in tree.iter()])
+            self.assertEqual(len(tree), len(loaded))
+            self.assertTrue(loaded.validate())
+
+    def test_load_given_shape_then_same_tree(self):
+        for tree_type in (Tree, AVLTree, RBTree, SizedRBTree):
+            tree = self.random_tree(tree_type)
+            loaded = self.round_trip(tree, tree_type, shape=True)
+            self.assertSequenceEqual(self.shape(loaded), self.shape(tree))
+            self.assertTrue(loaded.validate())
+            loaded.insert(-1, None)
+            self.assertTrue(loaded.validate())
+
+    def test_load_given_shape_of_other_kind_then_balanced(self):
+        tree = self.random_tree(RBTree)
+        for tree_type in (AVLTree, ArrayRBTree):
+            loaded = self.round_trip(tree, tree_type, shape=True)
+            self.assertSequenceEqual([node.key for node in loaded.iter()], [node.key for node in tree.iter()])
+            self.assertTrue(loaded.validate())
+
+    def test_load_given_empty_tree_then_empty(self):
+        for shape in (False, True):
+            loaded = self.round_trip(RBTree(), RBTree, shape)
+            self.assertEqual(0, len(loaded))
+            self.assertTrue(loaded.validate())
+
+    def test_dump_given_shape_of_other_engine_then_exception(self):
+        self.assertRaises(Exception, lambda: serialization.dump(BPlusTree(), io.BytesIO(), shape=True))
+
+    def test_load_given_corrupt_or_short_file_then_exception(self):
+        file = io.BytesIO()
+        serialization.dump(self.random_tree(RBTree), file, block_size=64)
+        data = bytearray(file.getvalue())
+        corrupt = data[:]
+        corrupt[len(corrupt) // 2] ^= 0xff
+        for bad in (corrupt, data[:len(data) // 2], b"NOPE" + data[4:], data[:4]):
+            self.assertRaises(Exception, lambda: serialization.load(io.BytesIO(bytes(bad))))
+
+    def test_load_map_then_found(self):
+        tree = self.random_tree(RBTree)
+        file = io.BytesIO()
+        serialization.dump(tree, file, shape=True)
+        file.seek(0)
+        for mode in ("value", "node"):
+            file.seek(0)
+            map = serialization.load_map(file, mode=mode)
+            self.assertEqual(str(tree.first().key), map.find(tree.first().key))
+            self.assertTrue(map.tree.validate())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,194 @@
+import random
+import unittest
+
+from tree import RBTree, SizedRBTree
+from node import RBNode
+from array_tree import ArrayRBTree
+from bplus_tree import BPlusTree
+from tree_map import TreeMap
+from stats import *
+
+class TestStats(unittest.TestCase):
+
+    def test_new_tree_then_zero_counters(self):
+        tree = InstrumentedRBTree()
+        self.assertDictEqual(tree.stats.as_dict(), {
+            "comparisons": 0, "rotations": 0, "recolours": 0, "rebalance_iterations": 0, "max_depth": 0,
+        })
+
+    def test_plain_tree_then_no_counters(self):
+        tree = RBTree()
+        tree.insert(1, None)
+        self.assertFalse(hasattr(tree, "stats"))
+        self.assertIsNot(RBTree._balance_tree, InstrumentedRBTree._balance_tree)
+
+    def test_insert_with_left_rotation_then_one_rotation(self):
+        tree = InstrumentedRBTree()
+        tree.insert(1, None)
+        tree.insert(2, None)
+        tree.insert(3, None)
+        self.assertEqual(1, tree.stats.rotations)
+        self.assertGreater(tree.stats.recolours, 0)
+        self.assertGreater(tree.stats.rebalance_iterations, 0)
+        # 3 was inserted below 2, before the rotation
+        self.assertEqual(2, tree.stats.max_depth)
+
+    def test_find_counts_comparisons(self):
+        tree = InstrumentedAVLTree()
+        tree.insert(2, None)
+        tree.insert(1, None)
+        tree.insert(3, None)
+        tree.stats.reset()
+        # One comparison per level and one for equality, even when the root holds the key
+        tree.find(2)
+        self.assertEqual(3, tree.stats.comparisons)
+        tree.stats.reset()
+        tree.find(3)
+        self.assertEqual(3, tree.stats.comparisons)
+        self.assertEqual(1, tree.stats.max_depth)
+
+    def test_find_given_deep_tree_then_one_comparison_per_level(self):
+        tree = InstrumentedRBTree()
+        for key in range(1000):
+            tree.insert(key, None)
+        for key in (0, 500, 999, 1000):
+            tree.stats.reset()
+            tree.find(key)
+            self.assertEqual(tree.stats.max_depth + 2, tree.stats.comparisons)
+
+    def test_find_given_key_below_all_then_depth_of_leftmost_node(self):
+        tree = InstrumentedRBTree()
+        tree.find(0)
+        self.assertDictEqual({"comparisons": 0, "max_depth": 0},
+                             {"comparisons": tree.stats.comparisons, "max_depth": tree.stats.max_depth})
+        for key in range(1, 1000):
+            tree.insert(key, None)
+        depth = 0
+        node = tree.root
+        while node.left is not tree.nil:
+            node = node.left
+            depth += 1
+        tree.stats.reset()
+        tree.find(0)
+        # No node is below the key, so no comparison for equality follows the descent
+        self.assertEqual(depth + 1, tree.stats.comparisons)
+        self.assertEqual(depth, tree.stats.max_depth)
+
+    def test_insert_under_black_root_then_no_recolour(self):
+        tree = InstrumentedRBTree()
+        tree.insert(1, None)
+        tree.stats.reset()
+        # The root is blackened again, which does not change its colour
+        tree.insert(2, None)
+        self.assertEqual(0, tree.stats.recolours)
+        tree.insert(3, None)
+        self.assertEqual(2, tree.stats.recolours)
+
+    def test_reset_then_zero_counters(self):
+        tree = InstrumentedRBTree()
+        for key in range(20):
+            tree.insert(key, None)
+        tree.stats.reset()
+        self.assertSequenceEqual(list(tree.stats.as_dict().values()), [0, 0, 0, 0, 0])
+
+    def test_delete_counts_rebalancing(self):
+        tree = InstrumentedRBTree()
+        for key in range(1, 11):
+            tree.insert(key, None)
+        tree.stats.reset()
+        tree.delete(1)
+        self.assertGreater(tree.stats.rotations, 0)
+        self.assertGreater(tree.stats.rebalance_iterations, 0)
+
+    def test_instrumented_trees_stay_valid(self):
+        for tree in (InstrumentedTree(), InstrumentedAVLTree(), InstrumentedRBTree(), instrumented(SizedRBTree)()):
+            rand = random.Random(0)
+            for i in range(300):
+                key = rand.randrange(60)
+                if rand.random() < 0.6:
+                    tree.insert(key, None)
+                else:
+                    tree.delete(key)
+            self.assertTrue(tree.validate())
+            for node in tree.iter():
+                self.assertIsInstance(node.key, int)
+
+    def test_instrumented_given_subclass_using_super_then_counted(self):
+        class SuperTree(RBTree):
+            def _balance_tree(self, node):
+                return super()._balance_tree(node)
+        tree = instrumented(SuperTree)()
+        for key in range(1, 4):
+            tree.insert(key, None)
+        self.assertEqual(1, tree.stats.rotations)
+        # The red root 1 is blackened, then 2 and 1 swap colours around the rotation
+        self.assertEqual(3, tree.stats.recolours)
+        self.assertEqual(1, tree.stats.rebalance_iterations)
+        self.assertTrue(tree.validate())
+
+    def test_avl_insert_then_one_iteration_per_level_climbed(self):
+        tree = InstrumentedAVLTree()
+        tree.insert(2, None)
+        tree.insert(1, None)
+        tree.stats.reset()
+        # 2 keeps its height, so the loop stops at the first node it updates
+        tree.insert(3, None)
+        self.assertEqual(1, tree.stats.rebalance_iterations)
+        tree.stats.reset()
+        # 3 and the root 2 both grow, then the loop runs out of ancestors
+        tree.insert(4, None)
+        self.assertEqual(2, tree.stats.rebalance_iterations)
+        self.assertEqual(0, tree.stats.rotations)
+
+    def test_bulk_load_then_nothing_counted_as_rebalancing(self):
+        for tree_type in (InstrumentedAVLTree, InstrumentedRBTree):
+            tree = tree_type.from_sorted((key, None) for key in range(100))
+            self.assertEqual(0, tree.stats.recolours)
+            self.assertEqual(0, tree.stats.rebalance_iterations)
+            self.assertTrue(tree.validate())
+
+    def test_instrumented_tree_then_plain_node_types_unchanged(self):
+        tree = InstrumentedRBTree()
+        tree.insert(1, None)
+        self.assertIsInstance(tree.root, RBNode)
+        self.assertIs(RBTree.node_type, RBNode)
+        self.assertIsNot(RBNode, tree.node_type)
+
+    def test_split_and_join_then_counted_by_tree_rebalancing(self):
+        tree = InstrumentedRBTree()
+        for key in range(100):
+            tree.insert(key, None)
+        right = tree.split(50)
+        tree.stats.reset()
+        right.stats.reset()
+        for key in range(100, 200):
+            right.insert(key, None)
+        self.assertGreater(right.stats.rotations, 0)
+        self.assertGreater(right.stats.recolours, 0)
+        self.assertGreater(right.stats.rebalance_iterations, 0)
+        self.assertSequenceEqual(list(tree.stats.as_dict().values()), [0, 0, 0, 0, 0])
+        tree.join(right)
+        right.stats.reset()
+        for key in range(100, 200):
+            tree.delete(key)
+        self.assertGreater(tree.stats.recolours, 0)
+        self.assertSequenceEqual(list(right.stats.as_dict().values()), [0, 0, 0, 0, 0])
+        self.assertTrue(tree.validate())
+
+    def test_instrumented_given_other_engine_then_exception(self):
+        for tree_type in (ArrayRBTree, BPlusTree):
+            self.assertRaises(Exception, lambda: instrumented(tree_type))
+
+    def test_instrumented_returns_same_type(self):
+        self.assertIs(InstrumentedRBTree, instrumented(RBTree))
+        self.assertIs(InstrumentedRBTree, instrumented(InstrumentedRBTree))
+
+    def test_tree_map_given_instrumented_tree(self):
+        map = TreeMap(InstrumentedRBTree)
+        for key in range(100):
+            map.insert(key, str(key))
+        self.assertGreater(map.tree.stats.rotations, 0)
+        self.assertLessEqual(map.tree.stats.max_depth, 2 * 7)
+
+if __name__ == '__main__':
+    unittest.main()
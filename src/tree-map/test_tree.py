@@ -1,3 +1,4 @@
+import random
 import unittest
 
 from tree import *
@@ -108,6 +109,12 @@ class TestTree(unittest.TestCase):
         self.assertEqual(tree.find(9), tree.root.right)
         self.assertEqual(tree.find(6), tree.root.right.left)
 
+    def test_insert_given_any_tree_then_nodes_have_no_dict(self):
+        for tree in (Tree(), AVLTree(), RBTree()):
+            tree.insert(1, None)
+            self.assertFalse(hasattr(tree.root, '__dict__'))
+            self.assertFalse(hasattr(tree.nil, '__dict__'))
+
 class TestAVLTree(unittest.TestCase):
 
     def test_left_child_root(self):
@@ -364,13 +371,18 @@ class TestRBTree(unittest.TestCase):
         tree.insert(8, None)
         tree.insert(9, None)
         tree.insert(10, None)
-        # black leaf
+        # black internal node, replaced by its successor (black leaf)
         tree.delete(6)
         expected_parent = tree.find(4)
         self.assertTrue(expected_parent.black)
-        expected_sibling = tree.find(2)
+        expected_successor = tree.find(7)
+        self.assertEqual(expected_successor, tree.root.right)
+        self.assertTrue(expected_successor.black)
+        # The successor's black was removed, so its old sibling was rotated up
+        expected_sibling = tree.find(9)
+        self.assertEqual(expected_sibling, expected_successor.right)
         self.assertFalse(expected_sibling.black)
-        # Check that no rebalance occurred
+        # Check that the root was unaffected
         expected_root = tree.find(4)
         self.assertEqual(expected_root, tree.root)
 
@@ -440,6 +452,195 @@ class TestRBTree(unittest.TestCase):
         expected_root = tree.find(4)
         self.assertEqual(expected_root, tree.root)
 
+class TestFromSorted(unittest.TestCase):
+
+    def test_from_sorted_given_empty_then_empty_tree(self):
+        for tree_type in (Tree, AVLTree, RBTree):
+            tree = tree_type.from_sorted([])
+            self.assertEqual(tree.nil, tree.root)
+            self.assertTrue(tree.validate())
+
+    def test_from_sorted_given_many_then_valid_and_ordered(self):
+        for tree_type in (Tree, AVLTree, RBTree):
+            for size in range(1, 70):
+                tree = tree_type.from_sorted([(i, str(i)) for i in range(size)])
+                self.assertTrue(tree.validate())
+                self.assertSequenceEqual([item.key for item in tree.iter()], range(size))
+                self.assertEqual(str(size - 1), tree.find(size - 1).data)
+
+    def test_from_sorted_given_generator_and_count(self):
+        tree = RBTree.from_sorted(((i, None) for i in range(10)), 10)
+        self.assertTrue(tree.validate())
+        self.assertSequenceEqual([item.key for item in tree.iter()], range(10))
+
+    def test_from_sorted_then_insert_and_delete_keep_tree_valid(self):
+        for tree_type in (AVLTree, RBTree):
+            tree = tree_type.from_sorted([(i, None) for i in range(0, 100, 2)])
+            for i in range(1, 100, 4):
+                tree.insert(i, None)
+            for i in range(0, 100, 3):
+                tree.delete(i)
+            self.assertTrue(tree.validate())
+
+    def test_from_sorted_given_unsorted_then_exception(self):
+        self.assertRaises(Exception, lambda: RBTree.from_sorted([(2, None), (1, None)]))
+
+    def test_from_sorted_given_duplicates_then_exception(self):
+        self.assertRaises(Exception, lambda: AVLTree.from_sorted([(1, None), (1, None)]))
+
+    def test_from_sorted_given_too_few_items_then_exception(self):
+        self.assertRaises(Exception, lambda: RBTree.from_sorted(iter([(1, None)]), 2))
+
+    def test_validate_given_red_violation_then_exception(self):
+        tree = RBTree.from_sorted([(i, None) for i in range(3)])
+        tree.root.left.black = False
+        tree.root.right.black = False
+        self.assertTrue(tree.validate())
+        tree.root.black = False
+        self.assertRaises(Exception, tree.validate)
+
+    def test_validate_given_black_violation_then_exception(self):
+        tree = RBTree.from_sorted([(i, None) for i in range(7)])
+        tree.root.left.left.black = False
+        self.assertRaises(Exception, tree.validate)
+
+    def test_validate_given_incorrect_height_then_exception(self):
+        tree = AVLTree.from_sorted([(i, None) for i in range(7)])
+        tree.root.height = 5
+        self.assertRaises(Exception, tree.validate)
+
+class TestBatch(unittest.TestCase):
+
+    def test_insert_many_given_empty_tree(self):
+        for tree_type in (Tree, AVLTree, RBTree, SizedRBTree):
+            tree = tree_type()
+            tree.insert_many([(3, 'c'), (1, 'a'), (2, 'b')])
+            self.assertTrue(tree.validate())
+            self.assertEqual(3, len(tree))
+            self.assertSequenceEqual([item.data for item in tree.iter()], ['a', 'b', 'c'])
+
+    def test_insert_many_given_small_and_large_batches(self):
+        for tree_type in (AVLTree, RBTree, SizedAVLTree):
+            for batch_size in (2, 50, 500):
+                tree = tree_type.from_sorted([(key, None) for key in range(0, 1000, 2)])
+                batch = [(key, None) for key in random.Random(batch_size).sample(range(1, 1000, 2), batch_size)]
+                tree.insert_many(batch)
+                self.assertTrue(tree.validate())
+                self.assertEqual(500 + batch_size, len(tree))
+                expected = sorted(set(range(0, 1000, 2)) | set(key for key, data in batch))
+                self.assertSequenceEqual([item.key for item in tree.iter()], expected)
+
+    def test_insert_many_given_duplicates_then_first_kept(self):
+        tree = RBTree()
+        tree.insert(2, 'tree')
+        tree.insert_many([(1, 'first'), (2, 'batch'), (1, 'second')])
+        self.assertTrue(tree.validate())
+        self.assertEqual(2, len(tree))
+        self.assertEqual('first', tree.find(1).data)
+        self.assertEqual('tree', tree.find(2).data)
+
+    def test_insert_many_keeps_existing_nodes(self):
+        tree = RBTree.from_sorted([(key, None) for key in range(10)])
+        node = tree.find(5)
+        tree.insert_many([(key, None) for key in range(10, 30)])
+        self.assertIs(node, tree.find(5))
+
+    def test_insert_many_returns_node_of_each_key(self):
+        for batch_size in (2, 50):
+            tree = RBTree.from_sorted([(key, None) for key in range(0, 200, 2)])
+            batch = [(key, None) for key in range(batch_size, 0, -1)]
+            nodes = tree.insert_many(batch)
+            self.assertSequenceEqual([node.key for node in nodes], range(1, batch_size + 1))
+            for node in nodes:
+                self.assertIs(node, tree.find(node.key))
+
+    def test_delete_node_given_found_node_then_removed(self):
+        for tree_type in (Tree, AVLTree, RBTree, SizedRBTree):
+            tree = tree_type.from_sorted([(key, None) for key in range(50)])
+            node = tree.insert(50, None)
+            self.assertTrue(tree.delete_node(node))
+            self.assertTrue(tree.delete_node(tree.find(20)))
+            self.assertFalse(tree.delete_node(tree.find(20)))
+            self.assertTrue(tree.validate())
+            self.assertEqual(49, len(tree))
+            self.assertEqual(tree.nil, tree.find(50))
+
+    def test_insert_many_given_none_key_then_exception(self):
+        tree = RBTree()
+        self.assertRaises(Exception, lambda: tree.insert_many([(None, None)]))
+
+    def test_delete_many_given_small_and_large_batches(self):
+        for tree_type in (Tree, AVLTree, RBTree, SizedRBTree):
+            for batch_size in (2, 50, 500):
+                tree = tree_type.from_sorted([(key, None) for key in range(1000)])
+                keys = random.Random(batch_size).sample(range(1000), batch_size)
+                deleted = tree.delete_many(keys + [2000])
+                self.assertEqual(batch_size, deleted)
+                self.assertTrue(tree.validate())
+                self.assertEqual(1000 - batch_size, len(tree))
+                expected = sorted(set(range(1000)) - set(keys))
+                self.assertSequenceEqual([item.key for item in tree.iter()], expected)
+
+    def test_delete_many_given_missing_keys_then_zero(self):
+        tree = AVLTree.from_sorted([(key, None) for key in range(10)])
+        self.assertEqual(0, tree.delete_many(range(20, 40)))
+        self.assertEqual(10, len(tree))
+
+class TestSizedTree(unittest.TestCase):
+
+    def test_select_and_rank_given_empty_tree(self):
+        tree = SizedRBTree()
+        self.assertEqual(tree.nil, tree.select(0))
+        self.assertEqual(0, tree.rank(1))
+        self.assertEqual(0, tree.count_range(0, 10))
+
+    def test_sizes_after_inserts_and_deletes(self):
+        for tree in (SizedTree(), SizedAVLTree(), SizedRBTree()):
+            keys = set()
+            rand = random.Random(1)
+            for i in range(400):
+                key = rand.randrange(100)
+                if rand.random() < 0.6:
+                    tree.insert(key, None)
+                    keys.add(key)
+                else:
+                    tree.delete(key)
+                    keys.discard(key)
+                self.assertTrue(tree.validate())
+            ordered = sorted(keys)
+            for index, key in enumerate(ordered):
+                self.assertEqual(key, tree.select(index).key)
+                self.assertEqual(index, tree.rank(key))
+            self.assertEqual(tree.nil, tree.select(len(ordered)))
+            self.assertEqual(tree.nil, tree.select(-1))
+
+    def test_sizes_after_from_sorted(self):
+        tree = SizedRBTree.from_sorted([(i, None) for i in range(0, 50, 5)])
+        self.assertTrue(tree.validate())
+        self.assertEqual(10, tree.root.size)
+        self.assertEqual(25, tree.select(5).key)
+
+    def test_rank_given_missing_key(self):
+        tree = SizedAVLTree.from_sorted([(i, None) for i in range(0, 50, 5)])
+        self.assertEqual(0, tree.rank(-1))
+        self.assertEqual(3, tree.rank(12))
+        self.assertEqual(10, tree.rank(100))
+
+    def test_count_range_matches_range(self):
+        tree = SizedRBTree.from_sorted([(i, None) for i in range(0, 50, 5)])
+        for lo, hi in ((None, None), (10, 30), (11, 29), (30, 10), (-5, 100)):
+            for inclusive in (True, False, (True, False), (False, True)):
+                expected = len(list(tree.range(lo, hi, inclusive)))
+                self.assertEqual(expected, tree.count_range(lo, hi, inclusive))
+
+    def test_duplicate_insert_keeps_sizes(self):
+        tree = SizedRBTree()
+        tree.insert(1, None)
+        tree.insert(2, None)
+        tree.insert(2, None)
+        self.assertEqual(2, tree.root.size)
+        self.assertTrue(tree.validate())
+
 class TestTreeIterator(unittest.TestCase):
 
     def test_iter_with_empty_tree(self):
@@ -490,5 +691,321 @@ class TestTreeIterator(unittest.TestCase):
             list.append(item.key if item is not None else None)
         self.assertSequenceEqual(list, [1, 2, 3, 4, 5, 6, 7, 8, 9, 10])
 
+    def test_iter_with_tree_of_many_after_inserts_and_deletes(self):
+        for tree in (Tree(), AVLTree(), RBTree()):
+            keys = set()
+            rand = random.Random(0)
+            for i in range(500):
+                key = rand.randrange(100)
+                if rand.random() < 0.6:
+                    tree.insert(key, None)
+                    keys.add(key)
+                else:
+                    tree.delete(key)
+                    keys.discard(key)
+            self.assertSequenceEqual([item.key for item in tree.iter()], sorted(keys))
+
+    def test_iter_does_not_compare_keys(self):
+        tree = RBTree()
+        for i in range(100):
+            tree.insert(CountingKey(i), None)
+        CountingKey.comparisons = 0
+        list = [item.key.value for item in tree.iter()]
+        self.assertSequenceEqual(list, range(100))
+        self.assertEqual(0, CountingKey.comparisons)
+
+    def test_iter_given_insert_during_iteration_then_error(self):
+        tree = RBTree()
+        tree.insert(1, None)
+        tree.insert(2, None)
+        iterator = tree.iter()
+        next(iterator)
+        tree.insert(3, None)
+        self.assertRaises(RuntimeError, lambda: next(iterator))
+
+    def test_iter_given_delete_during_iteration_then_error(self):
+        tree = AVLTree()
+        tree.insert(1, None)
+        tree.insert(2, None)
+        iterator = tree.iter()
+        next(iterator)
+        tree.delete(2)
+        self.assertRaises(RuntimeError, lambda: next(iterator))
+
+    def test_iter_given_duplicate_insert_during_iteration_then_no_error(self):
+        tree = RBTree()
+        tree.insert(1, None)
+        tree.insert(2, None)
+        iterator = tree.iter()
+        next(iterator)
+        tree.insert(1, None)
+        self.assertEqual(2, next(iterator).key)
+
+class TestTreeNavigation(unittest.TestCase):
+
+    def setUp(self):
+        self.tree = RBTree()
+        for key in range(0, 100, 10):
+            self.tree.insert(key, None)
+
+    def test_first_and_last_given_empty_tree_then_nil(self):
+        tree = RBTree()
+        self.assertEqual(tree.nil, tree.first())
+        self.assertEqual(tree.nil, tree.last())
+
+    def test_first_and_last_given_tree_of_many(self):
+        self.assertEqual(0, self.tree.first().key)
+        self.assertEqual(90, self.tree.last().key)
+
+    def test_floor_and_ceiling_given_match_then_match(self):
+        self.assertEqual(40, self.tree.floor(40).key)
+        self.assertEqual(40, self.tree.ceiling(40).key)
+
+    def test_floor_and_ceiling_given_between_keys(self):
+        self.assertEqual(40, self.tree.floor(45).key)
+        self.assertEqual(50, self.tree.ceiling(45).key)
+
+    def test_floor_and_ceiling_given_out_of_bounds_then_nil(self):
+        self.assertEqual(self.tree.nil, self.tree.floor(-1))
+        self.assertEqual(self.tree.nil, self.tree.ceiling(91))
+
+    def test_lower_and_higher_given_match_then_neighbours(self):
+        self.assertEqual(30, self.tree.lower(40).key)
+        self.assertEqual(50, self.tree.higher(40).key)
+
+    def test_lower_and_higher_given_out_of_bounds_then_nil(self):
+        self.assertEqual(self.tree.nil, self.tree.lower(0))
+        self.assertEqual(self.tree.nil, self.tree.higher(90))
+
+    def test_range_given_inclusive_bounds(self):
+        keys = [node.key for node in self.tree.range(20, 50)]
+        self.assertSequenceEqual(keys, [20, 30, 40, 50])
+
+    def test_range_given_exclusive_bounds(self):
+        keys = [node.key for node in self.tree.range(20, 50, inclusive=False)]
+        self.assertSequenceEqual(keys, [30, 40])
+
+    def test_range_given_half_open_bounds(self):
+        keys = [node.key for node in self.tree.range(20, 50, inclusive=(True, False))]
+        self.assertSequenceEqual(keys, [20, 30, 40])
+
+    def test_range_given_bounds_between_keys(self):
+        keys = [node.key for node in self.tree.range(15, 55)]
+        self.assertSequenceEqual(keys, [20, 30, 40, 50])
+
+    def test_range_given_open_bounds_then_all(self):
+        keys = [node.key for node in self.tree.range()]
+        self.assertSequenceEqual(keys, list(range(0, 100, 10)))
+
+    def test_range_given_empty_range(self):
+        self.assertSequenceEqual(list(self.tree.range(41, 49)), [])
+        self.assertSequenceEqual(list(self.tree.range(50, 20)), [])
+
+    def test_range_compares_proportional_to_depth_and_size(self):
+        tree = RBTree()
+        for i in range(1000):
+            tree.insert(CountingKey(i), None)
+        CountingKey.comparisons = 0
+        keys = [node.key.value for node in tree.range(CountingKey(500), CountingKey(504))]
+        self.assertSequenceEqual(keys, [500, 501, 502, 503, 504])
+        # A descent of at most 2log(n) levels, then one comparison per visited node
+        self.assertLess(CountingKey.comparisons, 2 * 10 + 6 + 1)
+
+class CountingKey:
+
+    comparisons = 0
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        CountingKey.comparisons += 1
+        return self.value < other.value
+
+    def __gt__(self, other):
+        CountingKey.comparisons += 1
+        return self.value > other.value
+
+    def __eq__(self, other):
+        CountingKey.comparisons += 1
+        return isinstance(other, CountingKey) and self.value == other.value
+
+class TestReverseIteration(unittest.TestCase):
+
+    def test_reversed_then_descending(self):
+        for tree_type in (Tree, AVLTree, RBTree, SizedRBTree):
+            tree = tree_type()
+            self.assertSequenceEqual(list(reversed(tree)), [])
+            for key in random.Random(0).sample(range(100), 50):
+                tree.insert(key, None)
+            self.assertSequenceEqual([node.key for node in reversed(tree)], [node.key for node in tree.iter()][::-1])
+
+    def test_reversed_given_delete_during_iteration_then_error(self):
+        tree = RBTree.from_sorted([(key, None) for key in range(10)])
+
+        def delete_during_iteration():
+            for node in reversed(tree):
+                tree.delete(node.key)
+
+        self.assertRaises(RuntimeError, delete_during_iteration)
+
+class TestTreeCursor(unittest.TestCase):
+
+    def test_cursor_given_empty_tree_then_nil(self):
+        tree = RBTree()
+        cursor = tree.cursor()
+        self.assertIs(tree.nil, cursor.node)
+        self.assertIs(tree.nil, cursor.next())
+        self.assertIs(tree.nil, cursor.prev())
+        tree.insert(1, None)
+        self.assertEqual(1, cursor.next().key)
+
+    def test_next_and_prev_then_neighbours(self):
+        for tree_type in (Tree, AVLTree, RBTree):
+            tree = tree_type()
+            for key in random.Random(1).sample(range(0, 200, 2), 100):
+                tree.insert(key, None)
+            cursor = tree.cursor()
+            keys = [cursor.node.key]
+            while cursor.next() is not tree.nil:
+                keys.append(cursor.node.key)
+            self.assertSequenceEqual(keys, list(range(0, 200, 2)))
+            while cursor.prev() is not tree.nil:
+                keys.append(cursor.node.key)
+            self.assertSequenceEqual(keys[100:], list(range(198, -2, -2)))
+
+    def test_next_and_prev_given_ends_then_back_to_the_end_nodes(self):
+        tree = RBTree.from_sorted([(key, None) for key in range(3)])
+        cursor = tree.cursor()
+        self.assertIs(tree.nil, cursor.prev())
+        self.assertIs(tree.nil, cursor.prev())
+        self.assertEqual(0, cursor.next().key)
+        cursor.last()
+        self.assertIs(tree.nil, cursor.next())
+        self.assertEqual(2, cursor.prev().key)
+
+    def test_seek_then_ceiling(self):
+        tree = RBTree.from_sorted([(key, None) for key in range(0, 10, 2)])
+        cursor = tree.cursor(3)
+        self.assertEqual(4, cursor.node.key)
+        self.assertEqual(2, cursor.prev().key)
+        self.assertIs(tree.nil, cursor.seek(9))
+        self.assertEqual(8, cursor.prev().key)
+        self.assertIs(tree.nil, cursor.seek(9))
+        self.assertIs(tree.nil, cursor.next())
+
+    def test_next_given_tree_changed_then_continues_from_key(self):
+        tree = SizedRBTree.from_sorted([(key, None) for key in range(10)])
+        cursor = tree.cursor(4)
+        tree.delete(4)
+        tree.delete(5)
+        tree.insert_many([(key, None) for key in range(10, 100)])
+        self.assertEqual(6, cursor.next().key)
+        tree.delete(6)
+        self.assertEqual(3, cursor.prev().key)
+        tree.insert(3.5, None)
+        self.assertEqual(3.5, cursor.next().key)
+
+class TestSplitJoin(unittest.TestCase):
+
+    TREE_TYPES = (Tree, AVLTree, RBTree, SizedTree, SizedAVLTree, SizedRBTree)
+
+    def test_split_given_random_trees_then_both_valid(self):
+        random.seed(22)
+        for tree_type in self.TREE_TYPES:
+            for _ in range(100):
+                keys = random.sample(range(200), random.randint(0, 80))
+                tree = tree_type()
+                for key in keys:
+                    tree.insert(key, str(key))
+                split_key = random.randint(-1, 201)
+                right = tree.split(split_key)
+                self.assertTrue(tree.validate())
+                self.assertTrue(right.validate())
+                self.assertSequenceEqual([node.key for node in tree.iter()], sorted(key for key in keys if key < split_key))
+                self.assertSequenceEqual([node.key for node in right.iter()], sorted(key for key in keys if key >= split_key))
+                self.assertEqual(len([key for key in keys if key < split_key]), len(tree))
+                self.assertEqual(len([key for key in keys if key >= split_key]), len(right))
+
+    def test_join_given_split_then_original_restored(self):
+        random.seed(23)
+        for tree_type in self.TREE_TYPES:
+            for _ in range(100):
+                keys = random.sample(range(200), random.randint(0, 80))
+                tree = tree_type()
+                for key in keys:
+                    tree.insert(key, str(key))
+                right = tree.split(random.randint(0, 200))
+                tree.join(right)
+                self.assertTrue(tree.validate())
+                self.assertSequenceEqual([node.key for node in tree.iter()], sorted(keys))
+                self.assertEqual(len(keys), len(tree))
+                self.assertEqual(0, len(right))
+                self.assertIs(right.nil, right.root)
+
+    def test_join_given_unrelated_trees_then_valid_and_changeable(self):
+        for tree_type in self.TREE_TYPES:
+            for left_size, right_size in ((0, 5), (5, 0), (3, 40), (40, 3), (20, 20)):
+                tree = tree_type.from_sorted([(key, None) for key in range(left_size)])
+                right = tree_type.from_sorted([(key, None) for key in range(100, 100 + right_size)])
+                tree.join(right)
+                self.assertTrue(tree.validate())
+                self.assertEqual(left_size + right_size, len(tree))
+                tree.insert(50, None)
+                tree.delete(0)
+                right.insert(1, None)
+                self.assertTrue(tree.validate())
+                self.assertTrue(right.validate())
+
+    def test_join_given_overlapping_keys_then_exception(self):
+        tree = RBTree.from_sorted([(key, None) for key in range(10)])
+        right = RBTree.from_sorted([(key, None) for key in range(9, 20)])
+        self.assertRaises(Exception, lambda: tree.join(right))
+        self.assertEqual(10, len(tree))
+        self.assertEqual(11, len(right))
+
+    def test_split_then_middle_moved(self):
+        # A run of keys is cut out and joined back after the rest
+        tree = SizedAVLTree.from_sorted([(key, None) for key in range(100)])
+        middle = tree.split(40)
+        right = middle.split(60)
+        tree.join(right)
+        self.assertEqual(80, len(tree))
+        self.assertIsNone(tree.find(50).key)
+        mod_count = tree.mod_count
+        moved = SizedAVLTree.from_sorted([(key + 100, None) for key in range(40, 60)])
+        tree.join(moved)
+        self.assertTrue(tree.validate())
+        self.assertLess(mod_count, tree.mod_count)
+        self.assertEqual(100, len(tree))
+        self.assertEqual(140, tree.select(80).key)
+
+    def test_split_given_iterator_then_runtime_error(self):
+        tree = RBTree.from_sorted([(key, None) for key in range(10)])
+        nodes = tree.iter()
+        next(nodes)
+        tree.split(5)
+        self.assertRaises(RuntimeError, lambda: next(nodes))
+
+    def test_delete_range_given_bounds_then_range_cut_out(self):
+        random.seed(24)
+        bounds = ((None, None), (None, 50), (50, None), (20, 80), (80, 20), (30, 30))
+        for tree_type in self.TREE_TYPES:
+            for lo, hi in bounds:
+                for inclusive in (True, False, (True, False), (False, True)):
+                    keys = random.sample(range(100), 60)
+                    tree = tree_type()
+                    for key in keys:
+                        tree.insert(key, None)
+                    expected = [node.key for node in tree.range(lo, hi, inclusive)]
+                    removed = tree.delete_range(lo, hi, inclusive)
+                    self.assertTrue(tree.validate())
+                    self.assertTrue(removed.validate())
+                    self.assertSequenceEqual([node.key for node in removed.iter()], expected)
+                    self.assertSequenceEqual([node.key for node in tree.iter()], sorted(set(keys) - set(expected)))
+                    self.assertEqual(len(expected), len(removed))
+                    self.assertEqual(60 - len(expected), len(tree))
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
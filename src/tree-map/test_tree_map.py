@@ -1,6 +1,11 @@
+import random
 import unittest
 
 from tree_map import TreeMap
+from tree import RBTree, SizedRBTree
+from array_tree import ArrayRBTree
+from bplus_tree import BPlusTree
+from persistent_tree import PersistentRBTree
 
 class TestTreeMap(unittest.TestCase):
 
@@ -150,5 +155,263 @@ class TestTreeMap(unittest.TestCase):
             count += 1
         self.assertSequenceEqual(items, ['a', 'c', 'f', 'g', 'i', 'k', 'm'])
 
+    def test_navigation_given_empty(self):
+        map = TreeMap()
+        self.assertIsNone(map.first())
+        self.assertIsNone(map.last())
+        self.assertIsNone(map.floor(1))
+        self.assertIsNone(map.ceiling(1))
+        self.assertIsNone(map.lower(1))
+        self.assertIsNone(map.higher(1))
+
+    def test_navigation_given_tree_of_many(self):
+        map = TreeMap()
+        map.insert(1, 'a')
+        map.insert(3, 'c')
+        map.insert(5, 'e')
+        map.insert(7, 'g')
+
+        self.assertEqual('a', map.first().data)
+        self.assertEqual('g', map.last().data)
+        self.assertEqual('c', map.floor(4).data)
+        self.assertEqual('e', map.ceiling(4).data)
+        self.assertEqual('c', map.lower(5).data)
+        self.assertEqual('g', map.higher(5).data)
+        self.assertIsNone(map.higher(7))
+
+    def test_range_given_tree_of_many(self):
+        map = TreeMap()
+        map.insert(1, 'a')
+        map.insert(3, 'c')
+        map.insert(5, 'e')
+        map.insert(7, 'g')
+        map.insert(9, 'i')
+
+        items = [item.data for item in map.range(3, 7)]
+        self.assertSequenceEqual(items, ['c', 'e', 'g'])
+        items = [item.data for item in map.range(3, 7, inclusive=False)]
+        self.assertSequenceEqual(items, ['e'])
+
+    def test_bulk_load_given_sorted_items(self):
+        map = TreeMap()
+        map.bulk_load([(1, 'a'), (3, 'c'), (5, 'e'), (7, 'g')])
+
+        self.assertEqual('e', map.find(5))
+        self.assertTrue(map.tree.validate())
+        items = [item.data for item in map.iter()]
+        self.assertSequenceEqual(items, ['a', 'c', 'e', 'g'])
+
+    def test_bulk_load_replaces_contents(self):
+        map = TreeMap()
+        map.insert(2, 'b')
+        map.bulk_load(((key, str(key)) for key in range(5)))
+
+        self.assertEqual('2', map.find(2))
+        self.assertEqual(5, len(map.map))
+        map.insert(10, 'k')
+        map.delete(0)
+        self.assertTrue(map.tree.validate())
+
+    def test_bulk_load_given_unsorted_then_unchanged(self):
+        map = TreeMap()
+        map.insert(2, 'b')
+        self.assertRaises(Exception, lambda: map.bulk_load([(3, 'c'), (1, 'a')]))
+        self.assertEqual('b', map.find(2))
+        self.assertIsNone(map.find(3))
+
+    def test_select_rank_and_count_range_given_sized_tree(self):
+        map = TreeMap(SizedRBTree)
+        map.insert(1, 'a')
+        map.insert(3, 'c')
+        map.insert(5, 'e')
+        map.insert(7, 'g')
+        map.delete(3)
+
+        self.assertEqual('e', map.select(1).data)
+        self.assertIsNone(map.select(3))
+        self.assertEqual(2, map.rank(7))
+        self.assertEqual(2, map.count_range(2, 7))
+        self.assertEqual(1, map.count_range(2, 7, inclusive=(True, False)))
+
+    def test_insert_many_and_delete_many(self):
+        map = TreeMap()
+        map.insert_many((key, str(key)) for key in range(100, 0, -1))
+        self.assertEqual('50', map.find(50))
+        self.assertTrue(map.tree.validate())
+
+        map.delete_many(range(0, 101, 2))
+        self.assertIsNone(map.find(50))
+        self.assertEqual('51', map.find(51))
+        self.assertEqual(50, len(map.map))
+        items = [item.key for item in map.iter()]
+        self.assertSequenceEqual(items, list(range(1, 100, 2)))
+
+    def test_insert_given_existing_key_then_value_replaced(self):
+        for mode in ("value", "node", "ordered"):
+            map = TreeMap(mode=mode)
+            map.insert(1, 'a')
+            map.insert(1, 'b')
+            self.assertEqual('b', map.find(1))
+            self.assertSequenceEqual([item.data for item in map.iter()], ['b'])
+
+    def test_modes_given_inserts_and_deletes(self):
+        for mode in ("value", "node", "ordered"):
+            map = TreeMap(mode=mode)
+            for key in range(20):
+                map.insert(key, str(key))
+            for key in range(0, 20, 3):
+                map.delete(key)
+            map.delete(100)
+            self.assertTrue(map.tree.validate())
+            self.assertIsNone(map.find(3))
+            self.assertEqual('4', map.find(4))
+            self.assertEqual(13, len(map.tree))
+
+    def test_node_mode_maps_keys_to_nodes(self):
+        map = TreeMap(mode="node")
+        map.bulk_load([(key, str(key)) for key in range(10)])
+        map.insert_many([(key, str(key)) for key in range(10, 20)])
+        map.insert(20, '20')
+        for key in range(21):
+            self.assertIs(map.map[key], map.tree.find(key))
+        map.delete_many(range(0, 21, 2))
+        self.assertEqual(10, len(map.map))
+        self.assertEqual('9', map.find(9))
+
+    def test_ordered_mode_keeps_no_dict(self):
+        map = TreeMap(mode="ordered")
+        map.bulk_load([(1, 'a'), (2, 'b')])
+        map.insert_many([(3, 'c'), (1, 'z')])
+        map.delete_many([2])
+        self.assertIsNone(map.map)
+        self.assertEqual('z', map.find(1))
+        self.assertIsNone(map.find(2))
+        self.assertEqual('c', map.find(3))
+
+    def test_unknown_mode_then_exception(self):
+        self.assertRaises(Exception, lambda: TreeMap(mode="list"))
+
+    def test_reversed_given_any_engine_then_descending(self):
+        for tree_type in (RBTree, ArrayRBTree, lambda: BPlusTree(4), PersistentRBTree):
+            map = TreeMap(tree_type)
+            self.assertSequenceEqual(list(reversed(map)), [])
+            map.insert_many((key, str(key)) for key in random.Random(2).sample(range(100), 60))
+            self.assertSequenceEqual([node.key for node in reversed(map)], [node.key for node in map.iter()][::-1])
+
+    def test_cursor_then_pages_forward_and_back(self):
+        map = TreeMap()
+        map.bulk_load((key, str(key)) for key in range(10))
+        cursor = map.cursor(3)
+        page = [cursor.node.data] + [cursor.next().data for i in range(2)]
+        self.assertSequenceEqual(page, ['3', '4', '5'])
+        self.assertSequenceEqual([cursor.prev().data for i in range(3)], ['4', '3', '2'])
+
+    def test_delete_range_given_any_engine_and_mode(self):
+        for tree_type in (RBTree, SizedRBTree, ArrayRBTree, lambda: BPlusTree(4), PersistentRBTree):
+            for mode in ("value", "node", "ordered"):
+                if tree_type is PersistentRBTree and mode == "node":
+                    continue
+                map = TreeMap(tree_type, mode)
+                map.bulk_load((key, str(key)) for key in range(100))
+                self.assertIsNone(map.delete_range(10, 20, (True, False)))
+                removed = map.delete_range(50, None, False, entries=True)
+                self.assertSequenceEqual(list(removed), [(key, str(key)) for key in range(51, 100)])
+                keys = [key for key in range(51) if not 10 <= key < 20]
+                self.assertSequenceEqual([node.key for node in map.iter()], keys)
+                self.assertIsNone(map.find(15))
+                self.assertEqual('20', map.find(20))
+                if map.map is not None:
+                    self.assertEqual(set(keys), set(map.map))
+                map.insert(15, 'x')
+                self.assertEqual('x', map.find(15))
+
+    def test_delete_range_given_entries_then_read_lazily(self):
+        map = TreeMap(SizedRBTree)
+        map.bulk_load((key, str(key)) for key in range(10))
+        removed = map.delete_range(2, 5, entries=True)
+        # The keys are gone before the entries are read
+        self.assertEqual(6, len(map.tree))
+        self.assertIsNone(map.find(3))
+        map.insert(3, 'y')
+        self.assertSequenceEqual(list(removed), [(2, '2'), (3, '3'), (4, '4'), (5, '5')])
+
+    def test_key_given_any_mode_then_ordered_by_computed_key(self):
+        for tree_type in (RBTree, SizedRBTree):
+            for mode in ("value", "node", "ordered"):
+                map = TreeMap(tree_type, mode, key=str.lower)
+                map.insert("b", 2)
+                map.insert_many([("C", 3), ("a", 1), ("A", 10)])
+                self.assertSequenceEqual([(node.key, node.item, node.data) for node in map.iter()],
+                                         [("a", "a", 10), ("b", "b", 2), ("c", "C", 3)])
+                self.assertEqual(10, map.find("A"))
+                self.assertEqual(3, map.find("c"))
+                self.assertEqual("b", map.ceiling("B").item)
+                self.assertSequenceEqual([node.item for node in map.range("B", "Z")], ["b", "C"])
+                map.delete("B")
+                self.assertIsNone(map.find("b"))
+                self.assertTrue(map.tree.validate())
+
+
+    def test_delete_range_given_key_then_entries_with_keys_given(self):
+        for tree_type in (RBTree, SizedRBTree):
+            map = TreeMap(tree_type, key=str.lower)
+            map.insert_many([("A", "A!"), ("B", "B!"), ("C", "C!"), ("D", "D!")])
+            removed = map.delete_range("b", "c", entries=True)
+            self.assertSequenceEqual(list(removed), [("B", "B!"), ("C", "C!")])
+            self.assertSequenceEqual([node.item for node in map.iter()], ["A", "D"])
+
+    def test_key_then_given_keys_never_compared(self):
+        map = TreeMap(SizedRBTree, key=lambda key: key.position)
+        map.bulk_load((Uncomparable(index), index) for index in range(50))
+        map.insert_many((Uncomparable(index), index) for index in range(50, 100))
+        for index in range(0, 100, 7):
+            map.insert(Uncomparable(index), -index)
+        self.assertEqual(-14, map.find(Uncomparable(14)))
+        self.assertEqual(10, map.rank(Uncomparable(10)))
+        self.assertEqual(10, map.count_range(Uncomparable(10), Uncomparable(20), (True, False)))
+        map.delete_range(Uncomparable(90), None)
+        map.delete_many([Uncomparable(0)])
+        self.assertEqual(89, len(map.tree))
+        self.assertEqual(1, map.first().item.position)
+
+    def test_cursor_given_key_then_seek_takes_keys_given(self):
+        map = TreeMap(key=lambda key: -key)
+        map.insert_many((key, str(key)) for key in range(10))
+        cursor = map.cursor(5)
+        self.assertEqual(5, cursor.node.item)
+        self.assertEqual(7, cursor.seek(7).item)
+        self.assertEqual(6, cursor.next().item)
+        self.assertEqual(9, map.cursor().node.item)
+
+    def test_key_given_other_engine_then_exception(self):
+        self.assertRaises(Exception, lambda: TreeMap(ArrayRBTree, key=str.lower))
+
+    def test_node_mode_then_nodes_are_those_of_the_tree(self):
+        for tree_type in (RBTree, SizedRBTree, lambda: BPlusTree(4)):
+            map = TreeMap(tree_type, "node")
+            for key in range(100):
+                map.insert(key, str(key))
+            map.insert_many((key, str(key)) for key in range(50, 150))
+            map.delete_many(range(0, 150, 3))
+            for key, node in map.map.items():
+                self.assertIs(map.tree.find(key), node)
+
+class Uncomparable:
+    # A key only ordered through its key function
+
+    __slots__ = ('position',)
+
+    def __init__(self, position: int):
+        self.position = position
+
+    def __lt__(self, other):
+        raise Exception("compared without the key function")
+
+    def __eq__(self, other):
+        raise Exception("compared without the key function")
+
+    __hash__ = None
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -1,14 +1,25 @@
-from node import Node, AVLNode, RBNode
+from node import Node, AVLNode, RBNode, SizedNode, SizedAVLNode, SizedRBNode
+
+# Batches are merged by a rebuild once batch * REBUILD_FACTOR * log2(n + batch) >= n + batch
+REBUILD_FACTOR = 0.5
 
 class Tree:
 
+    node_type = Node
+
     def __init__(self):
-        self.nil = Node(None, None)
+        self.nil = self.node_type(None, None)
         self.root = self.nil
+        # Incremented on every structural change, so iterators can detect modification
+        self.mod_count = 0
+        self.size = 0
 
     def __repr__(self) -> str:
         return self.__print_tree(0, self.root)
 
+    def __len__(self) -> int:
+        return self.size
+
     def __print_tree(self, height, node):
         if node is None or node == self.nil:
             return ""
@@ -23,99 +34,454 @@ class Tree:
         return branch
 
     def find(self, key) -> Node:
+        # One comparison per level, the last node not above key is the only one that can equal it
+        nil = self.nil
+        found = nil
         curr = self.root
-        while curr != self.nil and key != curr.key:
+        while curr is not nil:
             if key < curr.key:
                 curr = curr.left
-            else: # > curr.key
+            else:
+                found = curr
                 curr = curr.right
-        return curr
+        if found is not nil and found.key < key:
+            return nil
+        return found
     
     def insert(self, key, data):
         if key is None:
             raise Exception("key cannot be none")
-        new_node = Node(key, data)
+        new_node = self.node_type(key, data)
         new_node.parent = None
         new_node.left = self.nil
         new_node.right = self.nil
         return self._insert_node(new_node)
 
     def delete(self, key) -> bool:
-        to_delete: Node = self.find(key)
+        return self.delete_node(self.find(key))
+
+    def delete_node(self, to_delete: Node) -> bool:
+        # Deletes a node of this tree, such as one returned by insert or find, without searching for its key
         replacement: Node = self._delete_node(to_delete)
         # This is only when to_delete is None or nil (not found)
         if replacement is None:
             return False
+        self.nil.parent = None
+        return True
+
+    def insert_many(self, items) -> list:
+        # Sorts the (key, data) pairs, then inserts each or merges them into a rebuilt tree when that is cheaper.
+        # Returns the node holding each key in ascending key order, like insert does for a single key.
+        batch = sorted(items, key=_item_key)
+        if len(batch) == 0:
+            return []
+        if not self._rebuild_cheaper(len(batch)):
+            return [self.insert(key, data) for key, data in batch]
+        nodes = list(self.iter())
+        merged = []
+        placed = []
+        i = 0
+        for key, data in batch:
+            if key is None:
+                raise Exception("key cannot be none")
+            while i < len(nodes) and nodes[i].key < key:
+                merged.append(nodes[i])
+                i += 1
+            # duplicate key (of the tree, or earlier in the batch), ignore insert
+            if i < len(nodes) and not key < nodes[i].key:
+                placed.append(nodes[i])
+                continue
+            if len(merged) > 0 and not merged[-1].key < key:
+                placed.append(merged[-1])
+                continue
+            merged.append(self.node_type(key, data))
+            placed.append(merged[-1])
+        merged.extend(nodes[i:])
+        self._build_nodes(iter(merged), len(merged))
+        return placed
+
+    def delete_many(self, keys) -> int:
+        # Sorts the keys, then deletes each or rebuilds the tree from the remaining nodes when that is cheaper
+        keys = sorted(keys)
+        if len(keys) == 0:
+            return 0
+        if not self._rebuild_cheaper(len(keys)):
+            deleted = 0
+            for key in keys:
+                if self.delete(key):
+                    deleted += 1
+            return deleted
+        remaining = []
+        i = 0
+        for node in self.iter():
+            while i < len(keys) and keys[i] < node.key:
+                i += 1
+            if i < len(keys) and not node.key < keys[i]:
+                continue
+            remaining.append(node)
+        deleted = self.size - len(remaining)
+        if deleted > 0:
+            self._build_nodes(iter(remaining), len(remaining))
+        return deleted
+
+    def split(self, key) -> 'Tree':
+        # Moves the nodes with keys >= key to a new tree of the same type, which is returned. The nodes
+        # on the search path for key are joined back up into the two trees, each join costing the
+        # difference in height of its two sides, so the whole split is O(log n). Trees without sizes
+        # count the smaller part, O(min(k, n - k)), the Sized trees take their sizes from the root.
+        # Trees split from one another share their nil node, so they must not be changed by
+        # different threads at once.
+        right = self._split(key)
+        self._split_sizes(right, self.size)
+        return right
+
+    def delete_range(self, lo = None, hi = None, inclusive = True) -> 'Tree':
+        # Cuts the nodes of range(lo, hi, inclusive) out into a new tree, which is returned, by two splits
+        # and a join. O(log n) for the Sized trees, the others count the nodes cut out, O(log n + k).
+        lo_inclusive, hi_inclusive = inclusive if isinstance(inclusive, tuple) else (inclusive, inclusive)
+        total = self.size
+        removed = self._split(lo, not lo_inclusive)
+        if hi is not None:
+            right = removed._split(hi, hi_inclusive)
+            right.size = 0
+            self.join(right)
+        count = removed._count()
+        removed.size = count
+        self.size = total - count
+        return removed
+
+    def _split(self, key, after: bool = False) -> 'Tree':
+        # The split without sizes. After moves a node of key to this tree instead, and a key of None
+        # moves every node.
+        right = type(self)()
+        right.node_type = self.node_type
+        right.nil = self.nil
+        right.root = self.nil
+        self.mod_count += 1
+        if key is None:
+            right.root, self.root = self.root, self.nil
+            return right
+        nil = self.nil
+        path = []
+        node = self.root
+        height = self._height(node)
+        while node is not nil:
+            below = node.key < key or (after and not key < node.key)
+            path.append((node, height, below))
+            child = node.right if below else node.left
+            height = self._child_height(node, height, child)
+            node = child
+        left_root, left_height = nil, 0
+        right_root, right_height = nil, 0
+        # Bottom up, each node on the path joins the subtree off the path to the side it belongs to
+        for node, height, below in reversed(path):
+            if below:
+                child = node.left
+                child.parent = None
+                left_root, left_height = self._join(child, self._child_height(node, height, child), node,
+                                                    left_root, left_height)
+            else:
+                child = node.right
+                child.parent = None
+                right_root, right_height = self._join(right_root, right_height, node,
+                                                      child, self._child_height(node, height, child))
+        self.root = left_root
+        right.root = right_root
+        self.root.parent = None
+        right.root.parent = None
+        nil.parent = None
+        return right
+
+    def join(self, right: 'Tree'):
+        # Moves every node of right, whose keys must all be greater than this tree's, to the end of this
+        # tree in O(log n), leaving right empty. Trees that were not split from one another relink the
+        # empty children of the smaller one first, O(min(n, m)).
+        if right.root is right.nil:
+            return
+        if self.root is not self.nil and not self.last().key < right.first().key:
+            raise Exception("the keys of the joined tree must all be greater")
+        if right.nil is not self.nil:
+            if self.size <= right.size:
+                self.__relink(self.root, right.nil)
+                if self.root is self.nil:
+                    self.root = right.nil
+                self.nil = right.nil
+            else:
+                right.__relink(right.root, self.nil)
+                right.nil = self.nil
+        # The smallest node of right becomes the middle of the join
+        middle = right.first()
+        right.delete_node(middle)
+        middle.left = middle.right = self.nil
+        middle.parent = None
+        root, height = self._join(self.root, self._height(self.root), middle, right.root, right._height(right.root))
+        self.root = root
+        root.parent = None
+        self.nil.parent = None
+        self.size += right.size + 1
+        self.mod_count += 1
+        right.root = right.nil
+        right.size = 0
+        right.mod_count += 1
+
+    @classmethod
+    def from_sorted(cls, items, count: int = None):
+        # Builds a balanced tree in O(n) without rotations, from (key, data) pairs in ascending key order
+        tree = cls()
+        tree._build_sorted(items, count)
+        return tree
+
+    def validate(self) -> bool:
+        # Raises on the first node that breaks the ordering or parent links, otherwise True
+        if self.root is not self.nil and self.root.parent is not None:
+            raise Exception(f"The root has a parent. {self.root}")
+        prev = self.nil
+        stack = []
+        node = self.root
+        while stack or node is not self.nil:
+            while node is not self.nil:
+                for child in (node.left, node.right):
+                    if child is not self.nil and child.parent is not node:
+                        raise Exception(f"Node is not the parent of its child. {node}")
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            if prev is not self.nil and not prev.key < node.key:
+                raise Exception(f"Node is out of order. {node}")
+            prev = node
+            node = node.right
         return True
 
     # General Node-manipulating methods
 
+    def _rebuild_cheaper(self, batch_size: int) -> bool:
+        # A rebuild visits all n + m nodes once, while single updates pay a descent and rebalance each.
+        # The constant is measured by the batch benchmark (python benchmark.py batch).
+        return batch_size * REBUILD_FACTOR * (self.size + batch_size).bit_length() >= self.size + batch_size
+
+    def _build_sorted(self, items, count: int = None):
+        if count is None:
+            items, count = _sized(items)
+        self._build_nodes(self.__new_nodes(_ascending(items)), count)
+
+    def __new_nodes(self, items):
+        for key, data in items:
+            yield self.node_type(key, data)
+
+    def _build_nodes(self, nodes, count: int):
+        # Links nodes in ascending key order into a balanced tree, existing nodes are reused as they are
+        # Levels above the deepest are always full, the deepest level is where partial levels end
+        full_depth = (count + 1).bit_length() - 1
+        self.root = self._link_sorted(nodes, count, 0, full_depth)
+        self.root.parent = None
+        self.size = count
+        self.mod_count += 1
+
+    def _link_sorted(self, nodes, count: int, depth: int, full_depth: int) -> Node:
+        if count == 0:
+            return self.nil
+        # The left subtree takes the smaller half, so sibling subtrees differ in size by at most one
+        left = self._link_sorted(nodes, (count - 1) // 2, depth + 1, full_depth)
+        try:
+            node = next(nodes)
+        except StopIteration:
+            raise Exception("items ended before the expected count")
+        node.left = left
+        node.right = self._link_sorted(nodes, count // 2, depth + 1, full_depth)
+        if left is not self.nil:
+            left.parent = node
+        if node.right is not self.nil:
+            node.right.parent = node
+        self._link_sorted_node(node, depth, full_depth)
+        return node
+
+    def _link_sorted_node(self, node: Node, depth: int, full_depth: int):
+        pass
+
+    def _build_shaped(self, items, count: int):
+        # Rebuilds the exact tree that (key, data, height, black) items in ascending key order were taken
+        # from, height being that of the node's subtree. A node's parent is the nearest taller node on
+        # either side, so a stack of the right spine links every node in O(n) without rotations.
+        nil = self.nil
+        spine = []
+        prev = None
+        built = 0
+        for key, data, height, black in items:
+            if built == count:
+                break
+            if key is None:
+                raise Exception("key cannot be none")
+            if prev is not None and not prev < key:
+                raise Exception(f"keys must be sorted and unique, {key} follows {prev}")
+            prev = key
+            node = self.node_type(key, data)
+            node.left = node.right = nil
+            # The shorter nodes before this one are finished, the last is its left child
+            left = nil
+            while spine and spine[-1][1] < height:
+                left, left_height, left_black = spine.pop()
+                self._link_shaped_node(left, left_height, left_black)
+            node.left = left
+            if left is not nil:
+                left.parent = node
+            if spine:
+                spine[-1][0].right = node
+                node.parent = spine[-1][0]
+            spine.append((node, height, black))
+            built += 1
+        if built < count:
+            raise Exception("items ended before the expected count")
+        root = nil
+        while spine:
+            root, height, black = spine.pop()
+            self._link_shaped_node(root, height, black)
+        self.root = root
+        self.root.parent = None
+        self.size = count
+        self.mod_count += 1
+
+    def _link_shaped_node(self, node: Node, height: int, black: bool):
+        pass
+
+    # Split and join, the height of a subtree is whatever measure the tree balances by
+
+    def _height(self, root: Node) -> int:
+        return 0
+
+    def _child_height(self, parent: Node, height: int, child: Node) -> int:
+        return 0
+
+    def _join(self, left: Node, left_height: int, node: Node, right: Node, right_height: int) -> tuple:
+        # Links node between two detached subtrees whose keys are below and above it, and returns the
+        # root and height of the result. The tree's root is used as the workspace of the join.
+        node.left = left
+        node.right = right
+        node.parent = None
+        if left is not self.nil:
+            left.parent = node
+        if right is not self.nil:
+            right.parent = node
+        self.root = node
+        self._joined(node)
+        return node, 0
+
+    def _joined(self, node: Node):
+        pass
+
+    def _count(self) -> int:
+        return sum(1 for node in TreeIterator(self))
+
+    def _split_sizes(self, right: 'Tree', total: int):
+        # Counts the smaller tree by walking both at once, the larger has the rest
+        left_nodes = TreeIterator(self)
+        right_nodes = TreeIterator(right)
+        counted = 0
+        while True:
+            if next(left_nodes, None) is None:
+                self.size, right.size = counted, total - counted
+                return
+            if next(right_nodes, None) is None:
+                self.size, right.size = total - counted, counted
+                return
+            counted += 1
+
+    def __relink(self, root: Node, nil: Node):
+        # Points the empty children of every node at another nil
+        stack = [root] if root is not self.nil else []
+        while stack:
+            node = stack.pop()
+            for child in (node.left, node.right):
+                if child is not self.nil:
+                    stack.append(child)
+            if node.left is self.nil:
+                node.left = nil
+            if node.right is self.nil:
+                node.right = nil
+
     def _insert_node(self, new_node: Node):
+        # One comparison per level as in find, the last node not above the key is checked for a duplicate
+        nil = self.nil
+        key = new_node.key
         parent = None
+        found = None
+        went_left = False
         curr = self.root
-        while curr != self.nil:
+        while curr is not nil:
             parent = curr
-            if new_node.key < curr.key:
+            if key < curr.key:
                 curr = curr.left
-            elif new_node.key > curr.key:
-                curr = curr.right
+                went_left = True
             else:
-                # duplicate key, ignore insert
-                return
-        
+                found = curr
+                curr = curr.right
+                went_left = False
+        if found is not None and not found.key < key:
+            # duplicate key, ignore insert
+            return found
+
         if parent is None:
             self.root = new_node
         else:
             new_node.parent = parent
-            if new_node.key < parent.key:
+            if went_left:
                 parent.left = new_node
-            else: # > parent.key
+            else:
                 parent.right = new_node
+        self.mod_count += 1
+        self.size += 1
+        return new_node
     
     def _delete_node(self, to_delete: Node) -> Node:
         if to_delete is None or to_delete == self.nil:
             return None
         
         to_replace: Node
-        # This is a leaf node
-        if to_delete.left == self.nil and to_delete.right == self.nil:
-            to_replace = self.nil
+        # Only a right child, or a leaf node (replaced by nil)
+        if to_delete.left == self.nil:
+            to_replace = to_delete.right
+            self._transplant(to_delete, to_replace)
         # Only a left child
-        elif to_delete.left != self.nil and to_delete.right == self.nil:
+        elif to_delete.right == self.nil:
             to_replace = to_delete.left
-        # Only a right child
-        elif to_delete.right != self.nil and to_delete.left == self.nil:
-            to_replace = to_delete.right
+            self._transplant(to_delete, to_replace)
         # Has both children
         else:
             # Fetch the next largest node to replace the one being deleted
-            right_min: Node = to_delete.right
-            while right_min.left != self.nil:
-                right_min = right_min.left
-
-            if to_delete.right != right_min:
+            right_min: Node = self._minimum(to_delete.right)
+            to_replace = right_min.right
+            if right_min.parent is to_delete:
+                to_replace.parent = right_min
+            else:
                 # Move the replacing node's only potential child to take its place
-                right_min.parent.left = right_min.right
+                self._transplant(right_min, right_min.right)
                 right_min.right = to_delete.right
+                right_min.right.parent = right_min
+            self._transplant(to_delete, right_min)
             right_min.left = to_delete.left
-            to_replace = right_min
+            right_min.left.parent = right_min
+        self.mod_count += 1
+        self.size -= 1
+        # Return the replacing node for processing, its parent is set even when it is nil
+        return to_replace
 
-        if to_delete.parent is None:
-            self.root = to_replace
+    def _transplant(self, old: Node, new: Node):
+        if old.parent is None:
+            self.root = new
+        elif old is old.parent.left:
+            old.parent.left = new
         else:
-            # Determine which child of the parent this is
-            if self._left_child(to_delete):
-                to_delete.parent.left = to_replace
-            else:
-                to_delete.parent.right = to_replace
-        # Update parent references
-        to_replace.parent = to_delete.parent
-        if to_delete.left is not None and to_delete.left != self.nil and to_delete.left != to_replace:
-            to_delete.left.parent = to_replace
-        if to_delete.right is not None and to_delete.right != self.nil and to_delete.right != to_replace:
-            to_delete.right.parent = to_replace
-        # Return the replacing node for processing
-        return to_replace
+            old.parent.right = new
+        new.parent = old.parent
+
+    def _minimum(self, node: Node) -> Node:
+        while node.left is not self.nil:
+            node = node.left
+        return node
+
+    def _maximum(self, node: Node) -> Node:
+        while node.right is not self.nil:
+            node = node.right
+        return node
 
     def _left_child(self, node: Node) -> bool:
         if node.parent is None:
@@ -145,6 +511,8 @@ class Tree:
 
         node.parent = node.right
         node.right = temp
+        if temp != self.nil:
+            temp.parent = node
 
     def _rotate_right(self, node: Node):
         if node is None or node == self.nil or node.left == self.nil:
@@ -163,85 +531,324 @@ class Tree:
 
         node.parent = node.left
         node.left = temp
+        if temp != self.nil:
+            temp.parent = node
+
+    # Ordered navigation, each returns nil when there is no such node
+
+    def first(self) -> Node:
+        if self.root is self.nil:
+            return self.nil
+        return self._minimum(self.root)
+
+    def last(self) -> Node:
+        if self.root is self.nil:
+            return self.nil
+        return self._maximum(self.root)
+
+    def floor(self, key) -> Node:
+        # The largest node with a key <= the given key
+        found = self.nil
+        curr = self.root
+        while curr is not self.nil:
+            if key < curr.key:
+                curr = curr.left
+            else:
+                found = curr
+                curr = curr.right
+        return found
+
+    def ceiling(self, key) -> Node:
+        # The smallest node with a key >= the given key
+        found = self.nil
+        curr = self.root
+        while curr is not self.nil:
+            if curr.key < key:
+                curr = curr.right
+            else:
+                found = curr
+                curr = curr.left
+        return found
+
+    def lower(self, key) -> Node:
+        # The largest node with a key < the given key
+        found = self.nil
+        curr = self.root
+        while curr is not self.nil:
+            if curr.key < key:
+                found = curr
+                curr = curr.right
+            else:
+                curr = curr.left
+        return found
+
+    def higher(self, key) -> Node:
+        # The smallest node with a key > the given key
+        found = self.nil
+        curr = self.root
+        while curr is not self.nil:
+            if key < curr.key:
+                found = curr
+                curr = curr.left
+            else:
+                curr = curr.right
+        return found
+
+    def range(self, lo = None, hi = None, inclusive = True):
+        # Bounds of None are open, and inclusive can be a (lo, hi) pair to set each bound separately
+        lo_inclusive, hi_inclusive = inclusive if isinstance(inclusive, tuple) else (inclusive, inclusive)
+        if lo is None:
+            start = self.first()
+        else:
+            start = self.ceiling(lo) if lo_inclusive else self.higher(lo)
+        for node in TreeIterator(self, start):
+            if hi is not None and (hi < node.key if hi_inclusive else not node.key < hi):
+                return
+            yield node
 
     def iter(self):
         return TreeIterator(self)
 
+    def __reversed__(self):
+        return ReverseTreeIterator(self)
+
+    def cursor(self, key = None) -> 'TreeCursor':
+        # A cursor at the smallest node with a key >= the given key, or at the first node
+        return TreeCursor(self, key)
+
 class AVLTree(Tree):
 
-    def __init__(self):
-        self.nil = AVLNode(None, None)
-        self.root = self.nil
+    node_type = AVLNode
+
+    def validate(self) -> bool:
+        super().validate()
+        self.__validate_height(self.root)
+        return True
+
+    def __validate_height(self, node: AVLNode) -> int:
+        if node is self.nil:
+            return 0
+        left = self.__validate_height(node.left)
+        right = self.__validate_height(node.right)
+        if node.height != 1 + max(left, right):
+            raise Exception(f"Node has an incorrect height. {node}")
+        if abs(left - right) > 1:
+            raise Exception(f"Node is imbalanced. {node}")
+        return node.height
+
+    def _link_sorted_node(self, node: AVLNode, depth: int, full_depth: int):
+        node.update_height()
+
+    def _link_shaped_node(self, node: AVLNode, height: int, black: bool):
+        node.height = height
+
+    def _height(self, root: AVLNode) -> int:
+        return root.height
+
+    def _child_height(self, parent: AVLNode, height: int, child: AVLNode) -> int:
+        return child.height
+
+    def _join(self, left: AVLNode, left_height: int, node: AVLNode, right: AVLNode, right_height: int) -> tuple:
+        # The shorter side is hung from the spine of the taller one where the heights meet, then the
+        # spine is rebalanced as after an insert
+        nil = self.nil
+        if left_height > right_height + 1:
+            parent = spine = left
+            while spine.height > right_height + 1:
+                parent = spine
+                spine = spine.right
+            parent.right = node
+            node.left, node.right = spine, right
+            self.root = left
+        elif right_height > left_height + 1:
+            parent = spine = right
+            while spine.height > left_height + 1:
+                parent = spine
+                spine = spine.left
+            parent.left = node
+            node.left, node.right = left, spine
+            self.root = right
+        else:
+            parent = None
+            node.left, node.right = left, right
+            self.root = node
+        node.parent = parent
+        if node.left is not nil:
+            node.left.parent = node
+        if node.right is not nil:
+            node.right.parent = node
+        node.update_height()
+        self._joined(node)
+        self._balance_tree(parent)
+        return self.root, self.root.height
+
+    def _rotate_left(self, node: AVLNode):
+        super()._rotate_left(node)
+        # The demoted node is now below the promoted one, so its height is updated first
+        if node is not None and node != self.nil and node.parent is not None:
+            node.update_height()
+            node.parent.update_height()
+
+    def _rotate_right(self, node: AVLNode):
+        super()._rotate_right(node)
+        if node is not None and node != self.nil and node.parent is not None:
+            node.update_height()
+            node.parent.update_height()
 
     def _balance_tree(self, node: AVLNode):
-        if node is None:
-            return
-        while node.parent is not None:
-            # Ensure that this node has the correct height for balancing
+        while node is not None and node != self.nil:
+            height = node.height
             node.update_height()
-            parent = node.parent # Maintain record, as it will change for node
-            if self._left_child(node):
-                # left imbalance
-                if parent.balance() > 1:
-                    # node with larger right
-                    if node.balance() < 0:
-                        self._rotate_left(node)
-                        self._rotate_right(parent)
-                    else:
-                        self._rotate_right(parent)
-                elif parent.balance() < 0:
-                    # imbalance will be absorbed by node
-                    break
-            else:
-                # right imbalance
-                if parent.balance() < -1:
-                    # node with larger left
-                    if node.balance() > 0:
-                        self._rotate_right(node)
-                        self._rotate_left(parent)
-                    elif node.balance() < 0:
-                        self._rotate_left(parent)
-                elif parent.balance() > 0:
-                    # imbalance will be absorbed by node
-                    break
-            node = parent
+            # left imbalance
+            if node.balance() > 1:
+                # left child with larger right
+                if node.left.balance() < 0:
+                    self._rotate_left(node.left)
+                self._rotate_right(node)
+                # Continue from the promoted node
+                node = node.parent
+            # right imbalance
+            elif node.balance() < -1:
+                # right child with larger left
+                if node.right.balance() > 0:
+                    self._rotate_right(node.right)
+                self._rotate_left(node)
+                node = node.parent
+            elif node.height == height:
+                # The subtree kept its height, so the ancestors are unaffected
+                break
+            node = node.parent
     
     def insert(self, key, data):
         if key is None:
             raise Exception("key cannot be none")
-        new_node = AVLNode(key, data)
+        new_node = self.node_type(key, data)
         new_node.parent = None
         new_node.left = self.nil
         new_node.right = self.nil
 
-        super()._insert_node(new_node)
-        self._balance_tree(new_node)
+        node = self._insert_node(new_node)
+        if node is new_node:
+            self._balance_tree(new_node.parent)
+        return node
 
-    def delete(self, key) -> bool:
-        to_delete: Node = self.find(key)
-        replacement: Node = super()._delete_node(to_delete)
-        if replacement is None:
+    def delete_node(self, to_delete: AVLNode) -> bool:
+        if to_delete is None or to_delete is self.nil:
             return False
-        self._balance_tree(replacement)
+        # The successor takes the deleted node's place, and with it the deleted node's height
+        moved = to_delete
+        if to_delete.left != self.nil and to_delete.right != self.nil:
+            moved = self._minimum(to_delete.right)
+        replacement: Node = self._delete_node(to_delete)
+        moved.height = to_delete.height
+        self._balance_tree(replacement.parent)
+        self.nil.parent = None
         return True
     
 class RBTree(Tree):
 
-    def __init__(self):
-        self.nil = RBNode(None)
-        self.root = self.nil
-    
-    def _balance_tree(self, node: RBNode):
+    node_type = RBNode
+
+    def validate(self) -> bool:
+        super().validate()
+        if not self.root.black:
+            raise Exception(f"The root is red. {self.root}")
+        self.__validate_black_height(self.root)
+        return True
+
+    def __validate_black_height(self, node: RBNode) -> int:
+        if node is self.nil:
+            return 1
+        if not node.black and not (node.left.black and node.right.black):
+            raise Exception(f"Red node has a red child. {node}")
+        left = self.__validate_black_height(node.left)
+        right = self.__validate_black_height(node.right)
+        if left != right:
+            raise Exception(f"Node has unequal black heights. {node}")
+        return left + (1 if node.black else 0)
+
+    def _link_sorted_node(self, node: RBNode, depth: int, full_depth: int):
+        # Only the partially filled deepest level is red, every path then has the same black height
+        node.black = depth < full_depth
+
+    def _link_shaped_node(self, node: RBNode, height: int, black: bool):
+        node.black = black
+
+    def _height(self, root: RBNode) -> int:
+        # The black nodes from root down to nil, root included
+        height = 0
+        while root is not self.nil:
+            if root.black:
+                height += 1
+            root = root.left
+        return height
+
+    def _child_height(self, parent: RBNode, height: int, child: RBNode) -> int:
+        return height - 1 if parent.black else height
+
+    def _join(self, left: RBNode, left_height: int, node: RBNode, right: RBNode, right_height: int) -> tuple:
+        # The shorter side is hung, under node as a red node, from the spine of the taller one at the
+        # first black node of the same black height, then a red violation is fixed as after an insert.
+        # A red root of the shorter side is blackened first, so node cannot have a red child.
+        nil = self.nil
+        if left_height > right_height and not right.black:
+            right.black = True
+            right_height += 1
+        if right_height > left_height and not left.black:
+            left.black = True
+            left_height += 1
+        if left_height == right_height:
+            node.left, node.right = left, right
+            node.parent = None
+            node.black = True
+            height = left_height + 1
+            self.root = node
+        else:
+            taller, height, shorter_height = (left, left_height, right_height) if left_height > right_height \
+                else (right, right_height, left_height)
+            parent = None
+            spine = taller
+            spine_height = height
+            while not (spine.black and spine_height == shorter_height):
+                if spine.black:
+                    spine_height -= 1
+                parent = spine
+                spine = spine.right if taller is left else spine.left
+            if taller is left:
+                parent.right = node
+                node.left, node.right = spine, right
+            else:
+                parent.left = node
+                node.left, node.right = left, spine
+            node.parent = parent
+            node.black = False
+            self.root = taller
+        if node.left is not nil:
+            node.left.parent = node
+        if node.right is not nil:
+            node.right.parent = node
+        self._joined(node)
+        if not node.black and self._balance_tree(node):
+            height += 1
+        if not self.root.black:
+            self.root.black = True
+            height += 1
+        return self.root, height
+
+    def _balance_tree(self, node: RBNode) -> bool:
+        # Returns True when a red root was blackened, which adds one to the black height of the tree
         if node is None:
-            return
+            return False
         
         while node.parent is not None:
             parent = node.parent
+            if parent.black:
+                # No red-violation remains between node and parent
+                break
             if parent.parent is None:
                 # Recolour to avoid red-violation
-                if not parent.black:
-                    parent.black = True
-                break
+                parent.black = True
+                return True
 
             child_is_left = self._left_child(node)
             parent_is_left = self._left_child(parent)
@@ -283,131 +890,390 @@ class RBTree(Tree):
         # Update the root to reflect rearranged structure
         if node.parent is None:
             self.root = node
+            grew = not node.black
             self.root.black = True
+            return grew
+        return False
 
     def insert(self, key, data):
         if key is None:
             raise Exception("key cannot be none")
-        new_node = RBNode(key, data)
+        new_node = self.node_type(key, data)
         new_node.parent = None
         new_node.left = self.nil
         new_node.right = self.nil
         new_node.black = False
 
-        super()._insert_node(new_node)
-        self._balance_tree(new_node)
+        node = self._insert_node(new_node)
+        if node is new_node:
+            self._balance_tree(new_node)
+        return node
     
-    def _balance_delete(self, replacement, deleted):
-        # The replacement is the next successor (black) or an only child (red)
-        if replacement != self.nil and not replacement.black:
-            # This node has replaced its parent, recolour to remove red-violation
-            replacement.black = True
-            return
-        
-        # The replacement is for a leaf node (black or red)
-        if replacement == self.nil:
-            # Deleted red-leaf nodes will not break any properties
-            if not deleted.black:
-                return
-
-        # A black-leaf node was deleted, a rebalance is required
-        node = deleted
-        node_is_left = True if deleted.parent is not None and deleted.parent.left == self.nil else False
-        while node.parent is not None:
+    def _balance_delete(self, replacement: RBNode):
+        # The replacement carries an extra black, which is moved up until it can be absorbed
+        node = replacement
+        while node.parent is not None and node.black:
             parent = node.parent
-            if parent is None:
-                # The root, nothing is required
-                return
-        
-            sibling = parent.right if node_is_left else parent.left
-            close_nephew = parent.right.left if node_is_left else parent.left.right
-            distant_nephew = parent.right.right if node_is_left else parent.left.left
-            # sibling is red, close, distant and parent are black 
-            if not sibling.black:
-                # Move sibling to the location of the parent
-                if node_is_left:
+            if node is parent.left:
+                sibling = parent.right
+                # sibling is red, move it to the location of the parent
+                if not sibling.black:
+                    sibling.black = True
+                    parent.black = False
                     self._rotate_left(parent)
-                else:
-                    self._rotate_right(parent)
-                sibling.black = True
-                parent.black = False
-                continue
-            # close nephew is red, sibling and distant are black, parent is either
-            if not close_nephew.black:
-                if node_is_left:
+                    sibling = parent.right
+                # both nephews are black, recolour the sibling and move the extra black up
+                if sibling.left.black and sibling.right.black:
+                    sibling.black = False
+                    node = parent
+                    continue
+                # close nephew is red and distant is black, rotate it into the distant position
+                if sibling.right.black:
+                    sibling.left.black = True
+                    sibling.black = False
                     self._rotate_right(sibling)
-                else:
-                    self._rotate_left(sibling)
-                close_nephew.black = True
-                sibling.black = False  
-                continue
-            # distant nephew is red, sibling and close are black, parent is either
-            if not distant_nephew.black:
-                if node_is_left:
-                    self._rotate_left(parent)
-                else:
-                    self._rotate_right(parent)
+                    sibling = parent.right
+                # distant nephew is red, rotate the sibling up to absorb the extra black
                 sibling.black = parent.black
                 parent.black = True
-                distant_nephew.black = True
-                return
-            
-            if not parent.black and sibling.black and close_nephew.black and distant_nephew.black:
-                parent.black = True
-                sibling.black = False
-                return
+                sibling.right.black = True
+                self._rotate_left(parent)
             else:
-                sibling.black = False
-                node = parent
-                if node.parent is not None:
-                    node_is_left = self._left_child(node)
+                sibling = parent.left
+                if not sibling.black:
+                    sibling.black = True
+                    parent.black = False
+                    self._rotate_right(parent)
+                    sibling = parent.left
+                if sibling.left.black and sibling.right.black:
+                    sibling.black = False
+                    node = parent
+                    continue
+                if sibling.left.black:
+                    sibling.right.black = True
+                    sibling.black = False
+                    self._rotate_left(sibling)
+                    sibling = parent.left
+                sibling.black = parent.black
+                parent.black = True
+                sibling.left.black = True
+                self._rotate_right(parent)
+            node = self.root
+        node.black = True
 
-    def delete(self, key) -> bool:
-        to_delete = self.find(key)
-        replacement = super()._delete_node(to_delete)
-        if replacement is None:
+    def delete_node(self, to_delete: RBNode) -> bool:
+        if to_delete is None or to_delete is self.nil:
             return False
-        self._balance_delete(replacement, to_delete)
+        # The successor takes the deleted node's place and colour, so its own colour is the one removed
+        moved = to_delete
+        if to_delete.left != self.nil and to_delete.right != self.nil:
+            moved = self._minimum(to_delete.right)
+        removed_black = moved.black
+        replacement = self._delete_node(to_delete)
+        moved.black = to_delete.black
+        if removed_black:
+            self._balance_delete(replacement)
+        self.nil.parent = None
         return True
 
+class SizedTree(Tree):
+    # Keeps a subtree size in every node, for O(log n) select, rank and count_range.
+    # SizedAVLTree and SizedRBTree keep these sizes through their rotations.
+
+    node_type = SizedNode
+
+    def select(self, index: int) -> Node:
+        # The node at the given position in key order, starting from 0, or nil when out of range
+        if index < 0 or index >= self.root.size:
+            return self.nil
+        node = self.root
+        while True:
+            left = node.left.size
+            if index < left:
+                node = node.left
+            elif index > left:
+                index -= left + 1
+                node = node.right
+            else:
+                return node
+
+    def rank(self, key) -> int:
+        # The number of keys < the given key
+        rank = 0
+        node = self.root
+        while node is not self.nil:
+            if node.key < key:
+                rank += node.left.size + 1
+                node = node.right
+            else:
+                node = node.left
+        return rank
+
+    def count_range(self, lo = None, hi = None, inclusive = True) -> int:
+        # The number of keys that range(lo, hi, inclusive) would visit
+        lo_inclusive, hi_inclusive = inclusive if isinstance(inclusive, tuple) else (inclusive, inclusive)
+        below = 0
+        if lo is not None:
+            below = self.rank(lo) if lo_inclusive else self.__rank_upper(lo)
+        upto = self.root.size
+        if hi is not None:
+            upto = self.__rank_upper(hi) if hi_inclusive else self.rank(hi)
+        return max(0, upto - below)
+
+    def validate(self) -> bool:
+        super().validate()
+        self.__validate_size(self.root)
+        return True
+
+    def __rank_upper(self, key) -> int:
+        # The number of keys <= the given key
+        rank = 0
+        node = self.root
+        while node is not self.nil:
+            if key < node.key:
+                node = node.left
+            else:
+                rank += node.left.size + 1
+                node = node.right
+        return rank
+
+    def __validate_size(self, node: Node) -> int:
+        if node is self.nil:
+            return 0
+        size = 1 + self.__validate_size(node.left) + self.__validate_size(node.right)
+        if node.size != size:
+            raise Exception(f"Node has an incorrect size. {node}")
+        return size
+
+    def _update_sizes(self, node: Node):
+        # Recounts the sizes from this node up to the root
+        while node is not None:
+            node.size = node.left.size + node.right.size + 1
+            node = node.parent
+
+    def _insert_node(self, new_node: Node):
+        node = super()._insert_node(new_node)
+        if node is new_node:
+            parent = new_node.parent
+            while parent is not None:
+                parent.size += 1
+                parent = parent.parent
+        return node
+
+    def _delete_node(self, to_delete: Node) -> Node:
+        replacement = super()._delete_node(to_delete)
+        # The replacement's parent is where a node was removed, even when the replacement is nil
+        if replacement is not None:
+            self._update_sizes(replacement.parent)
+        return replacement
+
+    def _rotate_left(self, node: Node):
+        super()._rotate_left(node)
+        # The demoted node is now below the promoted one, so its size is updated first
+        if node is not None and node is not self.nil and node.parent is not None:
+            node.size = node.left.size + node.right.size + 1
+            node.parent.size = node.parent.left.size + node.parent.right.size + 1
+
+    def _rotate_right(self, node: Node):
+        super()._rotate_right(node)
+        if node is not None and node is not self.nil and node.parent is not None:
+            node.size = node.left.size + node.right.size + 1
+            node.parent.size = node.parent.left.size + node.parent.right.size + 1
+
+    def _link_sorted_node(self, node: Node, depth: int, full_depth: int):
+        super()._link_sorted_node(node, depth, full_depth)
+        node.size = node.left.size + node.right.size + 1
+
+    def _link_shaped_node(self, node: Node, height: int, black: bool):
+        super()._link_shaped_node(node, height, black)
+        node.size = node.left.size + node.right.size + 1
+
+    def _joined(self, node: Node):
+        # The joined node's subtree is new to its ancestors, so each is recounted
+        self._update_sizes(node)
+
+    def _split_sizes(self, right: Tree, total: int):
+        self.size = self.root.size
+        right.size = right.root.size
+
+    def _count(self) -> int:
+        return self.root.size
+
+class SizedAVLTree(SizedTree, AVLTree):
+
+    node_type = SizedAVLNode
+
+class SizedRBTree(SizedTree, RBTree):
+
+    node_type = SizedRBNode
+
+def _item_key(item):
+    return item[0]
+
+def _sized(items):
+    if not hasattr(items, '__len__'):
+        items = list(items)
+    return items, len(items)
+
+def _ascending(items):
+    prev = None
+    for key, data in items:
+        if key is None:
+            raise Exception("key cannot be none")
+        if prev is not None and not prev < key:
+            raise Exception(f"keys must be sorted and unique, {key} follows {prev}")
+        prev = key
+        yield key, data
+
 class TreeIterator():
 
-    def __init__(self, tree: Tree):
+    def __init__(self, tree: Tree, start: Node = None):
         self.tree = tree
-        self.prev = None
-        self.prev_key = None
+        # Iteration begins at the given node, or the smallest when none is given
+        self.next = tree.first() if start is None else start
+        self.mod_count = tree.mod_count
     
     def __iter__(self):
         return self
 
     def __next__(self) -> Node:
-        next = self.tree.root if self.prev is None else self.prev
-        # Start iterating through the binary tree without recursion
-        # Note: Currently not safe from modification
-        while True:
-            # The root is nil, or a leaf node was unexpectedly used
-            if next == self.tree.nil:
-                raise StopIteration
-            # Follow the left subtree for the next smallest
-            while next.left != self.tree.nil:
-                if self.prev_key is not None and next.left.key <= self.prev_key:
-                    break
+        tree = self.tree
+        if tree.mod_count != self.mod_count:
+            raise RuntimeError("tree changed during iteration")
+        curr = self.next
+        nil = tree.nil
+        if curr is nil:
+            raise StopIteration
+        # The successor is the smallest node in the right subtree
+        if curr.right is not nil:
+            next = curr.right
+            while next.left is not nil:
                 next = next.left
-            # Update variables and return the next node
-            if next is not None and next != self.prev:
-                self.prev_key = next.key
-                self.prev = next
-                return next
-            # Go to the right subtree
-            if next.right != self.tree.nil and next.right.key > self.prev_key:
-                next = next.right
-            # Go to the next smallest parent
-            else:
-                while next.parent is not None:
-                    next = next.parent
-                    if next.key > self.prev_key:
-                        break
-            # Iteration ends when the root is reached with no more larger keys (right tree) to visit
-            if next == self.tree.root and next.key <= self.prev_key:
-                raise StopIteration
-            # Continue next cycle, looking for the next smallest key
\ No newline at end of file
+        # Otherwise it is the first parent reached from a left subtree
+        else:
+            child = curr
+            next = curr.parent
+            while next is not None and child is next.right:
+                child = next
+                next = next.parent
+            if next is None:
+                next = nil
+        self.next = next
+        return curr
+
+class ReverseTreeIterator():
+
+    def __init__(self, tree: Tree, start: Node = None):
+        self.tree = tree
+        # Iteration begins at the given node, or the largest when none is given
+        self.next = tree.last() if start is None else start
+        self.mod_count = tree.mod_count
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> Node:
+        tree = self.tree
+        if tree.mod_count != self.mod_count:
+            raise RuntimeError("tree changed during iteration")
+        curr = self.next
+        if curr is tree.nil:
+            raise StopIteration
+        self.next = _predecessor(tree, curr)
+        return curr
+
+class TreeCursor():
+    # A position in a tree that steps to the next or previous node by parent links, in amortized O(1)
+    # and without descending from the root, so it can be kept between calls such as pages of results.
+    # Off either end, or when its node was deleted, the cursor is in the gap just before or after a
+    # key, and steps from there with one O(log n) search. A change to the tree between steps is
+    # found by its mod_count, and the cursor finds its key again.
+
+    def __init__(self, tree: Tree, key = None):
+        self.tree = tree
+        self.node = tree.nil
+        self.key = None
+        # With no node, the cursor is just after key when after is True, otherwise just before it
+        self.after = False
+        self.mod_count = tree.mod_count
+        if key is None:
+            self.first()
+        else:
+            self.seek(key)
+
+    def seek(self, key) -> Node:
+        # Moves to the smallest node with a key >= the given key, or before key when there is none
+        return self.__move(self.tree.ceiling(key), key, False)
+
+    def first(self) -> Node:
+        node = self.tree.first()
+        return self.__move(node, node.key, False)
+
+    def last(self) -> Node:
+        node = self.tree.last()
+        return self.__move(node, node.key, True)
+
+    def next(self) -> Node:
+        # Moves to the following node and returns it, or nil once past the last node
+        tree = self.tree
+        if tree.mod_count != self.mod_count:
+            self.__find()
+        if self.node is not tree.nil:
+            return self.__move(_successor(tree, self.node), self.key, True)
+        if self.key is None:
+            return self.first()
+        return self.__move(tree.higher(self.key) if self.after else tree.ceiling(self.key), self.key, self.after)
+
+    def prev(self) -> Node:
+        # Moves to the preceding node and returns it, or nil once before the first node
+        tree = self.tree
+        if tree.mod_count != self.mod_count:
+            self.__find()
+        if self.node is not tree.nil:
+            return self.__move(_predecessor(tree, self.node), self.key, False)
+        if self.key is None:
+            return self.last()
+        return self.__move(tree.floor(self.key) if self.after else tree.lower(self.key), self.key, self.after)
+
+    def __move(self, node: Node, key, after: bool) -> Node:
+        # Keeps the key left from when there is no node, so stepping back returns to it
+        self.node = node
+        if node is not self.tree.nil:
+            self.key = node.key
+        else:
+            self.key = key
+            self.after = after
+        self.mod_count = self.tree.mod_count
+        return node
+
+    def __find(self):
+        if self.node is not self.tree.nil:
+            self.node = self.tree.find(self.key)
+            self.after = False
+        self.mod_count = self.tree.mod_count
+
+def _successor(tree: Tree, node: Node) -> Node:
+    nil = tree.nil
+    if node.right is not nil:
+        node = node.right
+        while node.left is not nil:
+            node = node.left
+        return node
+    parent = node.parent
+    while parent is not None and node is parent.right:
+        node = parent
+        parent = parent.parent
+    return nil if parent is None else parent
+
+def _predecessor(tree: Tree, node: Node) -> Node:
+    nil = tree.nil
+    if node.left is not nil:
+        node = node.left
+        while node.right is not nil:
+            node = node.right
+        return node
+    parent = node.parent
+    while parent is not None and node is parent.left:
+        node = parent
+        parent = parent.parent
+    return nil if parent is None else parent
@@ -1,26 +1,253 @@
 from tree import *
+from node import keyed
+from persistent_tree import PersistentRBTree
+
+# How a TreeMap indexes its keys besides the tree:
+#   "value"    a dict of key to value, a copy of every value kept in the tree (the default)
+#   "node"     a dict of key to tree node, values are only kept in the tree and deletes skip the tree search
+#   "ordered"  no dict, lookups search the tree, for the least memory
+MODES = ("value", "node", "ordered")
+
+# A key function orders the map by key(k) instead of k, as the key of sorted does. It is called once
+# for each key given to the map, and the computed key is what the tree and dict hold, so a descent
+# compares computed keys once per level instead of calling the __lt__ of the keys given. Keys whose
+# computed keys are equal are the same key. Without a key function, keys such as ints and strs are
+# compared as they are, with no call on any path.
 
 class TreeMap():
 
-    def __init__(self) -> None:
-        self.map = {}
-        self.tree = RBTree()
+    def __init__(self, tree_type = RBTree, mode: str = "value", key = None) -> None:
+        if mode not in MODES:
+            raise Exception(f"mode must be one of {', '.join(MODES)}, not {mode}")
+        self.mode = mode
+        self.map = None if mode == "ordered" else {}
+        # Order statistics (select, rank, count_range) need a sized tree, such as SizedRBTree
+        self.tree = tree_type()
+        if mode == "node" and isinstance(self.tree, PersistentRBTree):
+            # Writes copy the nodes on their path, so the dict would hold stale copies and the old versions with them
+            raise Exception("a persistent tree cannot be used in the node mode, its nodes are copied by writes")
+        self.key = key
+        if key is not None:
+            if not isinstance(self.tree, Tree):
+                raise Exception(f"a key function needs a tree of tree.py, not {type(self.tree).__name__}")
+            self.tree.node_type = keyed(self.tree.node_type)
 
     def find(self, key):
+        if self.key is not None:
+            key = self.key(key)
+        if self.mode == "ordered":
+            node = self.tree.find(key)
+            return None if node is self.tree.nil else node.data
         try:
-            return self.map[key]
+            value = self.map[key]
         except KeyError:
             return None
+        return value.data if self.mode == "node" else value
 
     def insert(self, key, value):
-        self.tree.insert(key, value)
-        self.map.update({key: value})
+        # An existing key takes the new value, in the tree as well as the dict
+        if self.key is not None:
+            item, key = key, self.key(key)
+            node = self.tree.insert(key, value)
+            if node.item is None:
+                node.item = item
+        else:
+            node = self.tree.insert(key, value)
+        node.data = value
+        if self.mode == "value":
+            self.map[key] = value
+        elif self.mode == "node":
+            self.map[key] = node
 
-    def delete(self, key):
-        if self.find(key) is None:
+    def bulk_load(self, items, count: int = None):
+        # Replaces the contents with (key, value) pairs in ascending key order, filling the tree and map in one O(n) pass
+        if count is None:
+            items = items if hasattr(items, '__len__') else list(items)
+            count = len(items)
+        if self.key is not None:
+            self.__bulk_load_keyed(items, count)
             return
-        self.tree.delete(key)
-        del self.map[key]
+        if self.mode == "value":
+            map = {}
+            self.tree._build_sorted(self.__mapped(items, map), count)
+            self.map = map
+            return
+        self.tree._build_sorted(items, count)
+        if self.mode == "node":
+            self.map = {node.key: node for node in self.tree.iter()}
+
+    def insert_many(self, items):
+        # The last value given for a key is the one kept, as with repeated inserts
+        if self.key is not None:
+            self.__insert_many_keyed(items)
+            return
+        values = dict(items)
+        nodes = self.tree.insert_many(values.items())
+        for node in nodes:
+            node.data = values[node.key]
+        if self.mode == "value":
+            self.map.update(values)
+        elif self.mode == "node":
+            self.map.update({node.key: node for node in nodes})
+
+    def delete_many(self, keys):
+        keys = list(keys) if self.key is None else [self.key(key) for key in keys]
+        self.tree.delete_many(keys)
+        if self.map is not None:
+            for key in keys:
+                self.map.pop(key, None)
+
+    def delete_range(self, lo = None, hi = None, inclusive = True, entries: bool = False):
+        # Deletes the keys of range(lo, hi, inclusive). The trees of tree.py cut them out with split and join
+        # instead of rebalancing after each key, and the dict drops them in one pass over the nodes cut out.
+        # Other trees delete each key. With entries, returns the removed (key, value) pairs in key order,
+        # read from the nodes cut out as they are consumed.
+        lo, hi = self.__bounds(lo, hi)
+        if isinstance(self.tree, Tree):
+            removed = self.tree.delete_range(lo, hi, inclusive)
+            if self.map is not None:
+                map = self.map
+                for node in removed.iter():
+                    del map[node.key]
+            if entries:
+                if self.key is not None:
+                    return ((node.item, node.data) for node in removed.iter())
+                return ((node.key, node.data) for node in removed.iter())
+            return None
+        removed = [(node.key, node.data) for node in self.tree.range(lo, hi, inclusive)]
+        self.tree.delete_many(key for key, value in removed)
+        if self.map is not None:
+            for key, value in removed:
+                del self.map[key]
+        if entries:
+            return iter(removed)
+        return None
+
+    def delete(self, key):
+        if self.key is not None:
+            key = self.key(key)
+        if self.mode == "ordered":
+            self.tree.delete(key)
+        elif self.mode == "node":
+            node = self.map.pop(key, None)
+            if node is not None:
+                self.tree.delete_node(node)
+        elif key in self.map:
+            self.tree.delete(key)
+            del self.map[key]
     
+    # Ordered navigation, each returns the node (key and data) or None when there is no such node. The
+    # keys taken are those given to the map, while in a keyed map the nodes returned hold the computed
+    # key as node.key and the first key given for it as node.item.
+
+    def first(self):
+        return self.__node_or_none(self.tree.first())
+
+    def last(self):
+        return self.__node_or_none(self.tree.last())
+
+    def floor(self, key):
+        if self.key is not None:
+            key = self.key(key)
+        return self.__node_or_none(self.tree.floor(key))
+
+    def ceiling(self, key):
+        if self.key is not None:
+            key = self.key(key)
+        return self.__node_or_none(self.tree.ceiling(key))
+
+    def lower(self, key):
+        if self.key is not None:
+            key = self.key(key)
+        return self.__node_or_none(self.tree.lower(key))
+
+    def higher(self, key):
+        if self.key is not None:
+            key = self.key(key)
+        return self.__node_or_none(self.tree.higher(key))
+
+    def range(self, lo = None, hi = None, inclusive = True):
+        lo, hi = self.__bounds(lo, hi)
+        return self.tree.range(lo, hi, inclusive)
+
+    def select(self, index: int):
+        return self.__node_or_none(self.tree.select(index))
+
+    def rank(self, key) -> int:
+        if self.key is not None:
+            key = self.key(key)
+        return self.tree.rank(key)
+
+    def count_range(self, lo = None, hi = None, inclusive = True) -> int:
+        lo, hi = self.__bounds(lo, hi)
+        return self.tree.count_range(lo, hi, inclusive)
+
     def iter(self):
-        return self.tree.iter()
\ No newline at end of file
+        return self.tree.iter()
+
+    def __reversed__(self):
+        return reversed(self.tree)
+
+    def cursor(self, key = None):
+        # A cursor over the nodes, see TreeCursor, for the trees of tree.py. Like the map, its seek takes
+        # the keys given to the map.
+        if self.key is not None:
+            return KeyedCursor(self.tree, self.key, key)
+        return self.tree.cursor(key)
+
+    def __bulk_load_keyed(self, items, count: int):
+        # The keys given are kept in order of their computed keys, to be set on the built nodes after
+        given = []
+        self.tree._build_sorted(self.__computed(items, given), count)
+        map = {} if self.map is not None else None
+        for node, item in zip(self.tree.iter(), given):
+            node.item = item
+            if map is not None:
+                map[node.key] = node.data if self.mode == "value" else node
+        self.map = map
+
+    def __computed(self, items, given: list):
+        key = self.key
+        for item, value in items:
+            given.append(item)
+            yield key(item), value
+
+    def __insert_many_keyed(self, items):
+        values = {}
+        given = {}
+        for item, value in items:
+            key = self.key(item)
+            values[key] = value
+            given.setdefault(key, item)
+        nodes = self.tree.insert_many(values.items())
+        for node in nodes:
+            node.data = values[node.key]
+            if node.item is None:
+                node.item = given[node.key]
+        if self.mode == "value":
+            self.map.update(values)
+        elif self.mode == "node":
+            self.map.update({node.key: node for node in nodes})
+
+    def __bounds(self, lo, hi) -> tuple:
+        if self.key is None:
+            return lo, hi
+        return None if lo is None else self.key(lo), None if hi is None else self.key(hi)
+
+    def __mapped(self, items, map: dict):
+        for key, value in items:
+            map[key] = value
+            yield key, value
+
+    def __node_or_none(self, node):
+        return None if node is self.tree.nil else node
+
+class KeyedCursor(TreeCursor):
+    # A cursor over a keyed map, whose seek computes the key as the map does
+
+    def __init__(self, tree: Tree, key_function, key = None):
+        self.key_function = key_function
+        super().__init__(tree, key)
+
+    def seek(self, key) -> Node:
+        return super().seek(self.key_function(key))